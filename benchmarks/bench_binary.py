@@ -0,0 +1,111 @@
+"""
+Binary (mmap) record file vs pickle: file size, cold open and point lookups.
+
+    python benchmarks/bench_binary.py [--count 1000000] [--lookups 1000]
+
+"cold open" is a new storage object answering its first lookup (for the
+pickle that means unpickling every record); "lookup" is the warm per-ID
+cost afterwards; "process" is the wall clock of `ems.py --backend X get ID`
+in a fresh interpreter. "salary update" times one in-place change.
+"""
+
+import argparse
+import copy
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, best_of, ems, make_employees, print_row
+
+
+def cold_get(storage_class, path, emp_id):
+    storage = storage_class(path) if storage_class is ems.PickleStorage else storage_class(path, migrate_from=None)
+    if storage_class is ems.PickleStorage:
+        return storage.load().get(emp_id)
+    emp = storage.get(emp_id)
+    storage.close()
+    return emp
+
+
+def process_wall(folder, backend, emp_id, repeat=5):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "ems.py"), "--backend", backend, "get", emp_id],
+                       cwd=folder, env=env, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    records = make_employees(args.count)
+    ids = random.Random(7).sample(list(records), min(args.lookups, len(records)))
+    with tempfile.TemporaryDirectory() as folder:
+        pickle_path = os.path.join(folder, ems.PICKLE_FILE)
+        binary_path = os.path.join(folder, ems.BINARY_FILE)
+        ems.PickleStorage(pickle_path).save_all(records)
+        ems.BinaryStorage(binary_path, migrate_from=None).save_all(records)
+
+        pickled = ems.PickleStorage(pickle_path)
+        binary = ems.BinaryStorage(binary_path, migrate_from=None)
+        pickle_open, _ = best_of(cold_get, ems.PickleStorage, pickle_path, ids[0], repeat=3)
+        binary_open, _ = best_of(cold_get, ems.BinaryStorage, binary_path, ids[0])
+        in_memory = pickled.load()
+        binary.get(ids[0])
+
+        def pickle_lookups():
+            for emp_id in ids:
+                in_memory.get(emp_id)
+
+        def binary_lookups():
+            for emp_id in ids:
+                binary.get(emp_id)
+
+        pickle_lookup, _ = best_of(pickle_lookups)
+        binary_lookup, _ = best_of(binary_lookups)
+
+        def salary_update():
+            emp = copy.copy(binary.get(ids[1]))
+            emp.set_salary(emp.get_salary() + 1)
+            emp.version += 1
+            records[ids[1]] = emp
+            binary.apply_changes(records, {ids[1]: emp})
+
+        binary_size = os.path.getsize(binary_path)
+        binary_update, _ = best_of(salary_update)
+        assert os.path.getsize(binary_path) == binary_size  # written in place
+
+        def pickle_update():
+            pickled.apply_changes(records, {ids[1]: records[ids[1]]})
+
+        pickle_update_time, _ = best_of(pickle_update, repeat=3)
+        pickle_process = process_wall(folder, "pickle", ids[0])
+        binary_process = process_wall(folder, "binary", ids[0])
+        pickle_size = os.path.getsize(pickle_path)
+        binary.close()
+
+    print(f"{args.count:,} records, {len(ids):,} random lookups")
+    print_row("", "pickle", "binary", "speedup")
+    print_row("file size (MB)", f"{pickle_size / 1e6:.1f}", f"{binary_size / 1e6:.1f}", "")
+    print_row("cold open + 1 lookup (ms)", f"{pickle_open * 1000:.1f}", f"{binary_open * 1000:.3f}",
+              f"{pickle_open / binary_open:,.0f}x")
+    print_row("process: ems.py get (ms)", f"{pickle_process * 1000:.0f}", f"{binary_process * 1000:.0f}",
+              f"{pickle_process / binary_process:.1f}x")
+    print_row("warm lookup (us)", f"{pickle_lookup / len(ids) * 1e6:.2f}", f"{binary_lookup / len(ids) * 1e6:.2f}",
+              "")
+    print_row("salary update (ms)", f"{pickle_update_time * 1000:.1f}", f"{binary_update * 1000:.2f}",
+              f"{pickle_update_time / binary_update:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Bulk update: a 3% raise for one department, one commit per employee versus
+a single bulk_update() and commit.
+
+    python benchmarks/bench_bulk_update.py [--counts 10000 100000] [--sample 20]
+
+One commit per employee is what running `update` once per ID costs, without
+the process start-up: every commit rewrites the pickle. It is timed on the
+first --sample employees and scaled up to the whole department.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from common import ems, export_snapshots_to, make_employees, print_row
+
+DEPARTMENT = "Finance"
+
+
+def open_store(folder, records):
+    store = ems.RecordStore(ems.PickleStorage(os.path.join(folder, "bench.pkl")))
+    store.feed = None
+    store.replace_all(records)
+    ems.snapshot_exporter.flush()
+    return store
+
+
+def one_commit_each(store, emp_ids):
+    for emp_id in emp_ids:
+        emp = ems.copy.copy(store.get(emp_id))
+        emp.set_salary(round(emp.get_salary() * 1.03, 2))
+        emp.updated_at = ems.now_micros()
+        store.put(emp_id, emp)
+        store.commit()
+    ems.snapshot_exporter.flush()
+
+
+def bulk(store):
+    result = ems.bulk_update(store, {"department": DEPARTMENT}, scale=1.03)
+    store.commit()
+    ems.snapshot_exporter.flush()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--sample", type=int, default=20)
+    args = parser.parse_args()
+
+    widths = (12, 10, 24, 16, 10)
+    print_row("records", "matched", "commit each (s, est.)", "bulk (ms)", "speed-up", widths=widths)
+    for count in args.counts:
+        records = make_employees(count)
+        with tempfile.TemporaryDirectory() as folder:
+            export_snapshots_to(folder, delay=0)  # each commit exports, as a one-shot CLI run does
+            store = open_store(folder, records)
+            matched = ems.bulk_match(store, {"department": DEPARTMENT})
+            sample = matched[:args.sample]
+            start = time.perf_counter()
+            one_commit_each(store, sample)
+            each_s = (time.perf_counter() - start) / len(sample) * len(matched)
+
+            store = open_store(folder, records)
+            start = time.perf_counter()
+            result = bulk(store)
+            bulk_s = time.perf_counter() - start
+            assert result["updated"] == len(matched)
+            store.storage.close()
+        print_row(f"{count:,}", f"{len(matched):,}", f"{each_s:,.1f}", f"{bulk_s * 1000:,.0f}",
+                  f"{each_s / bulk_s:,.0f}x", widths=widths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Downstream sync: diffing full JSON snapshots vs. reading the change feed.
+
+    python benchmarks/bench_changes.py [--count 100000] [--changes 100] [--history 100000]
+
+A consumer that only has Current_Employees.json must load two snapshots and
+compare them. With the feed it asks for the changes after its cursor. The
+feed holds --history older entries, to show that its length does not matter.
+"""
+
+import argparse
+import copy
+import json
+import os
+import tempfile
+
+from common import ems, export_snapshots_to, make_employees, best_of, print_row
+
+
+def diff_snapshots(old_file, new_file):
+    with open(old_file, encoding="utf-8") as fh:
+        old = json.load(fh)
+    with open(new_file, encoding="utf-8") as fh:
+        new = json.load(fh)
+    return [emp_id for emp_id in set(old) | set(new) if old.get(emp_id) != new.get(emp_id)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--history", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} employees ...")
+    with tempfile.TemporaryDirectory() as folder:
+        export_snapshots_to(folder)
+        store = ems.RecordStore(ems.PickleStorage(os.path.join(folder, "bench.pkl")))
+        store.replace_all(make_employees(args.count))
+        old_file = os.path.join(folder, "old.json")
+        new_file = os.path.join(folder, "new.json")
+        ems.export_json_snapshot(store.records(), old_file)
+
+        filler = [("update", "000", None, {"salary": 1.0})] * 1000
+        for _ in range(args.history // 1000):
+            store.feed.append(filler)
+        cursor = store.feed.last_seq()
+
+        for emp_id in list(store.records())[:args.changes]:
+            emp = copy.copy(store.records()[emp_id])
+            emp.set_salary(float(emp.get_salary()) + 1000)
+            store.put(emp_id, emp)
+        store.commit()
+        ems.export_json_snapshot(store.records(), new_file)
+
+        snapshot_s, changed = best_of(diff_snapshots, old_file, new_file, repeat=args.repeat)
+        feed_s, entries = best_of(store.feed.since, cursor, repeat=args.repeat)
+        assert len(changed) == len(entries) == args.changes
+        ems.snapshot_exporter.flush()
+
+    print_row("consumer", "ms", widths=(44, 12))
+    print_row(f"diff two snapshots ({args.count:,} records)", f"{snapshot_s * 1000:.1f}", widths=(44, 12))
+    print_row(f"feed since cursor ({args.changes} of {args.history:,}+)", f"{feed_s * 1000:.2f}", widths=(44, 12))
+
+
+if __name__ == "__main__":
+    main()
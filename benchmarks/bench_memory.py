@@ -0,0 +1,68 @@
+"""
+Resident memory of the record layouts: Employee, SlottedEmployee, EmployeeColumns.
+
+    python benchmarks/bench_memory.py [--counts 100000 1000000]
+
+Each layout is built on its own and measured with tracemalloc, so the
+numbers are the bytes Python allocated for the records (not process RSS).
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from common import ems, iter_employee_rows, print_row
+
+
+def build_objects(count, employee_class):
+    records = {}
+    for emp_id, name, age, position, salary, department, location, email in iter_employee_rows(count):
+        records[emp_id] = employee_class(name, age, position, salary, department, location, email, emp_id)
+    return records
+
+
+def build_columns(count):
+    cols = ems.EmployeeColumns()
+    created = ems.now_text()
+    for emp_id, name, age, position, salary, department, location, email in iter_employee_rows(count):
+        cols.append_row(emp_id, name, age, position, salary, department, location, email, created)
+    return cols
+
+
+LAYOUTS = (
+    ("Employee (__dict__)", build_objects, ems.Employee),
+    ("SlottedEmployee", build_objects, ems.SlottedEmployee),
+    ("EmployeeColumns", build_columns, None),
+)
+
+
+def measure(builder, count, extra):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = builder(count, extra) if extra is not None else builder(count)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    gc.collect()
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    for count in args.counts:
+        print(f"\n{count:,} employees")
+        print_row("layout", "MiB", "bytes/rec", "build (s)")
+        for label, builder, extra in LAYOUTS:
+            used, elapsed = measure(builder, count, extra)
+            print_row(label, f"{used / 2**20:.1f}", f"{used / count:.0f}", f"{elapsed:.2f}")
+        print("(smaller is better)")
+
+
+if __name__ == "__main__":
+    main()
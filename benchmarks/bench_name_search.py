@@ -0,0 +1,82 @@
+"""
+Name search: trigram index vs. the old linear scan.
+
+    python benchmarks/bench_name_search.py [--count 1000000] [--repeat 5]
+
+The linear baseline is what search_employee() used to do: walk every record
+and call Validation.normalize() on each name.
+"""
+
+import argparse
+import time
+
+from common import ems, make_employees, best_of, print_row
+
+
+def linear_exact(records, query):
+    qn = ems.Validation.normalize(query)
+    return [emp_id for emp_id, emp in records.items() if ems.Validation.normalize(emp.get_name()) == qn]
+
+
+def linear_prefix(records, query):
+    qn = ems.Validation.normalize(query)
+    return [emp_id for emp_id, emp in records.items()
+            if ems.Validation.normalize(emp.get_name()).startswith(qn)]
+
+
+def linear_contains(records, query):
+    qn = ems.Validation.normalize(query)
+    return [emp_id for emp_id, emp in records.items() if qn in ems.Validation.normalize(emp.get_name())]
+
+
+def linear_fuzzy(records, query):
+    grams = ems.NameTrigramIndex.grams
+    pad_start = ems.NameTrigramIndex.PAD_START
+    pad_end = ems.NameTrigramIndex.PAD_END
+    q_grams = grams(pad_start + ems.Validation.normalize(query) + pad_end)
+    hits = []
+    for emp_id, emp in records.items():
+        n_grams = grams(pad_start + ems.Validation.normalize(emp.get_name()) + pad_end)
+        score = 2.0 * len(q_grams & n_grams) / (len(q_grams) + len(n_grams))
+        if score >= ems.NAME_FUZZY_MIN_SCORE:
+            hits.append((emp_id, score))
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} employees ...")
+    records = make_employees(args.count)
+    sample = records[str(args.count // 2).zfill(3)].get_name()
+    words = sample.split()
+    typo = " ".join([words[0][:-1]] + words[1:])  # drop a letter
+
+    start = time.perf_counter()
+    indexes = ems.RecordIndexes()
+    indexes.rebuild(records)
+    names = indexes.names  # both indexes are built on first use
+    print(f"Index build: {time.perf_counter() - start:.2f}s\n")
+
+    cases = (
+        ("exact", sample, linear_exact, None),
+        ("prefix", sample[:len(words[0]) + 3], linear_prefix, "prefix"),
+        ("contains", " ".join(words[1:]), linear_contains, "contains"),
+        ("fuzzy", typo, linear_fuzzy, "fuzzy"),
+    )
+    print_row("query", "linear (ms)", "index (ms)", "speed-up")
+    for label, query, linear_fn, mode in cases:
+        linear_s, _ = best_of(linear_fn, records, query, repeat=1 if mode == "fuzzy" else args.repeat)
+        if mode is None:
+            index_s, _ = best_of(indexes.lookup, "name", query, repeat=args.repeat)
+        else:
+            index_s, _ = best_of(names.search, query, mode, repeat=args.repeat, time_limit=60)
+        print_row(f"{label}: {query!r}"[:27], f"{linear_s * 1000:.2f}", f"{index_s * 1000:.3f}",
+                  f"{linear_s / max(index_s, 1e-9):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
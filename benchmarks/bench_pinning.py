@@ -0,0 +1,56 @@
+"""
+Pinned snapshots: what a reader's pin and the writer's next put() cost.
+
+    python benchmarks/bench_pinning.py [--counts 10000 100000 1000000]
+
+The alternative to a pin is copying the dict so a background reader never
+sees a write: dict(records) on every export or report. With RecordVersions
+a pin is O(1); the first put() into a block after a pin copies that block
+and the dict of blocks. The first pin builds the blocks once.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from common import ems, export_snapshots_to, make_employees, best_of, print_row
+
+
+def put_after_pin(store, emp_id):
+    store.snapshot()
+    emp = ems.copy.copy(store.get(emp_id))
+    emp.set_salary(emp.get_salary() + 1)
+    store.put(emp_id, emp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print_row("records", "dict copy (ms)", "first pin (ms)", "pin (us)", "pin + put (us)",
+              widths=(12, 16, 16, 12, 16))
+    for count in args.counts:
+        records = make_employees(count)
+        with tempfile.TemporaryDirectory() as folder:
+            export_snapshots_to(folder)
+            store = ems.RecordStore(ems.PickleStorage(os.path.join(folder, "bench.pkl")))
+            store.feed = None
+            store.replace_all(records)
+            copy_s, _ = best_of(dict, records, repeat=args.repeat)
+            store.versions.rebuild(store.records())  # replace_all() pinned already; time the build
+            start = time.perf_counter()
+            store.snapshot()
+            first_s = time.perf_counter() - start
+            pin_s, _ = best_of(store.snapshot, repeat=args.repeat)
+            emp_id = str(count // 2).zfill(3)
+            put_s, _ = best_of(put_after_pin, store, emp_id, repeat=args.repeat)
+            ems.snapshot_exporter.flush()
+        print_row(f"{count:,}", f"{copy_s * 1000:.1f}", f"{first_s * 1000:.1f}", f"{pin_s * 1e6:.1f}",
+                  f"{put_s * 1e6:.0f}", widths=(12, 16, 16, 12, 16))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Grouped payroll reports: NumPy vs. pure Python, from dicts and from columns.
+
+    python benchmarks/bench_reports.py [--count 1000000] [--repeat 3]
+"""
+
+import argparse
+
+from common import ems, iter_employee_rows, make_employees, best_of, print_row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} employees ...")
+    cols = ems.EmployeeColumns()
+    for row in iter_employee_rows(args.count):
+        cols.append_row(*row)
+    records = make_employees(min(args.count, 200000))
+
+    engines = [("python", False)]
+    if ems.numpy_enabled():
+        engines.insert(0, ("numpy", True))
+    else:
+        print("numpy is not installed; only the pure Python path is measured")
+
+    print_row("source / group by", "engine", "seconds", widths=(40, 10, 10))
+    for group_by in ems.REPORT_GROUP_FIELDS:
+        for label, use_numpy in engines:
+            seconds, _ = best_of(ems.payroll_report, cols, group_by, use_numpy, repeat=args.repeat)
+            print_row(f"columns[{args.count:,}] / {group_by}", label, f"{seconds:.3f}", widths=(40, 10, 10))
+    for label, use_numpy in engines:
+        seconds, _ = best_of(ems.payroll_report, records, "department", use_numpy, repeat=args.repeat)
+        print_row(f"dict[{len(records):,}] / department", label, f"{seconds:.3f}", widths=(40, 10, 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Salary questions: full sort vs. heap vs. the sorted salary index.
+
+    python benchmarks/bench_salary.py [--count 1000000] [--repeat 5]
+
+"Full sort" is what sort_employees() used to do for every salary view:
+sort_pairs_by_salary() over everything, then slice or filter.
+"""
+
+import argparse
+import copy
+import time
+
+from common import ems, make_employees, best_of, print_row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} employees ...")
+    records = make_employees(args.count)
+    pairs = list(records.items())
+    start = time.perf_counter()
+    index = ems.SalaryIndex(records)
+    print(f"Index build: {time.perf_counter() - start:.2f}s\n")
+
+    def sort_top(n, highest, department=None):
+        subset = [p for p in pairs if department is None or p[1].department == department]
+        return ems.sort_pairs_by_salary(subset, highest)[:n]
+
+    def sort_range(low, high):
+        return [p for p in ems.sort_pairs_by_salary(pairs) if low <= p[1].get_salary() <= high]
+
+    def heap_top(n, highest, department=None):
+        subset = (p for p in pairs if department is None or p[1].department == department)
+        return ems.top_pairs_by_salary(subset, n, highest)
+
+    cases = (
+        ("top 50", (sort_top, 50, True), (heap_top, 50, True), (index.top, 50, True)),
+        ("bottom 10 in Finance", (sort_top, 10, False, "Finance"), (heap_top, 10, False, "Finance"),
+         (index.top, 10, False, "Finance")),
+        ("80k-100k", (sort_range, 80000, 100000), None, (index.range, 80000, 100000)),
+    )
+    print_row("query", "sort (ms)", "heap (ms)", "index (ms)", widths=(24, 12, 12, 12))
+    for label, sort_case, heap_case, index_case in cases:
+        sort_s, _ = best_of(*sort_case, repeat=1)
+        heap_text = "-"
+        if heap_case is not None:
+            heap_s, _ = best_of(*heap_case, repeat=args.repeat)
+            heap_text = f"{heap_s * 1000:.2f}"
+        index_s, _ = best_of(*index_case, repeat=args.repeat)
+        print_row(label, f"{sort_s * 1000:.1f}", heap_text, f"{index_s * 1000:.3f}", widths=(24, 12, 12, 12))
+
+    emp_id = next(iter(records))
+    emp = copy.copy(records[emp_id])
+    emp.set_salary(123456.0)
+    update_s, _ = best_of(index.add, emp_id, emp, repeat=args.repeat)
+    print(f"\nIndex update (one salary change): {update_s * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Snapshot formats and compression: file size, write time and read time.
+
+    python benchmarks/bench_snapshots.py [--count 100000] [--repeat 3]
+
+Every row is a write_snapshot() / read_snapshot() round trip, so the times
+include the fsync and the atomic rename the pickle and JSON snapshot pay.
+Use it to pick PICKLE_PROTOCOL / PICKLE_COMPRESSION and the extension of
+JSON_SNAPSHOT_FILE.
+"""
+
+import argparse
+import os
+import tempfile
+
+from common import ems, make_employees, best_of, print_row
+
+FORMATS = (
+    ("pickle p4", ".pkl", 4),  # pickle.dump()'s default before Python 3.14
+    ("pickle p5", ".pkl", 5),
+    ("json indent", ".json", False),
+    ("json compact", ".json", True),
+    ("jsonl", ".jsonl", None),
+)
+CODECS = (("", None), (".gz", "gzip"), (".bz2", "bz2"), (".xz", "lzma"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} employees ...")
+    records = make_employees(args.count)
+    default_protocol = ems.PICKLE_PROTOCOL
+
+    print_row("format", "size (KB)", "write (ms)", "read (ms)")
+    with tempfile.TemporaryDirectory() as folder:
+        try:
+            for label, ext, option in FORMATS:
+                if ext == ".pkl":
+                    ems.PICKLE_PROTOCOL = option
+                compact = option if ext == ".json" else False
+                for codec_ext, codec in CODECS:
+                    path = os.path.join(folder, "bench" + ext + codec_ext)
+                    write_s, size = best_of(ems.write_snapshot, records, path, compact=compact,
+                                            repeat=args.repeat)
+                    read_s, loaded = best_of(ems.read_snapshot, path, repeat=args.repeat)
+                    assert len(loaded) == len(records)
+                    print_row(f"{label} {codec or ''}".strip(), f"{size / 1024:,.0f}",
+                              f"{write_s * 1000:.0f}", f"{read_s * 1000:.0f}")
+                    os.remove(path)
+        finally:
+            ems.PICKLE_PROTOCOL = default_protocol
+
+
+if __name__ == "__main__":
+    main()
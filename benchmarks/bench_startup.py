@@ -0,0 +1,119 @@
+"""
+Startup cost of ems.py: module import time and wall clock of short scripted runs.
+
+    python benchmarks/bench_startup.py [--count 100000] [--repeat 5] [--json out.json]
+                                       [--max-import-ms 150]
+
+Runs `python -X importtime -c "import ems"` twice: cold, with no bytecode
+cache, which is what `python ems.py` pays on every run (a script is always
+compiled from source), and warm, which is what `python -m ems` pays once
+the cache is written. Reports both plus the slowest imported modules, then
+times `--help`, `get` and `sort --limit 1` both ways against a generated
+data folder. With --max-import-ms the script exits 1 when the cold import
+exceeds the budget, so it can run in CI to catch startup regressions.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, ems, make_employees
+
+EMS_SCRIPT = os.path.join(ROOT, "ems.py")
+
+
+def child_env(source_dir=None):
+    """
+    Environment for a child run. With source_dir, ems is imported from the
+    copy in that folder and no bytecode is written, so it compiles every time.
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # let the warm-up run cache bytecode like a normal install
+    env["PYTHONPATH"] = (source_dir or ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    if source_dir:
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def import_profile(cwd, source_dir=None):
+    """(ems cumulative microseconds, [(cumulative_us, module), ...] slowest first)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import ems"], cwd=cwd,
+                          env=child_env(source_dir), capture_output=True, text=True, check=True)
+    modules = []
+    ems_total = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        modules.append((int(cumulative_us), name))
+        if name == "ems":
+            ems_total = int(cumulative_us)
+    modules.sort(reverse=True)
+    return ems_total, modules
+
+
+def wall_clock(command, cwd, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, cwd=cwd, env=child_env(),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000, help="records in the generated data folder")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--max-import-ms", type=float, help="fail (exit 1) above this import time")
+    args = parser.parse_args()
+
+    results = {"count": args.count, "python": sys.version.split()[0]}
+    with tempfile.TemporaryDirectory() as folder:
+        import_profile(folder)  # warm-up: writes bytecode caches
+        source_dir = os.path.join(folder, "source")
+        os.mkdir(source_dir)
+        shutil.copy(EMS_SCRIPT, source_dir)
+        for label, from_source in (("import_ms", source_dir), ("import_ms_cached", None)):
+            samples = []
+            for _ in range(args.repeat):
+                total, modules = import_profile(folder, from_source)
+                samples.append(total)
+            results[label] = round(statistics.median(samples) / 1000, 2)
+        results["slowest_imports"] = [{"module": name, "ms": round(us / 1000, 2)} for us, name in modules[:10]]
+        print(f"import ems: {results['import_ms']:.1f} ms from source (python ems.py), "
+              f"{results['import_ms_cached']:.1f} ms from cached bytecode (python -m ems); "
+              f"median of {args.repeat}")
+        for item in results["slowest_imports"]:
+            print(f"  {item['ms']:8.1f} ms  {item['module']}")
+
+        records = make_employees(args.count)
+        ems.PickleStorage(os.path.join(folder, ems.PICKLE_FILE)).save_all(records)
+        for label, cli_args in (("--help", ["--help"]),
+                                ("get 001", ["get", "001"]),
+                                ("sort --limit 1", ["sort", "--by", "salary:desc", "--limit", "1"])):
+            for runner, command in (("ems.py", [EMS_SCRIPT]), ("-m ems", ["-m", "ems"])):
+                times = wall_clock(command + cli_args, folder, args.repeat)
+                results[f"wall_ms {runner} {label}"] = round(statistics.median(times) * 1000, 1)
+                print(f"python {runner} {label:<16} {statistics.median(times) * 1000:8.1f} ms wall "
+                      f"(median, {args.count:,} records)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if args.max_import_ms is not None and results["import_ms"] > args.max_import_ms:
+        print(f"FAIL: import took {results['import_ms']} ms (budget {args.max_import_ms} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
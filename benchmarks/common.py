@@ -0,0 +1,182 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run the scripts from the repository root, e.g.:
+    python benchmarks/bench_name_search.py --count 1000000
+"""
+
+import math
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import ems  # noqa: E402
+
+# Name pools, most common first; picks follow a Zipf-like curve so a few
+# names are frequent and most are rare, as in a real staff list.
+FIRST_NAMES = (
+    "Olivia", "Noah", "Ava", "Liam", "Charlotte", "Oliver", "Amelia", "Jack", "Isla", "William",
+    "Mia", "Henry", "Grace", "Leo", "Chloe", "Thomas", "Zoe", "James", "Ella", "Lucas",
+    "Ruby", "Ethan", "Sophie", "Mason", "Harper", "Hudson", "Matilda", "Archie", "Evie", "Oscar",
+    "Sienna", "Lachlan", "Emily", "Samuel", "Ivy", "Daniel", "Lily", "Max", "Hannah", "Joshua",
+    "Priya", "Wei", "Aisha", "Arjun", "Mei", "Hiroshi", "Fatima", "Mohammed", "Anh", "Rahul",
+    "Sofia", "Mateo", "Elena", "Luca", "Ana", "Nikolai", "Ingrid", "Kwame", "Amara", "Tane",
+)
+LAST_NAMES = (
+    "Smith", "Jones", "Williams", "Brown", "Wilson", "Taylor", "Nguyen", "Johnson", "Martin", "White",
+    "Anderson", "Walker", "Thompson", "Harris", "Lee", "Ryan", "Robinson", "Kelly", "King", "Davis",
+    "Wright", "Evans", "Roberts", "Green", "Hall", "Wood", "Jackson", "Clarke", "Patel", "Khan",
+    "Singh", "Chen", "Wang", "Li", "Zhang", "Tran", "Le", "Kim", "Park", "Murphy",
+    "O'Brien", "Campbell", "Stewart", "Mitchell", "Young", "Scott", "Baker", "Adams", "Cooper", "Hughes",
+    "Rossi", "Papadopoulos", "Kowalski", "Nakamura", "Haddad", "Silva", "Mensah", "Novak", "Fischer", "Ng",
+)
+EMAIL_DOMAINS = (("example.com", 70), ("example.com.au", 20), ("example.org", 10))
+
+# Share of staff per position, the department most of them sit in, and the
+# median salary; salaries are log-normal around it, nudged by location.
+POSITION_PROFILE = {
+    "Developer": (40, "IT", 112000),
+    "Analyst": (20, "Finance", 96000),
+    "Designer": (15, "Design", 91000),
+    "HR": (13, "HR", 82000),
+    "Manager": (12, None, 142000),
+}
+LOCATION_PROFILE = {
+    "Sydney": (32, 1.06), "Melbourne": (30, 1.03), "Brisbane": (16, 0.97),
+    "Perth": (12, 1.00), "Adelaide": (10, 0.95),
+}
+HOME_DEPARTMENT_SHARE = 0.7
+SALARY_SIGMA = 0.18
+DATA_EPOCH = datetime(2026, 1, 1)  # generated timestamps fall in the five years before this
+DEFAULT_SEED = 1860963
+
+
+def _zipf_weights(count, exponent=0.9):
+    return [1.0 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def iter_employee_dicts(count, seed=DEFAULT_SEED):
+    """
+    Yield `count` reproducible employee dicts (id plus every Employee field).
+    Uses only ALLOWED_POSITIONS / DEPARTMENTS / LOCATIONS; names are unique
+    (a repeated name gets a number, like "Olivia Smith 2").
+    """
+    rng = random.Random(seed)
+    positions = list(ems.ALLOWED_POSITIONS)
+    position_weights = [POSITION_PROFILE.get(p, (10, None, 90000))[0] for p in positions]
+    locations = list(ems.ALLOWED_LOCATIONS)
+    location_weights = [LOCATION_PROFILE.get(loc, (10, 1.0))[0] for loc in locations]
+    departments = list(ems.ALLOWED_DEPARTMENTS)
+    first_weights = _zipf_weights(len(FIRST_NAMES))
+    last_weights = _zipf_weights(len(LAST_NAMES))
+    domains = [d for d, _ in EMAIL_DOMAINS]
+    domain_weights = [w for _, w in EMAIL_DOMAINS]
+    span = 5 * 365 * 86400
+    seen = {}
+    batch = 4096  # draw choices in batches; rng.choices with weights is much faster that way
+    for start in range(0, count, batch):
+        n = min(batch, count - start)
+        firsts = rng.choices(FIRST_NAMES, first_weights, k=n)
+        lasts = rng.choices(LAST_NAMES, last_weights, k=n)
+        picked_positions = rng.choices(positions, position_weights, k=n)
+        picked_locations = rng.choices(locations, location_weights, k=n)
+        picked_domains = rng.choices(domains, domain_weights, k=n)
+        for j in range(n):
+            i = start + j + 1
+            first, last, position, location = firsts[j], lasts[j], picked_positions[j], picked_locations[j]
+            initial = chr(65 + rng.randrange(26)) if rng.random() < 0.15 else ""
+            name = f"{first} {initial}. {last}" if initial else f"{first} {last}"
+            repeat = seen.get(name, 0) + 1
+            seen[name] = repeat
+            local = ".".join(part for part in (first, initial, last) if part).lower().replace("'", "")
+            if repeat > 1:
+                name = f"{name} {repeat}"
+                local += str(repeat)
+
+            _, home, median = POSITION_PROFILE.get(position, (10, None, 90000))
+            if home in departments and rng.random() < HOME_DEPARTMENT_SHARE:
+                department = home
+            else:
+                department = rng.choice(departments)
+            factor = LOCATION_PROFILE.get(location, (10, 1.0))[1]
+            salary = median * factor * math.exp(rng.gauss(0, SALARY_SIGMA))
+            salary = float(min(max(round(salary / 500) * 500, 45000), 350000))
+            age = min(max(int(rng.triangular(18, 67, 33)), 16), 70)
+
+            created = DATA_EPOCH - timedelta(seconds=rng.randrange(span))
+            updated = None
+            if rng.random() < 0.3:
+                updated = created + timedelta(seconds=rng.randrange(max(int((DATA_EPOCH - created).total_seconds()), 1)))
+            yield {
+                "id": str(i).zfill(3),
+                "name": name,
+                "age": age,
+                "position": position,
+                "salary": salary,
+                "department": department,
+                "location": location,
+                "email": f"{local}@{picked_domains[j]}",
+                "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+                "updated_at": updated.strftime("%Y-%m-%d %H:%M:%S") if updated else None,
+            }
+
+
+def iter_employee_rows(count, seed=DEFAULT_SEED):
+    """Yield (emp_id, name, age, position, salary, department, location, email) tuples."""
+    for row in iter_employee_dicts(count, seed):
+        yield (row["id"], row["name"], row["age"], row["position"], row["salary"],
+               row["department"], row["location"], row["email"])
+
+
+def make_employees(count, seed=DEFAULT_SEED, employee_class=None):
+    """{id: Employee} with `count` reproducible, unique-named records (stored, so version 1)."""
+    employee_class = employee_class or ems.Employee
+    records = {}
+    for row in iter_employee_dicts(count, seed):
+        emp = employee_class(row["name"], row["age"], row["position"], row["salary"], row["department"],
+                             row["location"], row["email"], row["id"])
+        emp.created_at = ems.parse_timestamp(row["created_at"])
+        emp.updated_at = ems.parse_timestamp(row["updated_at"])
+        emp.version = 1
+        records[row["id"]] = emp
+    return records
+
+
+def export_snapshots_to(folder, delay=None):
+    """
+    Send the JSON snapshot that ems exports after every save into folder.
+    Without this a benchmark that saves or commits writes its generated
+    records over ./Current_Employees.json in the current directory.
+    delay=0 exports synchronously, inside whatever is being timed.
+    """
+    ems.snapshot_exporter.flush()
+    ems.JSON_SNAPSHOT_FILE = os.path.join(folder, os.path.basename(ems.JSON_SNAPSHOT_FILE))
+    ems.snapshot_exporter.json_file = ems.JSON_SNAPSHOT_FILE
+    if delay is not None:
+        ems.snapshot_exporter.delay = delay  # read once, when ems built the exporter
+
+
+def best_of(fn, *args, repeat=5, **kwargs):
+    """Best wall-clock seconds over `repeat` calls, plus the last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def print_row(*cells, widths=(28, 14, 14, 12)):
+    parts = []
+    for cell, width in zip(cells, widths):
+        parts.append(str(cell).ljust(width))
+    print("".join(parts).rstrip())
@@ -0,0 +1,57 @@
+"""
+Write a reproducible synthetic data folder for manual testing or profiling.
+
+    python benchmarks/generate_data.py --count 1000000 --out /tmp/ems-1m [--seed 1860963]
+                                       [--format pickle|sqlite|binary|csv|jsonl]
+
+pickle/sqlite/binary write the backend's data file, so `cd <out> && python
+<repo>/ems.py [--backend ...]` opens it directly; csv/jsonl write an import
+file for `ems.py import`.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+from common import DEFAULT_SEED, ems, iter_employee_dicts, make_employees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--out", required=True, help="folder to write into (created if missing)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--format", choices=("pickle", "sqlite", "binary", "csv", "jsonl"), default="pickle")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    start = time.perf_counter()
+    if args.format in ("csv", "jsonl"):
+        path = os.path.join(args.out, f"employees.{args.format}")
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            if args.format == "csv":
+                writer = csv.writer(fh)
+                writer.writerow(ems.IMPORT_FIELDS)
+                for row in iter_employee_dicts(args.count, args.seed):
+                    writer.writerow([row[f] for f in ems.IMPORT_FIELDS])
+            else:
+                for row in iter_employee_dicts(args.count, args.seed):
+                    fh.write(json.dumps({f: row[f] for f in ems.IMPORT_FIELDS}) + "\n")
+    else:
+        records = make_employees(args.count, args.seed)
+        if args.format == "pickle":
+            storage = ems.PickleStorage(os.path.join(args.out, ems.PICKLE_FILE))
+        elif args.format == "sqlite":
+            storage = ems.SqliteStorage(os.path.join(args.out, ems.SQLITE_FILE), migrate_from=None)
+        else:
+            storage = ems.BinaryStorage(os.path.join(args.out, ems.BINARY_FILE), migrate_from=None)
+        storage.save_all(records)
+        storage.close()
+        path = storage.paths()[0]
+    print(f"Wrote {args.count:,} employees to {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
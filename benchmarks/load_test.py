@@ -0,0 +1,153 @@
+"""
+Load test for the HTTP service (python ems.py serve).
+
+    python benchmarks/load_test.py [--count 100000] [--clients 32] [--seconds 10]
+                                   [--writes 0.05] [--journal] [--url http://127.0.0.1:8765]
+
+Without --url a server is started on a free port over a generated data
+folder and stopped afterwards. Each client keeps one keep-alive connection
+and loops over a mix of page reads, ID lookups and searches (plus a
+fraction of PATCH writes). Prints requests per second and p50/p99 latency
+per request kind.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from common import ROOT, ems, make_employees, print_row
+
+
+async def request(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: ems\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+                 + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def next_request(rng, count, write_share):
+    roll = rng.random()
+    emp_id = str(rng.randint(1, count)).zfill(3)
+    if roll < write_share:
+        return "patch", "PATCH", "/employees/" + emp_id, {"salary": rng.randrange(55000, 180000, 500)}
+    roll = rng.random()
+    if roll < 0.4:
+        return "get", "GET", "/employees/" + emp_id, None
+    if roll < 0.7:
+        offset = rng.randrange(0, max(count - 50, 1))
+        sort = rng.choice(("id", "salary:desc", "department,name"))
+        return "page", "GET", f"/employees?sort={sort}&offset={offset}&limit=50", None
+    prefix = rng.choice(ems.ALLOWED_DEPARTMENTS)
+    return "search", "GET", f"/search?department={prefix}&limit=20", None
+
+
+async def client(host, port, deadline, count, write_share, seed, samples, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            kind, method, path, body = next_request(rng, count, write_share)
+            start = time.perf_counter()
+            status = await request(reader, writer, method, path, body)
+            samples.setdefault(kind, []).append(time.perf_counter() - start)
+            if status >= 500 or (status >= 400 and kind != "get"):
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def run_load(host, port, clients, seconds, count, write_share):
+    samples = {}
+    errors = {}
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, deadline, count, write_share, n, samples, errors)
+                           for n in range(clients)))
+    return time.perf_counter() - started, samples, errors
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(folder, port, journal):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    command = [sys.executable, os.path.join(ROOT, "ems.py"), "serve", "--port", str(port)]
+    if journal:
+        command.append("--journal")
+    proc = subprocess.Popen(command, cwd=folder, env=env, stderr=subprocess.PIPE, text=True)
+    proc.stderr.readline()  # "ems: serving ..." once listening
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--count", type=int, default=100000, help="records to generate (and to pick IDs from)")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writes", type=float, default=0.05, help="share of requests that are PATCH writes")
+    parser.add_argument("--journal", action="store_true", help="start the server with --journal")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        proc = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            host, port = "127.0.0.1", free_port()
+            ems.PickleStorage(os.path.join(folder, ems.PICKLE_FILE)).save_all(make_employees(args.count))
+            proc = start_server(folder, port, args.journal)
+        try:
+            elapsed, samples, errors = asyncio.run(
+                run_load(host, port, args.clients, args.seconds, args.count, args.writes))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    total = sum(len(v) for v in samples.values())
+    print(f"{total:,} requests in {elapsed:.1f}s from {args.clients} clients: {total / elapsed:,.0f} req/s")
+    print_row("request", "count", "p50 ms", "p99 ms")
+    for kind in sorted(samples):
+        values = samples[kind]
+        print_row(kind, f"{len(values):,}", f"{percentile(values, 50) * 1000:.2f}",
+                  f"{percentile(values, 99) * 1000:.2f}")
+    everything = [v for values in samples.values() for v in values]
+    print_row("all", f"{total:,}", f"{percentile(everything, 50) * 1000:.2f}",
+              f"{percentile(everything, 99) * 1000:.2f}")
+    if errors:
+        print("errors:", ", ".join(f"{status} x{n}" for status, n in sorted(errors.items())))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Benchmark runner: times the main code paths at several data sizes, writes
+the results as JSON and checks them against a stored baseline.
+
+    python benchmarks/run_benchmarks.py [--sizes 1000 100000 1000000] [--repeat 3]
+                                        [--out results.json] [--baseline benchmarks/baseline.json]
+                                        [--tolerance 0.25] [--save-baseline]
+
+Covered: load_all_records / save_all_records, export_json_snapshot, ID and
+name search, every sort helper, group_pairs, salary top-N / range, time windows and print_table. Each number is the best of
+--repeat runs in seconds per operation. Machines differ, so every run also
+times a fixed pure-Python calibration loop and the regression check compares
+timings relative to it. A metric regresses when it is more than --tolerance
+slower than the baseline (and by more than --noise seconds). Exit code 1 on
+any regression.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from common import DATA_EPOCH, DEFAULT_SEED, best_of, ems, export_snapshots_to, make_employees, print_row
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+POINT_LOOKUPS = 1000  # ID / exact-name lookups per timing, reported per lookup
+
+
+def calibrate():
+    """Seconds for a fixed mix of sorting, dict and string work (the machine's speed)."""
+    def work():
+        rng = random.Random(1)
+        values = [rng.random() for _ in range(200000)]
+        values.sort()
+        table = {str(i): i for i in range(200000)}
+        return sum(table[str(i)] for i in range(0, 200000, 3)) + len("-".join(map(str, values[:20000])))
+    return best_of(work, repeat=5)[0]
+
+
+def quiet_table(*args, **kwargs):
+    """print_table with output discarded; paging stops after the first page (stdin at EOF)."""
+    saved_stdin = sys.stdin
+    sys.stdin = io.StringIO("")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ems.print_table(*args, **kwargs)
+    finally:
+        sys.stdin = saved_stdin
+
+
+def run_size(count, repeat, folder):
+    results = {}
+
+    def timed(metric, fn, *args, per=1, runs=None):
+        seconds, _ = best_of(fn, *args, repeat=runs or repeat)
+        results[metric] = seconds / per
+
+    records = make_employees(count)
+    storage = ems.PickleStorage(os.path.join(folder, f"bench_{count}.pkl"))
+    storage.save_all(records)
+    snapshot_file = os.path.join(folder, f"bench_{count}.json")
+
+    def save_all_records():
+        ems.save_all_records(records, storage)
+        ems.snapshot_exporter.flush()
+
+    timed("load_all_records", ems.load_all_records, storage)
+    timed("save_all_records", save_all_records)
+    timed("export_json_snapshot", ems.export_json_snapshot, records, snapshot_file)
+    timed("export_json_snapshot.compact", ems.export_json_snapshot, records, snapshot_file, True)
+
+    store = ems.RecordStore(storage)
+    store.records()
+    rng = random.Random(DEFAULT_SEED)
+    ids = [rng.choice(list(records)) for _ in range(POINT_LOOKUPS)] if count else []
+    names = [records[emp_id].get_name() for emp_id in ids]
+    sample = names[0].split()
+
+    def get_ids():
+        for emp_id in ids:
+            store.get(emp_id)
+
+    def find_names():
+        for name in names:
+            store.find(name=name)
+
+    def build_indexes():
+        store.indexes.rebuild(store.records())
+        return store.indexes.names
+
+    timed("search.id", get_ids, per=len(ids))
+    timed("search.index_build", build_indexes, runs=1)
+    timed("search.name_exact", find_names, per=len(names))
+    timed("search.name_prefix", store.search_names, names[0][:len(sample[0]) + 3], "prefix")
+    timed("search.name_contains", store.search_names, sample[-1], "contains")
+    timed("search.name_fuzzy", store.search_names, sample[0][:-1] + " " + " ".join(sample[1:]), "fuzzy")
+
+    pairs = list(records.items())
+    timed("sort.id", ems.sort_pairs_by_id, pairs)
+    timed("sort.salary", ems.sort_pairs_by_salary, pairs)
+    timed("sort.salary_desc", ems.sort_pairs_by_salary, pairs, True)
+    timed("sort.name", ems.sort_pairs_by_name, pairs)
+    timed("sort.position_random", ems.sort_pairs_by_position_random, pairs, ems.ALLOWED_POSITIONS)
+    timed("sort.multi_key", ems.sort_pairs, pairs, [("department", False), ("salary", True), ("name", False)])
+    timed("group.position", ems.group_pairs, pairs, ("position",))
+    timed("group.department_location", ems.group_pairs, pairs, ("department", "location"))
+    timed("salary.top_50_heap", ems.top_pairs_by_salary, pairs, 50)
+    timed("salary.index_build", ems.SalaryIndex, records, runs=1)
+    store.salary_ids()  # builds the store's salary index
+    timed("salary.top_50", store.top_salaries, 50)
+    timed("salary.range", store.salary_range, 80000, 100000)
+    timed("time.index_build", ems.TimeIndex, "updated_at", records, runs=1)
+    store.indexes.times("updated_at")
+    last_month = ems.parse_time_spec("30d", now=ems.parse_timestamp(DATA_EPOCH.isoformat()))
+    timed("time.changed_last_30d", store.time_range, "updated_at", last_month)
+
+    timed("print_table.first_page", quiet_table, "Employees", records)
+    timed("print_table.first_page_ordered", quiet_table, "Employees", records, False, None, store.sorted_ids())
+    if count <= 100000:
+        timed("print_table.all_rows", quiet_table, "Employees", records, False, 0)
+    storage.close()
+    return results
+
+
+def compare(baseline, current, tolerance, noise):
+    """[(size, metric, baseline s, current s, relative change, regressed)] for metrics in both."""
+    scale = current["meta"]["calibration"] / baseline["meta"]["calibration"]
+    rows = []
+    for size, metrics in current["results"].items():
+        for metric, seconds in metrics.items():
+            base = baseline["results"].get(size, {}).get(metric)
+            if base is None:
+                continue
+            expected = base * scale  # the baseline timing, adjusted to this machine's speed
+            change = seconds / expected - 1 if expected else 0.0
+            regressed = change > tolerance and seconds - expected > noise
+            rows.append((size, metric, expected, seconds, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="write this run's results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--noise", type=float, default=0.0005, help="ignore differences below this (seconds)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    current = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rich": bool(ems.rich_enabled()),
+            "numpy": bool(ems.numpy_enabled()),
+            "seed": DEFAULT_SEED,
+            "repeat": args.repeat,
+            "calibration": calibrate(),
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        export_snapshots_to(folder, delay=0)  # save_all_records exports synchronously, inside the timing
+        for count in args.sizes:
+            print(f"Running {count:,} employees ...", flush=True)
+            repeat = 1 if count >= 1000000 else args.repeat
+            current["results"][str(count)] = run_size(count, repeat, folder)
+
+    print()
+    print_row("size / metric", "seconds", widths=(44, 14))
+    for size, metrics in current["results"].items():
+        for metric, seconds in metrics.items():
+            print_row(f"{int(size):,} {metric}", f"{seconds:.6f}", widths=(44, 14))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(current, fh, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(current, fh, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    rows = compare(baseline, current, args.tolerance, args.noise)
+    regressions = [row for row in rows if row[5]]
+    print(f"\nAgainst {args.baseline} (calibrated, tolerance {args.tolerance:.0%}):")
+    print_row("size / metric", "expected", "now", "change", widths=(44, 12, 12, 10))
+    for size, metric, expected, seconds, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print_row(f"{int(size):,} {metric}", f"{expected:.6f}", f"{seconds:.6f}", f"{change:+.0%}{flag}",
+                  widths=(44, 12, 12, 30))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s)")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
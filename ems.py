@@ -32,24 +32,67 @@
 #   - Always run the program from the same folder as the script so the data files are found.
 
 import os
+import atexit
+import bisect
+import heapq
 import re
 import json
+import copy
+import math
+import time
+import collections
 import pickle
-import random
+import struct
+import sys
+import threading
+import functools
+import zlib
+from array import array
 from datetime import datetime
 
-# Rich (coloured output); falls back to plain prints if unavailable
 try:
-    from rich import box
-    from rich.console import Console
-    from rich.table import Table
-    from rich.panel import Panel
-    from rich.text import Text
-    RICH_AVAILABLE = True
-    console = Console()
-except Exception:
-    RICH_AVAILABLE = False
-    console = None
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so keep to one process per data folder
+    fcntl = None
+
+# argparse, csv, random, sqlite3 and mmap are imported inside the functions
+# that need them, so each run pays only for the modules its command uses.
+# Rich (coloured output) and NumPy (fast reports) are optional and imported
+# on first use, so scripted runs that never print a table skip their import
+# cost. Without them the program falls back to plain prints / pure Python.
+RICH_AVAILABLE = None   # None = not checked yet; see rich_enabled()
+console = None
+NUMPY_AVAILABLE = None  # see numpy_enabled()
+np = None
+
+def rich_enabled():
+    """Import rich the first time styled output is needed. False if it isn't installed."""
+    global RICH_AVAILABLE, console, box, Table, Panel, Text
+    if RICH_AVAILABLE is None:
+        try:
+            from rich import box
+            from rich.console import Console
+            from rich.table import Table
+            from rich.panel import Panel
+            from rich.text import Text
+            console = Console()
+            RICH_AVAILABLE = True
+        except Exception:
+            RICH_AVAILABLE = False
+            console = None
+    return RICH_AVAILABLE
+
+def numpy_enabled():
+    """Import numpy the first time a report needs it. False if it isn't installed."""
+    global NUMPY_AVAILABLE, np
+    if NUMPY_AVAILABLE is None:
+        try:
+            import numpy as np
+            NUMPY_AVAILABLE = True
+        except Exception:
+            np = None
+            NUMPY_AVAILABLE = False
+    return NUMPY_AVAILABLE
 
 # Styles for Rich
 RICH_STYLES = {
@@ -74,6 +117,90 @@ RICH_STYLES = {
 PICKLE_FILE = "Current_Employees.pkl"
 JSON_SNAPSHOT_FILE = "Current_Employees.json"
 
+# Storage backend: "pickle" (PICKLE_FILE), "sqlite" (SQLITE_FILE) or "binary"
+# (BINARY_FILE, mmap'd fixed-width records); the last two copy the pickle in once
+STORAGE_BACKEND = "pickle"
+SQLITE_FILE = "Current_Employees.db"
+BINARY_FILE = "Current_Employees.bin"
+
+# Journal mode: add/update/delete append to JOURNAL_FILE instead of rewriting
+# the pickle + JSON snapshot; the log is folded into the pickle (checkpoint)
+# once it passes either threshold below.
+JOURNAL_MODE = False
+JOURNAL_FILE = "Current_Employees.journal"
+JOURNAL_MAX_ENTRIES = 5000
+JOURNAL_MAX_BYTES = 4 * 1024 * 1024
+
+# Change feed: every committed add/update/delete is appended, with a sequence
+# number and before/after images, to <data file>.changes.jsonl. Only the last
+# CHANGE_FEED_KEEP entries are kept: a commit that takes the file a quarter
+# past that drops the older ones (0 = keep everything)
+CHANGE_FEED = True
+CHANGE_FEED_KEEP = 100000
+
+# Commits and ID allocation lock <data file>.lock for a moment; wait this long
+# (seconds) for another process's commit before giving up
+LOCK_TIMEOUT = 10.0
+
+# JSON snapshot: written in the background once changes pause for
+# JSON_SNAPSHOT_DEBOUNCE seconds (0 = write synchronously after every save).
+# Its layout and compression follow JSON_SNAPSHOT_FILE's extension:
+# .json or .jsonl (JSON Lines), optionally + .gz / .bz2 / .xz
+JSON_SNAPSHOT_DEBOUNCE = 1.0
+JSON_SNAPSHOT_COMPACT = False
+# SQLite/binary commits that touch only a few records (see RecordStore.put)
+# still re-export the snapshot, which reads every record back. Set False to
+# leave it to the next full save or `export` when the data is large.
+JSON_SNAPSHOT_AFTER_POINT_WRITES = True
+
+# Pickle: protocol, and compression (None, "gzip", "bz2" or "lzma"). Loading
+# detects the compression from the file header, so older files still load.
+PICKLE_PROTOCOL = 5
+PICKLE_COMPRESSION = None
+
+# Metrics: latency histograms per operation, record/byte/error counters.
+# Off by default (or pass --metrics); when on, written at exit to
+# METRICS_FILE (JSON) and METRICS_PROM_FILE (Prometheus text format).
+# PROFILE_OPERATION (or --profile NAME) runs the next call of that operation
+# under cProfile and saves the stats to PROFILE_FILE.
+METRICS_ENABLED = False
+METRICS_FILE = "ems_metrics.json"
+METRICS_PROM_FILE = "ems_metrics.prom"
+METRICS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)  # seconds
+PROFILE_OPERATION = None
+PROFILE_FILE = "ems_profile.pstats"
+
+# Group-by views: group order per field, "allowed" (the ALLOWED_* order
+# below), "random" (new order every time) or an explicit list of values
+GROUP_ORDER = {"position": "random", "department": "allowed", "location": "allowed"}
+
+# Tables show this many rows per page (0 = no paging)
+TABLE_PAGE_SIZE = 25
+
+# Name search (prefix / contains / fuzzy)
+NAME_SEARCH_MAX_RESULTS = 50
+NAME_SEARCH_TIME_LIMIT = 0.5  # seconds; ranked results found so far are returned
+NAME_FUZZY_MIN_SCORE = 0.35   # Dice similarity of name trigrams (0..1)
+
+# Keep records in memory as SlottedEmployee (no per-object __dict__, interned categories)
+COMPACT_RECORDS = False
+
+# Pinned snapshots (RecordStore.snapshot()) keep numeric IDs 2**SNAPSHOT_BLOCK_BITS
+# to a block; the first write to a block after a pin copies only that block
+SNAPSHOT_BLOCK_BITS = 10
+
+# Bulk import: IDs are reserved this many at a time; rejected rows go to
+# "<import file>.rejects.jsonl" unless another path is given
+IMPORT_ID_BLOCK = 1000
+IMPORT_FIELDS = ("name", "age", "position", "salary", "department", "location", "email")
+
+# Bulk update: the fields one action may set for many employees at once (name
+# and email are unique), and the batch size past which put_many() leaves the
+# salary and time indexes to be rebuilt on next use instead of re-filing every
+# changed record in them
+BULK_SET_FIELDS = ("position", "salary", "department", "location")
+BULK_REINDEX_THRESHOLD = 8000  # measured: re-filing is cheaper below this at 100k and 1M records
+
 ALLOWED_POSITIONS = ("Manager", "Developer", "Designer", "Analyst", "HR")
 ALLOWED_DEPARTMENTS = ("IT", "Design", "Finance", "HR", "Operations")
 ALLOWED_LOCATIONS = ("Melbourne", "Sydney", "Brisbane", "Adelaide", "Perth")
@@ -81,35 +208,67 @@ ALLOWED_LOCATIONS = ("Melbourne", "Sydney", "Brisbane", "Adelaide", "Perth")
 # -----------------------------------------------------------------------------
 # Print helpers
 # -----------------------------------------------------------------------------
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 def now_text():
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+def now_micros():
+    """Current time as integer microseconds since the epoch, the form records store created_at/updated_at in."""
+    return time.time_ns() // 1000
+
+@functools.lru_cache(maxsize=4096)  # records imported or saved together share their second
+def _local_time_text(seconds):
+    return datetime.fromtimestamp(seconds).isoformat(" ")  # TIMESTAMP_FORMAT, about twice as fast as strftime
+
+def format_timestamp(value):
+    """Local-time text for a stored timestamp; None stays None."""
+    if value is None or isinstance(value, str):
+        return value
+    return _local_time_text(value // 1_000_000)
+
+def parse_timestamp(value):
+    """
+    Integer microseconds from a stored or displayed timestamp: an int, digit
+    text, or local-time text such as "2026-01-31 09:00:00" (how files written
+    before integer timestamps hold them). None or "" gives None.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    if text.isdigit():
+        return int(text)
+    moment = datetime.fromisoformat(text)
+    return int(moment.timestamp()) * 1_000_000 + moment.microsecond
 
 def print_title(text):
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.rule(Text(text, style=RICH_STYLES["title"]))
     else:
         print(f"\n==== {text} ====\n")
 
 def print_success(text):
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.print("\n" + text + "\n", style=RICH_STYLES["ok"])
     else:
         print("\n" + text + "\n")
 
 def print_info(text):
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.print(text, style=RICH_STYLES["info"])
     else:
         print(text)
 
 def print_warning(text):
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.print(text, style=RICH_STYLES["warn"])
     else:
         print(f"WARNING: {text}")
 
 def print_error(text):
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.print(text, style=RICH_STYLES["error"])
     else:
         print(f"ERROR: {text}")
@@ -118,7 +277,7 @@ def get_last_modified_text(path):
     if not os.path.exists(path):
         return "n/a"
     try:
-        return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+        return datetime.fromtimestamp(os.path.getmtime(path)).strftime(TIMESTAMP_FORMAT)
     except Exception:
         return "n/a"
 
@@ -131,6 +290,155 @@ def print_last_modified_summary():
         print_info(f"Last modified — JSON: {json_ts}")
     elif os.path.exists(PICKLE_FILE):
         print_info(f"Last modified — Pickle: {pkl_ts}")
+    if snapshot_exporter.pending:
+        print_info("JSON snapshot update queued (written in the background).")
+
+# -----------------------------------------------------------------------------
+# Metrics (operation timings, counters, optional cProfile)
+# -----------------------------------------------------------------------------
+def _prometheus_escape(value):
+    """A label value with backslash, double quote and newline escaped, as the text format requires."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    """
+    Latency histograms per operation plus labelled counters.
+
+    Functions are wrapped with @metrics.timed("operation"); while `enabled`
+    is False the wrapper only checks that flag before calling through, and
+    count() returns at once. An exception escaping a timed call is counted
+    in errors_total{operation=...} and re-raised.
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.enabled = False
+        self.buckets = tuple(buckets)
+        self.profile_operation = None
+        self.profile_file = PROFILE_FILE
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms = {}  # operation -> [count per bucket..., count above the last, sum, max]
+        self._counters = {}    # (name, ((label, value), ...)) -> total
+
+    def enable(self, profile_operation=None):
+        """Start collecting; the metrics files are written at exit."""
+        self.enabled = True
+        if profile_operation:
+            self.profile_operation = profile_operation
+
+    def timed(self, operation):
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                return self.call(operation, fn, *args, **kwargs)
+            return wrapper
+        return decorate
+
+    def call(self, operation, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) and record it under `operation`."""
+        profiler = None
+        if operation == self.profile_operation:
+            import cProfile
+            self.profile_operation = None  # one call is enough
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            self.count("errors_total", operation=operation)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.profile_file)
+            self.observe(operation, elapsed)
+
+    def observe(self, operation, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(operation)
+            if hist is None:
+                hist = self._histograms[operation] = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+            hist[bisect.bisect_left(self.buckets, seconds)] += 1
+            hist[-2] += seconds
+            if seconds > hist[-1]:
+                hist[-1] = seconds
+
+    def count(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        """Everything collected so far as a JSON-ready dict (bucket counts are cumulative)."""
+        with self._lock:
+            histograms = {op: list(hist) for op, hist in self._histograms.items()}
+            counters = dict(self._counters)
+        operations = {}
+        for operation, hist in sorted(histograms.items()):
+            total = sum(hist[:-2])
+            cumulative = 0
+            buckets = {}
+            for bound, n in zip(self.buckets + (math.inf,), hist[:-2]):
+                cumulative += n
+                buckets["+Inf" if bound == math.inf else repr(bound)] = cumulative
+            operations[operation] = {"count": total, "sum": hist[-2], "mean": hist[-2] / total if total else 0.0,
+                                     "max": hist[-1], "buckets": buckets}
+        counter_rows = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(counters.items())]
+        return {"started": self.started, "uptime": time.time() - self.started,
+                "operations": operations, "counters": counter_rows}
+
+    def prometheus_text(self):
+        """The snapshot in Prometheus text exposition format."""
+        def label_text(labels):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{_prometheus_escape(v)}"' for k, v in labels.items()) + "}"
+
+        data = self.snapshot()
+        lines = ["# HELP ems_operation_seconds Time taken by each operation.",
+                 "# TYPE ems_operation_seconds histogram"]
+        for operation, info in data["operations"].items():
+            for bound, n in info["buckets"].items():
+                lines.append(f'ems_operation_seconds_bucket{{operation="{operation}",le="{bound}"}} {n}')
+            lines.append(f'ems_operation_seconds_sum{{operation="{operation}"}} {info["sum"]:.9f}')
+            lines.append(f'ems_operation_seconds_count{{operation="{operation}"}} {info["count"]}')
+        typed = set()
+        for row in data["counters"]:
+            metric = "ems_" + row["name"]
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{label_text(row['labels'])} {row['value']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, json_file=None, prom_file=None):
+        """Write the JSON and Prometheus files (each via a temp file, replaced atomically)."""
+        if not self.enabled:
+            return
+        outputs = ((json_file or METRICS_FILE, json.dumps(self.snapshot(), indent=2)),
+                   (prom_file or METRICS_PROM_FILE, self.prometheus_text()))
+        for path, text in outputs:
+            tmp_file = path + ".tmp"
+            try:
+                with open(tmp_file, "w", encoding="utf-8") as fh:
+                    fh.write(text)
+                os.replace(tmp_file, path)
+            except OSError as e:
+                print_warning(f"Could not write {path}: {e}")
+
+metrics = Metrics()
+atexit.register(metrics.dump)  # registered first so it runs last, after the exit-time snapshot export
+if METRICS_ENABLED or PROFILE_OPERATION:
+    metrics.enable(PROFILE_OPERATION)
 
 # -----------------------------------------------------------------------------
 # Validation
@@ -214,6 +522,8 @@ class Validation:
 # Employee model
 # -----------------------------------------------------------------------------
 class Employee:
+    version = 1  # records pickled before versioning count as version 1
+
     def __init__(self, name, age, position, salary, department, location, email, employee_id):
         self.__name = name
         self.__age = age
@@ -223,8 +533,9 @@ class Employee:
         self.location = location
         self.email = email
         self.employee_id = employee_id
-        self.created_at = now_text()
+        self.created_at = now_micros()
         self.updated_at = None
+        self.version = 0  # not stored yet; RecordStore.put() bumps it on every save
 
     def get_name(self): return self.__name
     def get_age(self): return self.__age
@@ -235,7 +546,72 @@ class Employee:
     def set_position(self, v): self.__position = v
     def set_salary(self, v): self.__salary = float(v)
 
-    def to_dict(self):
+    def to_dict(self, formatted=True):
+        """Field dict; timestamps as text unless formatted=False (integer microseconds)."""
+        return {
+            "name": self.__name,
+            "age": self.__age,
+            "position": self.__position,
+            "salary": self.__salary,
+            "department": self.department,
+            "location": self.location,
+            "email": self.email,
+            "created_at": format_timestamp(self.created_at) if formatted else self.created_at,
+            "updated_at": format_timestamp(self.updated_at) if formatted else self.updated_at,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_dict(cls, data, employee_id):
+        emp = cls(data["name"], data["age"], data["position"], float(data["salary"]),
+                  data["department"], data["location"], data["email"], employee_id)
+        emp.created_at = parse_timestamp(data.get("created_at")) or emp.created_at
+        emp.updated_at = parse_timestamp(data.get("updated_at"))
+        emp.version = int(data.get("version", 1))
+        return emp
+
+    @classmethod
+    def from_employee(cls, emp, employee_id=None):
+        if employee_id is None:
+            employee_id = getattr(emp, "employee_id", None)
+        return cls.from_dict(emp.to_dict(formatted=False), employee_id)
+
+# -----------------------------------------------------------------------------
+# Compact record layouts (slotted objects and column arrays)
+# -----------------------------------------------------------------------------
+class SlottedEmployee:
+    """
+    Same API as Employee, but with __slots__ instead of a per-instance
+    __dict__, and with position/department/location interned so equal
+    values share one string object.
+    """
+    __slots__ = ("__name", "__age", "__position", "__salary", "department", "location",
+                 "email", "employee_id", "created_at", "updated_at", "version")
+
+    def __init__(self, name, age, position, salary, department, location, email, employee_id):
+        self.__name = name
+        self.__age = age
+        self.__position = sys.intern(position)
+        self.__salary = salary
+        self.department = sys.intern(department)
+        self.location = sys.intern(location)
+        self.email = email
+        self.employee_id = employee_id
+        self.created_at = now_micros()
+        self.updated_at = None
+        self.version = 0  # not stored yet; RecordStore.put() bumps it on every save
+
+    def get_name(self): return self.__name
+    def get_age(self): return self.__age
+    def get_position(self): return self.__position
+    def get_salary(self): return self.__salary
+    def set_name(self, v): self.__name = v
+    def set_age(self, v): self.__age = v
+    def set_position(self, v): self.__position = sys.intern(v)
+    def set_salary(self, v): self.__salary = float(v)
+
+    def to_dict(self, formatted=True):
+        """Field dict; timestamps as text unless formatted=False (integer microseconds)."""
         return {
             "name": self.__name,
             "age": self.__age,
@@ -244,111 +620,2856 @@ class Employee:
             "department": self.department,
             "location": self.location,
             "email": self.email,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
+            "created_at": format_timestamp(self.created_at) if formatted else self.created_at,
+            "updated_at": format_timestamp(self.updated_at) if formatted else self.updated_at,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_dict(cls, data, employee_id):
+        emp = cls(data["name"], data["age"], data["position"], float(data["salary"]),
+                  data["department"], data["location"], data["email"], employee_id)
+        emp.created_at = parse_timestamp(data.get("created_at")) or emp.created_at
+        emp.updated_at = parse_timestamp(data.get("updated_at"))
+        emp.version = int(data.get("version", 1))
+        return emp
+
+    @classmethod
+    def from_employee(cls, emp, employee_id=None):
+        if employee_id is None:
+            employee_id = getattr(emp, "employee_id", None)
+        return cls.from_dict(emp.to_dict(formatted=False), employee_id)
+
+def upgrade_timestamps(records_dict):
+    """
+    Convert text timestamps (pickles written before they were integers) in
+    place. A pickle is written in one go, so if its first record has integer
+    timestamps they all do and nothing else is looked at.
+    """
+    for emp in records_dict.values():
+        if not isinstance(emp.created_at, str) and not isinstance(emp.updated_at, str):
+            return records_dict
+        break
+    for emp in records_dict.values():
+        emp.created_at = parse_timestamp(emp.created_at)
+        emp.updated_at = parse_timestamp(emp.updated_at)
+    return records_dict
+
+def compact_records(records_dict):
+    """Convert every record in records_dict to SlottedEmployee (in place)."""
+    for emp_id, emp in records_dict.items():
+        if not isinstance(emp, SlottedEmployee):
+            records_dict[emp_id] = SlottedEmployee.from_employee(emp, emp_id)
+    return records_dict
+
+# Categorical fields stored as 1-byte codes by EmployeeColumns
+CATEGORY_VALUES = {
+    "position": ALLOWED_POSITIONS,
+    "department": ALLOWED_DEPARTMENTS,
+    "location": ALLOWED_LOCATIONS,
+}
+
+class StringColumn:
+    """
+    A list of strings packed as UTF-8 into one bytearray plus an offsets
+    array, so each value costs its bytes plus 8 (not a full str object).
+    Overwritten values leave their old bytes behind until compacted.
+    """
+
+    def __init__(self):
+        self.heap = bytearray()
+        self.starts = array("Q")
+        self.ends = array("Q")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        return self.heap[self.starts[index]:self.ends[index]].decode("utf-8")
+
+    def __setitem__(self, index, value):
+        start = len(self.heap)
+        self.heap += value.encode("utf-8")
+        self.starts[index] = start
+        self.ends[index] = len(self.heap)
+
+    def append(self, value):
+        start = len(self.heap)
+        self.heap += value.encode("utf-8")
+        self.starts.append(start)
+        self.ends.append(len(self.heap))
+
+    def pop(self):
+        self.starts.pop()
+        self.ends.pop()
+
+    def move(self, src, dst):
+        self.starts[dst] = self.starts[src]
+        self.ends[dst] = self.ends[src]
+
+class EmployeeColumns:
+    """
+    Column store: one array per field instead of one object per employee.
+
+    ages/salaries live in typed `array` buffers, position/department/location
+    are small integer codes into per-field value tables, names and emails
+    are packed into StringColumn heaps and timestamps are 8-byte integers
+    (updated_at 0 when the record was never edited). row()/get() return a ColumnEmployee
+    view with the usual Employee getters and setters, which read and write
+    the columns directly.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.names = StringColumn()
+        self.emails = StringColumn()
+        self.created = array("q")
+        self.updated = array("q")
+        self.versions = array("I")
+        self.ages = array("B")
+        self.salaries = array("d")
+        self.codes = {field: array("B") for field in CATEGORY_VALUES}
+        self.values = {field: list(allowed) for field, allowed in CATEGORY_VALUES.items()}
+        self._code_of = {field: {v: i for i, v in enumerate(allowed)}
+                         for field, allowed in CATEGORY_VALUES.items()}
+        self._row_of = {}
+
+    @classmethod
+    def from_records(cls, records_dict):
+        cols = cls()
+        for emp_id, emp in records_dict.items():
+            cols.append(emp_id, emp)
+        return cols
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, emp_id):
+        return emp_id in self._row_of
+
+    def encode(self, field, value):
+        code = self._code_of[field].get(value)
+        if code is None:
+            # Values outside ALLOWED_* (older data) get their own code
+            if len(self.values[field]) >= 256:
+                raise ValueError(f"Too many distinct {field} values for a 1-byte code")
+            code = len(self.values[field])
+            self.values[field].append(value)
+            self._code_of[field][value] = code
+        return code
+
+    def decode(self, field, code):
+        return self.values[field][code]
+
+    def append_row(self, emp_id, name, age, position, salary, department, location, email,
+                   created_at=None, updated_at=None, version=1):
+        if emp_id in self._row_of:
+            raise KeyError(f"Duplicate employee ID: {emp_id}")
+        self._row_of[emp_id] = len(self.ids)
+        self.ids.append(str(emp_id))
+        self.names.append(name)
+        self.emails.append(email)
+        self.created.append(parse_timestamp(created_at) or now_micros())
+        self.updated.append(parse_timestamp(updated_at) or 0)
+        self.versions.append(int(version))
+        self.ages.append(int(age))
+        self.salaries.append(float(salary))
+        self.codes["position"].append(self.encode("position", position))
+        self.codes["department"].append(self.encode("department", department))
+        self.codes["location"].append(self.encode("location", location))
+
+    def append(self, emp_id, emp):
+        self.append_row(emp_id, emp.get_name(), emp.get_age(), emp.get_position(),
+                        emp.get_salary(), emp.department, emp.location, emp.email,
+                        emp.created_at, emp.updated_at, emp.version)
+
+    def remove(self, emp_id):
+        """Delete a row by moving the last row into its slot (O(1), changes row order)."""
+        row = self._row_of.pop(emp_id)
+        last = len(self.ids) - 1
+        columns = [self.ids, self.created, self.updated, self.versions, self.ages, self.salaries] \
+            + list(self.codes.values())
+        if row != last:
+            for column in columns:
+                column[row] = column[last]
+            self.names.move(last, row)
+            self.emails.move(last, row)
+            self._row_of[self.ids[row]] = row
+        for column in columns:
+            column.pop()
+        self.names.pop()
+        self.emails.pop()
+
+    def row(self, index):
+        return ColumnEmployee(self, index)
+
+    def get(self, emp_id):
+        row = self._row_of.get(emp_id)
+        return None if row is None else ColumnEmployee(self, row)
+
+    def items(self):
+        for index, emp_id in enumerate(self.ids):
+            yield emp_id, ColumnEmployee(self, index)
+
+    def to_records(self, employee_class=Employee):
+        return {emp_id: employee_class.from_employee(view, emp_id) for emp_id, view in self.items()}
+
+class ColumnEmployee:
+    """Employee-shaped view of one EmployeeColumns row (valid until rows are removed)."""
+    __slots__ = ("_cols", "_row")
+
+    def __init__(self, cols, row):
+        self._cols = cols
+        self._row = row
+
+    def get_name(self): return self._cols.names[self._row]
+    def get_age(self): return self._cols.ages[self._row]
+    def get_position(self): return self._cols.decode("position", self._cols.codes["position"][self._row])
+    def get_salary(self): return self._cols.salaries[self._row]
+    def set_name(self, v): self._cols.names[self._row] = v
+    def set_age(self, v): self._cols.ages[self._row] = int(v)
+    def set_position(self, v): self._cols.codes["position"][self._row] = self._cols.encode("position", v)
+    def set_salary(self, v): self._cols.salaries[self._row] = float(v)
+
+    @property
+    def employee_id(self): return self._cols.ids[self._row]
+
+    @property
+    def department(self): return self._cols.decode("department", self._cols.codes["department"][self._row])
+
+    @department.setter
+    def department(self, v): self._cols.codes["department"][self._row] = self._cols.encode("department", v)
+
+    @property
+    def location(self): return self._cols.decode("location", self._cols.codes["location"][self._row])
+
+    @location.setter
+    def location(self, v): self._cols.codes["location"][self._row] = self._cols.encode("location", v)
+
+    @property
+    def email(self): return self._cols.emails[self._row]
+
+    @email.setter
+    def email(self, v): self._cols.emails[self._row] = v
+
+    @property
+    def created_at(self): return self._cols.created[self._row]
+
+    @created_at.setter
+    def created_at(self, v): self._cols.created[self._row] = v
+
+    @property
+    def updated_at(self): return self._cols.updated[self._row] or None
+
+    @updated_at.setter
+    def updated_at(self, v): self._cols.updated[self._row] = v or 0
+
+    @property
+    def version(self): return self._cols.versions[self._row]
+
+    @version.setter
+    def version(self, v): self._cols.versions[self._row] = v
+
+    def to_dict(self, formatted=True):
+        return {
+            "name": self.get_name(),
+            "age": self.get_age(),
+            "position": self.get_position(),
+            "salary": self.get_salary(),
+            "department": self.department,
+            "location": self.location,
+            "email": self.email,
+            "created_at": format_timestamp(self.created_at) if formatted else self.created_at,
+            "updated_at": format_timestamp(self.updated_at) if formatted else self.updated_at,
+            "version": self.version,
         }
 
 # -----------------------------------------------------------------------------
-# Simple sorting helpers (no lambdas)
+# Sorting engine (no lambdas)
 # -----------------------------------------------------------------------------
+def id_sort_key(emp_id):
+    """Numeric IDs sort by value ('999' < '1000'); anything else sorts after them as text."""
+    text = str(emp_id)
+    if text.isdigit():
+        return (0, int(text), text)
+    return (1, 0, text)
+
+def _key_id(pair): return id_sort_key(pair[0])
+def _key_name(pair): return Validation.normalize(pair[1].get_name())
+def _key_age(pair): return int(pair[1].get_age())
+def _key_position(pair): return str(pair[1].get_position())
+def _key_salary(pair): return float(pair[1].get_salary())
+def _key_department(pair): return str(pair[1].department)
+def _key_location(pair): return str(pair[1].location)
+def _key_email(pair): return Validation.normalize(pair[1].email)
+def _key_created(pair): return pair[1].created_at or 0
+def _key_updated(pair): return pair[1].updated_at or 0
+
+# Field name -> key extractor used by sort_pairs()
+SORT_KEYS = {
+    "id": _key_id,
+    "name": _key_name,
+    "age": _key_age,
+    "position": _key_position,
+    "salary": _key_salary,
+    "department": _key_department,
+    "location": _key_location,
+    "email": _key_email,
+    "created_at": _key_created,
+    "updated_at": _key_updated,
+}
+
+@metrics.timed("sort")
+def sort_pairs(pairs, keys):
+    """
+    Sort a list of (id, Employee) on several keys in one go.
+    keys is a list of (field, descending) tuples, e.g.
+    [("department", False), ("salary", True), ("name", False)].
+    Each key is computed once per record (not once per comparison) and
+    ties are always broken by ID ascending, so the result is deterministic.
+    """
+    result = list(pairs)
+    if len(result) < 2:
+        return result
+
+    # Start from ID order, then apply the keys from least to most significant.
+    # Python's sort is stable (also with reverse=True), so earlier orderings
+    # survive as tie-breaks for the later, more significant keys.
+    order = list(range(len(result)))
+    id_column = [_key_id(pair) for pair in result]
+    order.sort(key=id_column.__getitem__)
+    for field, descending in reversed(list(keys)):
+        if field not in SORT_KEYS:
+            raise ValueError(f"Unknown sort field: {field}")
+        if field == "id":
+            column = id_column
+        else:
+            extract = SORT_KEYS[field]
+            column = [extract(pair) for pair in result]
+        order.sort(key=column.__getitem__, reverse=bool(descending))
+    return [result[i] for i in order]
+
 def sort_pairs_by_id(pairs):
-    """Bubble-sort a list of (id, Employee) by id ascending."""
-    result = pairs[:]
-    n = len(result)
-    for i in range(n - 1):
-        for j in range(0, n - i - 1):
-            if result[j][0] > result[j + 1][0]:
-                result[j], result[j + 1] = result[j + 1], result[j]
-    return result
+    """Sort a list of (id, Employee) by id ascending."""
+    return sort_pairs(pairs, [("id", False)])
+
+def sort_pairs_by_salary(pairs, descending=False):
+    """Sort by salary (ties by id)."""
+    return sort_pairs(pairs, [("salary", descending)])
+
+def sort_pairs_by_name(pairs):
+    """Sort by name (case-insensitive, ties by id)."""
+    return sort_pairs(pairs, [("name", False)])
+
+def top_pairs_by_salary(pairs, n, highest=True):
+    """
+    The n highest (or lowest) paid (id, Employee) pairs, best first, ties by ID.
+    A bounded heap: O(len(pairs) log n), without sorting everything.
+    """
+    return heapq.nsmallest(n, pairs, key=_key_top_salary if highest else _key_bottom_salary)
+
+def _key_top_salary(pair): return (-float(pair[1].get_salary()), id_sort_key(pair[0]))
+def _key_bottom_salary(pair): return (float(pair[1].get_salary()), id_sort_key(pair[0]))
+
+def group_order(field, order=None):
+    """
+    The group order for one category field: order may be "allowed" (the
+    ALLOWED_* order), "random" (shuffled each call) or a sequence of values.
+    None uses GROUP_ORDER.
+    """
+    if field not in CATEGORY_VALUES:
+        raise ValueError(f"Cannot group by: {field}")
+    order = GROUP_ORDER.get(field, "allowed") if order is None else order
+    if order == "allowed":
+        return list(CATEGORY_VALUES[field])
+    if order == "random":
+        import random
+        values = list(CATEGORY_VALUES[field])
+        random.shuffle(values)
+        return values
+    return list(order)
+
+def group_pairs(pairs, fields, orders=None, keys=None):
+    """
+    Bucket (id, Employee) pairs by one or more category fields in one pass.
+
+    Each field's values are given small integer codes in group order (values
+    outside that order share one extra code), and a record's bucket is the
+    mixed-radix number made of its codes, so grouping is a list index per
+    record rather than a sort or string comparison. Buckets come out in
+    group order with the first field most significant; a bucket of values
+    outside the order is split by actual value, first seen first. Within a
+    group, records keep their input order, or are sorted by `keys` (as for
+    sort_pairs()).
+
+    orders: {field: "allowed" / "random" / sequence}, see group_order().
+    Returns ([(values tuple, [pairs]), ...] without empty groups, {field: order used}).
+    """
+    fields = tuple(fields)
+    orders = orders or {}
+    used = {field: group_order(field, orders.get(field)) for field in fields}
+    extract = [SORT_KEYS[field] for field in fields]
+    codes = [{value: code for code, value in enumerate(used[field])} for field in fields]
+    radices = [len(used[field]) + 1 for field in fields]  # the last code is "anything else"
+    bucket_count = 1
+    for radix in radices:
+        bucket_count *= radix
+    buckets = [[] for _ in range(bucket_count)]
+
+    if len(fields) == 1:
+        key, code_of, other = extract[0], codes[0], radices[0] - 1
+        for pair in pairs:
+            buckets[code_of.get(key(pair), other)].append(pair)
+    else:
+        steps = list(zip(extract, codes, radices))
+        for pair in pairs:
+            index = 0
+            for key, code_of, radix in steps:
+                index = index * radix + code_of.get(key(pair), radix - 1)
+            buckets[index].append(pair)
+
+    groups = []
+    for index, bucket in enumerate(buckets):
+        if not bucket:
+            continue
+        values = []
+        for field, radix in zip(reversed(fields), reversed(radices)):
+            index, code = divmod(index, radix)
+            values.append(used[field][code] if code < radix - 1 else None)
+        values.reverse()
+        if None in values:
+            split = {}  # values outside the group order, kept apart per actual value
+            for pair in bucket:
+                split.setdefault(tuple(key(pair) for key in extract), []).append(pair)
+            groups.extend(split.items())
+        else:
+            groups.append((tuple(values), bucket))
+    if keys:
+        groups = [(values, sort_pairs(bucket, keys)) for values, bucket in groups]
+    return groups, used
+
+def sort_pairs_by_position_random(pairs, allowed_positions):
+    """
+    Group by a randomised order of positions; inside each group sort by name.
+    Unknown positions go last. Returns (sorted_pairs, order_used).
+    """
+    import random
+    positions = list(allowed_positions)
+    random.shuffle(positions)
+    # Name order first; the bucket pass keeps that order inside each group
+    groups, _ = group_pairs(sort_pairs_by_name(pairs), ("position",), {"position": positions})
+    return [pair for _, bucket in groups for pair in bucket], positions
+
+# -----------------------------------------------------------------------------
+# Payroll and headcount reports
+# -----------------------------------------------------------------------------
+REPORT_GROUP_FIELDS = ("department", "location", "position")
+REPORT_PERCENTILES = (25, 50, 75, 90)
+
+def report_columns(source, group_by):
+    """
+    (codes, salaries, labels) for a report: codes is an array('B') of group
+    codes, salaries an array('d'), labels maps code -> group name.
+    source is a {id: Employee} dict or an EmployeeColumns (used as-is).
+    """
+    if group_by not in CATEGORY_VALUES:
+        raise ValueError(f"Cannot group by: {group_by}")
+    if isinstance(source, EmployeeColumns):
+        return source.codes[group_by], source.salaries, list(source.values[group_by])
+    cols = EmployeeColumns()
+    encode = cols.encode
+    emps = list(source.values())
+    if group_by == "position":
+        values = [emp.get_position() for emp in emps]
+    elif group_by == "department":
+        values = [emp.department for emp in emps]
+    else:
+        values = [emp.location for emp in emps]
+    codes = array("B", [encode(group_by, value) for value in values])
+    salaries = array("d", [float(emp.get_salary()) for emp in emps])
+    return codes, salaries, list(cols.values[group_by])
+
+def percentile_of_sorted(values, pct):
+    """Linear-interpolated percentile of an already sorted sequence (NumPy's default method)."""
+    n = len(values)
+    if n == 0:
+        return 0.0
+    pos = (n - 1) * pct / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, n - 1)
+    return float(values[lo] + (values[hi] - values[lo]) * (pos - lo))
+
+def _report_row(label, count, total, ordered):
+    row = {
+        "group": label,
+        "count": int(count),
+        "total": float(total),
+        "mean": float(total) / int(count),
+        "min": float(ordered[0]),
+        "max": float(ordered[-1]),
+    }
+    for pct in REPORT_PERCENTILES:
+        row["p" + str(pct)] = percentile_of_sorted(ordered, pct)
+    row["median"] = percentile_of_sorted(ordered, 50)
+    return row
+
+def _grouped_rows_numpy(codes, salaries, labels):
+    code_arr = np.frombuffer(codes, dtype=np.uint8) if len(codes) else np.zeros(0, dtype=np.uint8)
+    sal_arr = np.frombuffer(salaries, dtype=np.float64) if len(salaries) else np.zeros(0)
+    order = np.lexsort((sal_arr, code_arr))  # by group, then salary
+    sorted_sal = sal_arr[order]
+    counts = np.bincount(code_arr, minlength=len(labels))
+    totals = np.bincount(code_arr, weights=sal_arr, minlength=len(labels))
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    rows = []
+    for code, label in enumerate(labels):
+        if counts[code]:
+            segment = sorted_sal[bounds[code]:bounds[code + 1]]
+            rows.append(_report_row(label, counts[code], totals[code], segment))
+    overall = np.sort(sal_arr)
+    return rows, _report_row("All", len(overall), overall.sum(), overall) if len(overall) else None
+
+def _grouped_rows_python(codes, salaries, labels):
+    groups = [[] for _ in labels]
+    for code, salary in zip(codes, salaries):
+        groups[code].append(salary)
+    rows = []
+    for code, label in enumerate(labels):
+        if groups[code]:
+            groups[code].sort()
+            rows.append(_report_row(label, len(groups[code]), math.fsum(groups[code]), groups[code]))
+    overall = sorted(salaries)
+    return rows, _report_row("All", len(overall), math.fsum(overall), overall) if overall else None
+
+@metrics.timed("report")
+def payroll_report(source, group_by="department", use_numpy=None):
+    """
+    Salary aggregates per group: count (headcount), total, mean, median,
+    min, max and REPORT_PERCENTILES, plus an "All" row at the end.
+    Uses NumPy when it is installed, otherwise the same maths in pure Python.
+    """
+    if use_numpy is None or use_numpy:
+        use_numpy = numpy_enabled()
+    codes, salaries, labels = report_columns(source, group_by)
+    if use_numpy:
+        rows, overall = _grouped_rows_numpy(codes, salaries, labels)
+    else:
+        rows, overall = _grouped_rows_python(codes, salaries, labels)
+    if overall is not None:
+        rows.append(overall)
+    return rows
+
+# -----------------------------------------------------------------------------
+# Persistence (pluggable storage + JSON snapshot)
+# -----------------------------------------------------------------------------
+# A storage backend provides:
+#   paths()                       files whose (mtime, size) reveal outside changes
+#   load()                        -> {id: Employee}
+#   save_all(records)             replace everything
+#   apply_changes(records, changes)  persist {id: Employee or None (deleted)}
+#   has_records()                 cheap emptiness check without loading
+#
+# Snapshot files (the pickle, the JSON snapshot, exports and backups) go
+# through write_snapshot() / read_snapshot(): pickle, JSON or JSON Lines,
+# each optionally compressed with gzip, bz2 or lzma.
+SNAPSHOT_CODECS = {  # name -> (magic bytes at the start of the file, file extension)
+    "gzip": (b"\x1f\x8b", ".gz"),
+    "bz2": (b"BZh", ".bz2"),
+    "lzma": (b"\xfd7zXZ\x00", ".xz"),
+}
+SNAPSHOT_FORMATS = {".pkl": "pickle", ".pickle": "pickle", ".json": "json",
+                    ".jsonl": "jsonl", ".ndjson": "jsonl"}
+SMALL_PICKLE_SIZE = 256  # any file holding a record is bigger; an empty dict is smaller, compressed or not
+
+def snapshot_kind(path):
+    """(format or None, compression or None) from the file name, e.g. 'x.jsonl.gz' -> ('jsonl', 'gzip')."""
+    stem = path
+    compression = None
+    for name, (_, ext) in SNAPSHOT_CODECS.items():
+        if stem.endswith(ext):
+            compression = name
+            stem = stem[:-len(ext)]
+            break
+    return SNAPSHOT_FORMATS.get(os.path.splitext(stem)[1].lower()), compression
+
+def _codec_stream(raw, compression, mode):
+    """Wrap an open binary file in a (de)compressor. The codec modules are imported on first use."""
+    if compression == "gzip":
+        import gzip
+        return gzip.GzipFile(fileobj=raw, mode=mode, compresslevel=6)
+    if compression == "bz2":
+        import bz2
+        return bz2.BZ2File(raw, mode)
+    if compression == "lzma":
+        import lzma
+        return lzma.LZMAFile(raw, mode)
+    raise ValueError(f"Unknown compression: {compression}")
+
+def _jsonl_chunks(items):
+    dumps = json.dumps
+    for emp_id, emp in items:
+        record = {"id": str(emp_id)}
+        record.update(emp.to_dict())
+        yield dumps(record, separators=(",", ":")) + "\n"
+
+class RecordUnpickler(pickle.Unpickler):
+    """
+    Finds the record classes in this module whichever name pickled them: a
+    pickle written by `python ems.py` refers to __main__.Employee, which
+    would not resolve when the file is loaded by a script importing ems.
+    """
+    RECORD_MODULES = ("__main__", "ems", __name__)
+    RECORD_CLASSES = ("Employee", "SlottedEmployee")
+
+    def find_class(self, module, name):
+        if module in self.RECORD_MODULES and name in self.RECORD_CLASSES:
+            return globals()[name]
+        return super().find_class(module, name)
+
+def write_snapshot(records_dict, path, fmt=None, compression=None, compact=JSON_SNAPSHOT_COMPACT):
+    """
+    Write all records to path in one go: via a temp file that is fsynced and
+    then swapped in, so readers never see a partial file. fmt ("pickle",
+    "json", "jsonl") and compression default to what the file name says
+    (JSON, uncompressed if it says nothing). Returns the bytes written.
+    """
+    name_fmt, name_compression = snapshot_kind(path)
+    fmt = fmt or name_fmt or "json"
+    compression = name_compression if compression is None else compression or None
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "wb") as raw:
+        out = _codec_stream(raw, compression, "wb") if compression else raw
+        if fmt == "pickle":
+            pickle.dump(records_dict, out, protocol=PICKLE_PROTOCOL)
+        else:
+            items = list(records_dict.items())
+            chunks = _jsonl_chunks(items) if fmt == "jsonl" else _json_snapshot_chunks(items, compact)
+            write = out.write
+            for chunk in chunks:
+                write(chunk.encode("utf-8"))
+        if out is not raw:
+            out.close()  # flushes the compressor; raw stays open
+        raw.flush()
+        os.fsync(raw.fileno())
+        size = raw.tell()
+    os.replace(tmp_file, path)
+    return size
+
+def read_snapshot(path, fmt=None):
+    """
+    {id: Employee} from a file written by write_snapshot(). Compression is
+    detected from the header; the format from fmt, the file name, or the
+    first bytes (pickle opcode, a JSON object, or a JSON Lines record).
+    """
+    with open(path, "rb") as raw:
+        head = raw.peek(8)[:8]
+        compression = next((name for name, (magic, _) in SNAPSHOT_CODECS.items() if head.startswith(magic)), None)
+        src = _codec_stream(raw, compression, "rb") if compression else raw
+        fmt = fmt or snapshot_kind(path)[0]
+        if fmt is None:
+            first = src.peek(2)[:2]
+            fmt = "pickle" if first[:1] == b"\x80" else "jsonl" if first == b'{"' else "json"
+        if fmt == "pickle":
+            data = RecordUnpickler(src).load()
+            return upgrade_timestamps(data) if isinstance(data, dict) else {}
+        if fmt == "jsonl":
+            records_dict = {}
+            for line in src:
+                if line.strip():
+                    record = json.loads(line)
+                    emp_id = str(record.pop("id"))
+                    records_dict[emp_id] = Employee.from_dict(record, emp_id)
+            return records_dict
+        data = json.load(src)
+        return {str(emp_id): Employee.from_dict(record, str(emp_id)) for emp_id, record in data.items()}
+
+class PickleStorage:
+    """All records in one pickle file; every change rewrites the whole file."""
+    name = "pickle"
+
+    def __init__(self, pickle_file=PICKLE_FILE):
+        self.pickle_file = pickle_file
+
+    def paths(self):
+        return (self.pickle_file,)
+
+    def load(self):
+        if not os.path.exists(self.pickle_file):
+            return {}
+        try:
+            return read_snapshot(self.pickle_file, "pickle")
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return {}
+
+    def save_all(self, records_dict):
+        # Written next to the target and swapped in, so a crash never leaves a half-written pickle
+        size = write_snapshot(records_dict, self.pickle_file, "pickle", PICKLE_COMPRESSION or "")
+        metrics.count("bytes_written_total", size, file="pickle")
+
+    def apply_changes(self, records_dict, changes):
+        self.save_all(records_dict)
+
+    def has_records(self):
+        """Answered from the file size; only a file small enough to be an empty dict is read."""
+        try:
+            size = os.path.getsize(self.pickle_file)
+        except OSError:
+            return False
+        return size > SMALL_PICKLE_SIZE or (size > 0 and bool(self.load()))
+
+    def close(self):
+        pass
+
+def open_storage(backend=None):
+    backend = backend or STORAGE_BACKEND
+    if backend == "pickle":
+        return PickleStorage()
+    if backend == "sqlite":
+        return SqliteStorage()
+    if backend == "binary":
+        return BinaryStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+@metrics.timed("load")
+def load_all_records(storage=None):
+    storage = storage or open_storage()
+    records_dict = storage.load()
+    metrics.count("records_loaded_total", len(records_dict), backend=storage.name)
+    return records_dict
+
+def _json_snapshot_chunks(items, compact):
+    """Yield the snapshot text piece by piece, one record at a time."""
+    dumps = json.dumps
+    if not items:
+        yield "{}"
+        return
+    yield "{\n"
+    last = len(items) - 1
+    for n, (emp_id, emp) in enumerate(items):
+        record = emp.to_dict()
+        if compact:
+            body = dumps(record, separators=(",", ":"))
+            yield dumps(str(emp_id)) + ":" + body
+        else:
+            # Same layout as json.dump(..., indent=2) on the whole dict
+            fields = ",\n".join(f"    {dumps(k)}: {dumps(v)}" for k, v in record.items())
+            yield f"  {dumps(str(emp_id))}: {{\n{fields}\n  }}"
+        yield ",\n" if n != last else "\n"
+    yield "}"
+
+@metrics.timed("export_json")
+def export_json_snapshot(records_dict, json_file=JSON_SNAPSHOT_FILE, compact=JSON_SNAPSHOT_COMPACT):
+    """
+    Stream every record to json_file with constant extra memory, via a temp
+    file that replaces the target atomically (readers never see a partial file).
+    A .jsonl name writes JSON Lines; .gz / .bz2 / .xz compress.
+    """
+    try:
+        fmt = "jsonl" if snapshot_kind(json_file)[0] == "jsonl" else "json"
+        size = write_snapshot(records_dict, json_file, fmt, compact=compact)
+        metrics.count("bytes_written_total", size, file="json")
+    except Exception as e:
+        metrics.count("errors_total", operation="export_json")
+        print_warning(f"Snapshot export failed: {e}")
+
+class SnapshotExporter:
+    """
+    Debounced, background JSON snapshot writer.
+
+    schedule() only records which dict to export (or a function returning
+    one, called when the export runs) and returns immediately; a
+    worker thread writes the snapshot once no new schedule() call has come in
+    for `delay` seconds, so a burst of changes produces one export. flush()
+    writes any pending snapshot right away (used at exit).
+    """
+
+    def __init__(self, json_file=JSON_SNAPSHOT_FILE, delay=JSON_SNAPSHOT_DEBOUNCE):
+        self.json_file = json_file
+        self.delay = delay
+        self.exports = 0
+        self._cond = threading.Condition()
+        self._pending = None
+        self._due = 0.0
+        self._busy = False
+        self._thread = None
+
+    @property
+    def pending(self):
+        return self._pending is not None or self._busy
+
+    def schedule(self, records_dict):
+        if self.delay <= 0:
+            self._export(records_dict)
+            return
+        with self._cond:
+            self._pending = records_dict
+            self._due = time.monotonic() + self.delay
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="json-snapshot", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    if not self._cond.wait(timeout=30):
+                        self._thread = None
+                        return  # idle; schedule() starts a new worker when needed
+                wait = self._due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(timeout=wait)
+                    continue  # re-check: more changes may have pushed the deadline back
+                records_dict = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                self._export(records_dict)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _export(self, records_dict):
+        if callable(records_dict):
+            try:
+                records_dict = records_dict()
+            except Exception as e:
+                metrics.count("errors_total", operation="export_json")
+                print_warning(f"Snapshot export failed: {e}")
+                return
+        export_json_snapshot(records_dict, self.json_file)
+        self.exports += 1
+
+    def flush(self):
+        """Write any pending snapshot now and wait for an in-flight one to finish."""
+        with self._cond:
+            while self._busy:
+                self._cond.wait()
+            records_dict = self._pending
+            self._pending = None
+        if records_dict is not None:
+            self._export(records_dict)
+            return True
+        return False
+
+snapshot_exporter = SnapshotExporter()
+atexit.register(snapshot_exporter.flush)
+
+@metrics.timed("save_all")
+def save_all_records(records_dict, storage=None, export_from=None):
+    """
+    Rewrite storage; the JSON snapshot follows from export_from (a pinned
+    snapshot) or a copy of records_dict. The export runs on another thread,
+    so it is never handed a dict the caller may go on changing.
+    """
+    storage = storage or open_storage()
+    storage.save_all(records_dict)
+    metrics.count("records_written_total", len(records_dict), backend=storage.name)
+    snapshot_exporter.schedule(dict(records_dict) if export_from is None else export_from)
+
+def next_sequential_id(records_dict):
+    max_num = 0
+    for emp_id in records_dict.keys():
+        if str(emp_id).isdigit():
+            n = int(emp_id)
+            if n > max_num:
+                max_num = n
+    return str(max_num + 1).zfill(3)
+
+# -----------------------------------------------------------------------------
+# SQLite storage backend
+# -----------------------------------------------------------------------------
+# Sortable field -> ORDER BY expression ("length(id), id" orders numeric IDs by value)
+SQLITE_SORT_COLUMNS = {
+    "id": "length(id) {dir}, id {dir}",
+    "name": "name_norm {dir}",
+    "age": "age {dir}",
+    "position": "position {dir}",
+    "salary": "salary {dir}",
+    "department": "department {dir}",
+    "location": "location {dir}",
+    "email": "email_norm {dir}",
+    "created_at": "created_at {dir}",
+    "updated_at": "updated_at {dir}",
+}
+
+class SqliteStorage:
+    """
+    One row per employee in an SQLite database (WAL mode).
+
+    Changes are written as per-row upserts/deletes in one transaction, and
+    query() runs filters, ORDER BY and LIMIT in SQL so callers that only need
+    a slice never build Employee objects for the whole table. On first open
+    an existing pickle is copied in once (recorded in the meta table).
+    """
+    name = "sqlite"
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS employees ("
+        " id TEXT PRIMARY KEY, name TEXT NOT NULL, name_norm TEXT NOT NULL, age INTEGER,"
+        " position TEXT, salary REAL, department TEXT, location TEXT,"
+        " email TEXT, email_norm TEXT, created_at INTEGER, updated_at INTEGER,"
+        " version INTEGER NOT NULL DEFAULT 1)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_name ON employees (name_norm)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_email ON employees (email_norm)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_salary ON employees (salary)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_position ON employees (position, salary)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_department ON employees (department, salary)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_location ON employees (location, salary)",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    )
+    COLUMNS = ("id, name, age, position, salary, department, location, email, created_at, updated_at,"
+               " version")
+    UPSERT = ("INSERT OR REPLACE INTO employees (id, name, name_norm, age, position, salary,"
+              " department, location, email, email_norm, created_at, updated_at, version)"
+              " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, db_file=SQLITE_FILE, migrate_from=PICKLE_FILE):
+        self.db_file = db_file
+        self.migrate_from = migrate_from
+        self._conn = None
+
+    def paths(self):
+        return (self.db_file, self.db_file + "-wal")
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.db_file)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(employees)")]
+                if "version" not in columns:  # database created before record versions
+                    conn.execute("ALTER TABLE employees ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                if not conn.execute("SELECT 1 FROM meta WHERE key = 'timestamps'").fetchone():
+                    # Timestamps used to be local-time text; 'utc' converts from local time
+                    for column in ("created_at", "updated_at"):
+                        conn.execute(f"UPDATE employees SET {column} ="
+                                     f" CAST(strftime('%s', {column}, 'utc') AS INTEGER) * 1000000"
+                                     f" WHERE {column} LIKE '____-__-__%'")
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('timestamps', 'microseconds')")
+            self._conn = conn
+            self._migrate_pickle_once()
+        return self._conn
+
+    def _migrate_pickle_once(self):
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+            return
+        records = {}
+        if self.migrate_from and conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0:
+            records = PickleStorage(self.migrate_from).load()
+        with conn:
+            conn.executemany(self.UPSERT, [self._row(k, v) for k, v in records.items()])
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)",
+                         (f"{self.migrate_from} ({len(records)} records, {now_text()})",))
+
+    @staticmethod
+    def _row(emp_id, emp):
+        return (emp_id, emp.get_name(), Validation.normalize(emp.get_name()), emp.get_age(),
+                emp.get_position(), float(emp.get_salary()), emp.department, emp.location,
+                emp.email, Validation.normalize(emp.email), emp.created_at, emp.updated_at, emp.version)
+
+    @staticmethod
+    def _employee(row):
+        emp_id, name, age, position, salary, department, location, email, created_at, updated_at, version = row
+        emp = Employee(name, age, position, salary, department, location, email, emp_id)
+        emp.created_at = parse_timestamp(created_at)
+        emp.updated_at = parse_timestamp(updated_at)
+        emp.version = version
+        return emp
+
+    def load(self):
+        rows = self.conn.execute(f"SELECT {self.COLUMNS} FROM employees ORDER BY length(id), id")
+        return {row[0]: self._employee(row) for row in rows}
+
+    def save_all(self, records_dict):
+        with self.conn:
+            self.conn.execute("DELETE FROM employees")
+            self.conn.executemany(self.UPSERT, [self._row(k, v) for k, v in records_dict.items()])
+
+    def apply_changes(self, records_dict, changes):
+        upserts = []
+        deletes = []
+        for emp_id, emp in changes.items():
+            if emp is None:
+                deletes.append((emp_id,))
+            else:
+                upserts.append(self._row(emp_id, emp))
+        with self.conn:
+            self.conn.executemany("DELETE FROM employees WHERE id = ?", deletes)
+            self.conn.executemany(self.UPSERT, upserts)
+
+    def get(self, emp_id):
+        row = self.conn.execute(f"SELECT {self.COLUMNS} FROM employees WHERE id = ?", (emp_id,)).fetchone()
+        return self._employee(row) if row else None
+
+    def ids_named(self, name):
+        """IDs whose name matches, case-insensitively (from the name index)."""
+        rows = self.conn.execute("SELECT id FROM employees WHERE name_norm = ?", (Validation.normalize(name),))
+        return [row[0] for row in rows]
+
+    def highest_id(self):
+        """Highest numeric ID in the table (0 when there is none)."""
+        row = self.conn.execute("SELECT MAX(CAST(id AS INTEGER)) FROM employees "
+                                "WHERE id <> '' AND id NOT GLOB '*[^0-9]*'").fetchone()
+        return row[0] or 0
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+
+    def has_records(self):
+        return self.conn.execute("SELECT EXISTS (SELECT 1 FROM employees)").fetchone()[0] == 1
+
+    def query(self, order_by=(), limit=None, offset=0, name=None, email=None, position=None,
+              department=None, location=None, salary_min=None, salary_max=None,
+              name_prefix=None, name_contains=None):
+        """
+        [(id, Employee), ...] filtered, sorted and sliced by SQLite.
+        order_by is a list of (field, descending) like sort_pairs(); ties go by ID.
+        name_prefix / name_contains match case-insensitively and rank the rows
+        the way NameTrigramIndex.search() does, before order_by.
+        """
+        where = []
+        params = []
+        rank = []
+        text = name_prefix if name_prefix is not None else name_contains
+        if text is not None:
+            text = Validation.normalize(text)
+            if name_prefix is not None:  # a range, so the name index is used
+                where.append("name_norm >= ? AND name_norm < ?")
+                params.extend((text, text + "\U0010ffff"))
+            else:
+                where.append("instr(name_norm, ?) > 0")
+                params.append(text)
+            # Earlier and tighter matches first, with the same score as the trigram index
+            rank = ["round(CAST(length(?) AS REAL) / length(name_norm) / instr(name_norm, ?), 4) DESC",
+                    SQLITE_SORT_COLUMNS["name"].format(dir="ASC")]
+        for column, value in (("name_norm", name and Validation.normalize(name)),
+                              ("email_norm", email and Validation.normalize(email)),
+                              ("position", position), ("department", department),
+                              ("location", location)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if salary_min is not None:
+            where.append("salary >= ?")
+            params.append(float(salary_min))
+        if salary_max is not None:
+            where.append("salary <= ?")
+            params.append(float(salary_max))
+
+        order = list(rank)
+        for field, descending in order_by:
+            if field not in SQLITE_SORT_COLUMNS:
+                raise ValueError(f"Unknown sort field: {field}")
+            order.append(SQLITE_SORT_COLUMNS[field].format(dir="DESC" if descending else "ASC"))
+        order.append(SQLITE_SORT_COLUMNS["id"].format(dir="ASC"))
+
+        sql = f"SELECT {self.COLUMNS} FROM employees"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ", ".join(order)
+        if rank:
+            params.extend((text, text))
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend((int(limit), int(offset)))
+        return [(row[0], self._employee(row)) for row in self.conn.execute(sql, params)]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+# -----------------------------------------------------------------------------
+# Binary record file (STORAGE_BACKEND = "binary")
+# -----------------------------------------------------------------------------
+# File layout (little-endian), opened with mmap:
+#   header  magic, slot capacity, table capacity, slots used, live records,
+#           end of the string heap, bytes of dead strings in the heap
+#   table   open-addressing hash table, crc32(id) -> slot + 1 (0 = empty),
+#           linear probing; deleted entries become BINARY_TOMBSTONE
+#   slots   fixed-width records: flags, age, version, salary, then an
+#           (offset, length) reference into the heap for each text field
+#   heap    UTF-8 strings; a changed string is appended and the old bytes stay
+#           until the next full rewrite
+BINARY_TEXT_FIELDS = ("id", "name", "email", "position", "department", "location",
+                      "created_at", "updated_at")
+BINARY_TOMBSTONE = 0xFFFFFFFF
+BINARY_LIVE = 1
+BINARY_HAS_UPDATED = 2  # updated_at is not None
+
+class BinaryStorage:
+    """
+    Fixed-width records plus a string heap, read through a shared mmap.
+
+    get() hashes the ID, probes the on-disk table and decodes that one slot,
+    so a lookup costs the same for 100 or 1,000,000 records and pages are
+    shared with every other process reading the file. apply_changes() writes
+    changed slots in place; a salary or age change rewrites only the slot
+    (never the file). save_all() writes a fresh, compacted file and swaps it
+    in. Like SqliteStorage, the pickle is copied in on first open.
+    """
+    name = "binary"
+    MAGIC = b"EMSBIN\x00\x01"
+    HEADER = struct.Struct("<8sIIIIQQ")
+    RECORD = struct.Struct("<BB2xId" + "QI" * len(BINARY_TEXT_FIELDS))
+    ENTRY = struct.Struct("<I")
+    TEXT_REF = struct.Struct("<QI")
+    ID_REF_AT = struct.calcsize("<BB2xId")  # where a slot keeps the (offset, length) of its ID
+    NAME_REF_AT = ID_REF_AT + TEXT_REF.size  # ... and of its name
+
+    def __init__(self, binary_file=BINARY_FILE, migrate_from=PICKLE_FILE):
+        self.binary_file = binary_file
+        self.migrate_from = migrate_from
+        self._fh = None
+        self._mm = None
+        self._mapped = None  # (inode, size, mtime) of the mapped file
+        self._name_ids = None  # ((inode, header), {normalized name: [IDs]}) for ids_named()
+
+    def paths(self):
+        return (self.binary_file,)
+
+    # --- reading ------------------------------------------------------------
+    def _map(self):
+        """The current file mapped read-only (remapped after a swap or growth), or None."""
+        try:
+            st = os.stat(self.binary_file)
+        except FileNotFoundError:
+            if self.migrate_from and os.path.exists(self.migrate_from):
+                self.save_all(PickleStorage(self.migrate_from).load())
+                return self._map()
+            return None
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if self._mm is None or self._mapped != key:
+            import mmap
+            self.close()
+            self._fh = open(self.binary_file, "rb")
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mm[:8] != self.MAGIC:
+                self.close()
+                raise ValueError(f"{self.binary_file} is not an employee binary file")
+            self._mapped = key
+        return self._mm
+
+    def _layout(self, header):
+        """(table offset, slots offset) for a header tuple."""
+        _, slot_capacity, table_capacity = header[:3]
+        table_at = self.HEADER.size
+        return table_at, table_at + table_capacity * self.ENTRY.size
+
+    def _probe(self, buf, header, emp_id, pending=None):
+        """
+        (table position, slot) of emp_id, or (first free position, None) if absent.
+        pending maps table positions taken earlier in the same batch to (slot, id bytes).
+        """
+        table_at, slots_at = self._layout(header)
+        table_capacity = header[2]
+        key = str(emp_id).encode("utf-8")
+        mask = table_capacity - 1
+        pos = zlib.crc32(key) & mask
+        free = None
+        for _ in range(table_capacity):
+            if pending and pos in pending:
+                slot, other = pending[pos]
+                if other == key:
+                    return pos, slot
+                pos = (pos + 1) & mask
+                continue
+            entry = self.ENTRY.unpack_from(buf, table_at + pos * self.ENTRY.size)[0]
+            if entry == 0:
+                return (pos if free is None else free), None
+            if entry == BINARY_TOMBSTONE:
+                if free is None:
+                    free = pos
+            else:
+                rec_at = slots_at + (entry - 1) * self.RECORD.size
+                id_offset, id_length = self.RECORD.unpack_from(buf, rec_at)[4:6]
+                if buf[id_offset:id_offset + id_length] == key:
+                    return pos, entry - 1
+            pos = (pos + 1) & mask
+        return free, None
+
+    def _decode(self, buf, rec_at):
+        fields = self.RECORD.unpack_from(buf, rec_at)
+        flags, age, version, salary = fields[:4]
+        text = [buf[fields[i]:fields[i] + fields[i + 1]].decode("utf-8") for i in range(4, len(fields), 2)]
+        emp_id, name, email, position, department, location, created_at, updated_at = text
+        emp = Employee(name, age, position, salary, department, location, email, emp_id)
+        emp.created_at = parse_timestamp(created_at)
+        emp.updated_at = parse_timestamp(updated_at) if flags & BINARY_HAS_UPDATED else None
+        emp.version = version
+        return emp_id, emp
+
+    def get(self, emp_id):
+        mm = self._map()
+        if mm is None:
+            return None
+        header = self.HEADER.unpack_from(mm, 0)
+        _, slot = self._probe(mm, header, emp_id)
+        if slot is None:
+            return None
+        return self._decode(mm, self._layout(header)[1] + slot * self.RECORD.size)[1]
+
+    def load(self):
+        mm = self._map()
+        if mm is None:
+            return {}
+        header = self.HEADER.unpack_from(mm, 0)
+        slots_at = self._layout(header)[1]
+        size = self.RECORD.size
+        records = {}
+        for slot in range(header[3]):
+            rec_at = slots_at + slot * size
+            if mm[rec_at] & BINARY_LIVE:
+                emp_id, emp = self._decode(mm, rec_at)
+                records[emp_id] = emp
+        return records
+
+    def _live_texts(self, ref_at):
+        """(slot offset, text) of every live slot, decoding only the one string at ref_at."""
+        mm = self._map()
+        if mm is None:
+            return
+        header = self.HEADER.unpack_from(mm, 0)
+        slots_at = self._layout(header)[1]
+        size = self.RECORD.size
+        for slot in range(header[3]):
+            rec_at = slots_at + slot * size
+            if mm[rec_at] & BINARY_LIVE:
+                offset, length = self.TEXT_REF.unpack_from(mm, rec_at + ref_at)
+                yield rec_at, mm[offset:offset + length].decode("utf-8")
+
+    def ids_named(self, name):
+        """
+        IDs whose name matches, case-insensitively. There is no name table in
+        the file, so the first call walks the slots (reading only names and
+        IDs, never whole records) and keeps a name -> IDs map. Any add, delete
+        or rename changes the header, so the map is kept until the header or
+        the file itself changes.
+        """
+        mm = self._map()
+        if mm is None:
+            return []
+        key = (self._mapped[0], self.HEADER.unpack_from(mm, 0))
+        if self._name_ids is None or self._name_ids[0] != key:
+            names = {}
+            for rec_at, text in self._live_texts(self.NAME_REF_AT):
+                offset, length = self.TEXT_REF.unpack_from(mm, rec_at + self.ID_REF_AT)
+                names.setdefault(Validation.normalize(text), []).append(mm[offset:offset + length].decode("utf-8"))
+            self._name_ids = (key, names)
+        return list(self._name_ids[1].get(Validation.normalize(name), ()))
+
+    def highest_id(self):
+        """Highest numeric ID in the file, reading only the IDs (0 when there is none)."""
+        return max((int(text) for _, text in self._live_texts(self.ID_REF_AT) if text.isdigit()), default=0)
+
+    def count(self):
+        mm = self._map()
+        return self.HEADER.unpack_from(mm, 0)[4] if mm is not None else 0
+
+    def has_records(self):
+        return self.count() > 0
+
+    # --- writing ------------------------------------------------------------
+    @staticmethod
+    def _texts(emp_id, emp):
+        return (str(emp_id), emp.get_name(), emp.email, emp.get_position(), emp.department,
+                emp.location, str(emp.created_at or ""), str(emp.updated_at or ""))
+
+    def _pack(self, emp, refs):
+        flags = BINARY_LIVE | (BINARY_HAS_UPDATED if emp.updated_at is not None else 0)
+        values = [flags, int(emp.get_age()), emp.version, float(emp.get_salary())]
+        for offset, length in refs:
+            values.extend((offset, length))
+        return self.RECORD.pack(*values)
+
+    def save_all(self, records_dict):
+        count = len(records_dict)
+        slot_capacity = count + count // 4 + 64  # room to add records in place
+        table_capacity = 1
+        while table_capacity < slot_capacity * 2:  # keep the table at most half full
+            table_capacity *= 2
+        table_at = self.HEADER.size
+        slots_at = table_at + table_capacity * self.ENTRY.size
+        heap_at = slots_at + slot_capacity * self.RECORD.size
+
+        table = bytearray(table_capacity * self.ENTRY.size)
+        slots = bytearray(slot_capacity * self.RECORD.size)
+        heap = bytearray()
+        shared = {}  # repeated strings (positions, timestamps, ...) are stored once
+        mask = table_capacity - 1
+        for slot, (emp_id, emp) in enumerate(records_dict.items()):
+            refs = []
+            for value in self._texts(emp_id, emp):
+                ref = shared.get(value)
+                if ref is None:
+                    data = value.encode("utf-8")
+                    ref = (heap_at + len(heap), len(data))
+                    heap += data
+                    if len(data) <= 32:
+                        shared[value] = ref
+                refs.append(ref)
+            slots[slot * self.RECORD.size:(slot + 1) * self.RECORD.size] = self._pack(emp, refs)
+            pos = zlib.crc32(str(emp_id).encode("utf-8")) & mask
+            while self.ENTRY.unpack_from(table, pos * self.ENTRY.size)[0]:
+                pos = (pos + 1) & mask
+            self.ENTRY.pack_into(table, pos * self.ENTRY.size, slot + 1)
+        header = self.HEADER.pack(self.MAGIC, slot_capacity, table_capacity, count, count,
+                                  heap_at + len(heap), 0)
+
+        tmp_file = self.binary_file + ".tmp"
+        with open(tmp_file, "wb") as fh:
+            for part in (header, table, slots, heap):
+                fh.write(part)
+            fh.flush()
+            metrics.count("bytes_written_total", fh.tell(), file="binary")
+            os.fsync(fh.fileno())
+        self.close()
+        os.replace(tmp_file, self.binary_file)
+
+    def _rewrite(self, records_dict, changes):
+        if records_dict is None:  # a point commit: read the rest for the full rewrite
+            records_dict = self.load()
+            for emp_id, emp in changes.items():
+                if emp is None:
+                    records_dict.pop(emp_id, None)
+                else:
+                    records_dict[emp_id] = emp
+        self.save_all(records_dict)
+
+    def apply_changes(self, records_dict, changes):
+        """
+        Write changes in place. records_dict (the records with the changes
+        applied) is only needed for a full rewrite; None reads it from the file.
+        """
+        mm = self._map()
+        if mm is None:
+            return self._rewrite(records_dict, changes)
+        header = list(self.HEADER.unpack_from(mm, 0))
+        _, slot_capacity, table_capacity, slots_used, live, heap_end, garbage = header
+        adding = sum(1 for emp_id, emp in changes.items()
+                     if emp is not None and self._probe(mm, header, emp_id)[1] is None)
+        if slots_used + adding > slot_capacity or garbage > heap_end // 2:
+            return self._rewrite(records_dict, changes)  # out of slots, or mostly dead strings: compact
+
+        table_at, slots_at = self._layout(header)
+        writes = []  # (file offset, bytes), applied after the mapping is closed
+        heap = bytearray()
+        pending = {}  # table position -> (slot, id bytes) for records added in this batch
+        for emp_id, emp in changes.items():
+            pos, slot = self._probe(mm, header, emp_id, pending)
+            if emp is None:
+                if slot is not None:
+                    rec_at = slots_at + slot * self.RECORD.size
+                    writes.append((rec_at, bytes([0])))
+                    writes.append((table_at + pos * self.ENTRY.size, self.ENTRY.pack(BINARY_TOMBSTONE)))
+                    live -= 1
+                continue
+            old = None
+            if slot is None:
+                slot = slots_used
+                slots_used += 1
+                live += 1
+                pending[pos] = (slot, str(emp_id).encode("utf-8"))
+                writes.append((table_at + pos * self.ENTRY.size, self.ENTRY.pack(slot + 1)))
+            else:
+                old = self.RECORD.unpack_from(mm, slots_at + slot * self.RECORD.size)
+            refs = []
+            for i, value in enumerate(self._texts(emp_id, emp)):
+                data = value.encode("utf-8")
+                if old is not None:
+                    offset, length = old[4 + 2 * i], old[5 + 2 * i]
+                    if mm[offset:offset + length] == data:
+                        refs.append((offset, length))  # unchanged: keep pointing at it
+                        continue
+                    garbage += length
+                refs.append((heap_end + len(heap), len(data)))
+                heap += data
+            writes.append((slots_at + slot * self.RECORD.size, self._pack(emp, refs)))
+
+        new_header = self.HEADER.pack(self.MAGIC, slot_capacity, table_capacity, slots_used, live,
+                                      heap_end + len(heap), garbage)
+        self.close()
+        with open(self.binary_file, "r+b") as fh:
+            # Heap first, then slots and table, then the header that makes them reachable
+            if heap:
+                fh.seek(heap_end)
+                fh.write(heap)
+            for offset, data in writes:
+                fh.seek(offset)
+                fh.write(data)
+            fh.seek(0)
+            fh.write(new_header)
+            fh.flush()
+            os.fsync(fh.fileno())
+        metrics.count("bytes_written_total", len(heap) + sum(len(data) for _, data in writes) + len(new_header),
+                      file="binary")
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        self._mapped = None
+
+# -----------------------------------------------------------------------------
+# Mutation journal (append-only log on top of the pickle checkpoint)
+# -----------------------------------------------------------------------------
+class MutationJournal:
+    """
+    Append-only log of record changes, one JSON object per line:
+        {"op": "put", "id": "005", "rec": {...Employee.to_dict()...}}
+        {"op": "del", "id": "005"}
+    Entries are buffered and written with a single fsync per flush() (group
+    commit), so a burst of changes committed together costs one sync.
+    """
+
+    def __init__(self, journal_file=JOURNAL_FILE):
+        self.journal_file = journal_file
+        self.entry_count = 0
+        self.size = 0
+        self._pending = []
+
+    def append_put(self, emp_id, emp):
+        self._pending.append(json.dumps({"op": "put", "id": emp_id, "rec": emp.to_dict(formatted=False)}))
+
+    def append_delete(self, emp_id):
+        self._pending.append(json.dumps({"op": "del", "id": emp_id}))
+
+    @metrics.timed("journal_flush")
+    def flush(self):
+        if not self._pending:
+            return
+        chunk = ("\n".join(self._pending) + "\n").encode("utf-8")
+        with open(self.journal_file, "ab") as fh:
+            fh.write(chunk)
+            fh.flush()
+            os.fsync(fh.fileno())
+        metrics.count("bytes_written_total", len(chunk), file="journal")
+        self.entry_count += len(self._pending)
+        self.size += len(chunk)
+        self._pending = []
+
+    def discard_pending(self):
+        self._pending = []
+
+    def needs_checkpoint(self):
+        return self.entry_count >= JOURNAL_MAX_ENTRIES or self.size >= JOURNAL_MAX_BYTES
+
+    @metrics.timed("journal_replay")
+    def replay(self, records_dict):
+        """Apply the logged changes to records_dict in order. Returns the number applied."""
+        self.entry_count = 0
+        self.size = 0
+        if not os.path.exists(self.journal_file):
+            return 0
+        good_size = 0
+        with open(self.journal_file, "rb") as fh:
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break  # torn tail from an interrupted write
+                try:
+                    entry = json.loads(line)
+                    if entry["op"] == "put":
+                        records_dict[entry["id"]] = Employee.from_dict(entry["rec"], entry["id"])
+                    elif entry["op"] == "del":
+                        records_dict.pop(entry["id"], None)
+                except (ValueError, KeyError, TypeError):
+                    break
+                good_size += len(line)
+                self.entry_count += 1
+        if good_size < os.path.getsize(self.journal_file):
+            # Drop the damaged tail so later appends start on a clean line
+            with open(self.journal_file, "r+b") as fh:
+                fh.truncate(good_size)
+        self.size = good_size
+        return self.entry_count
+
+    def reset(self):
+        """Empty the log after its contents were folded into a checkpoint."""
+        with open(self.journal_file, "wb") as fh:
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.entry_count = 0
+        self.size = 0
+
+# -----------------------------------------------------------------------------
+# Change feed (sequenced change log for incremental consumers)
+# -----------------------------------------------------------------------------
+class ChangeFeed:
+    """
+    Committed changes, one compact JSON object per line:
+        {"seq":12,"ts":"2026-01-31 09:00:00","op":"update","id":"005","before":{...},"after":{...}}
+    "before" is null for an add, "after" is null for a delete. append() runs
+    under the data folder's lock and continues from the last sequence number
+    in the file, so numbers only go up, whichever process commits. Entries are
+    written after the storage commit: a crash in between can lose an entry,
+    but the feed never shows a change that was not saved.
+
+    since(cursor) finds its starting point by binary search over the file, so
+    a consumer's cost depends on how much changed, not on how long the feed is.
+    Once the file holds a quarter more than `keep` entries, append() rewrites
+    it with the last `keep`; a cursor older than first_seq() - 1 has missed
+    changes and must start again from a full snapshot.
+    """
+    SCAN_BLOCK = 65536
+
+    def __init__(self, feed_file, keep=CHANGE_FEED_KEEP):
+        self.feed_file = feed_file
+        self.keep = keep
+
+    def _tail(self, fh):
+        """(size of the complete lines, seq of the last one); a torn last line is ignored."""
+        pos = fh.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > 0:
+            step = min(self.SCAN_BLOCK, pos)
+            pos -= step
+            fh.seek(pos)
+            buf = fh.read(step) + buf
+            end = buf.rfind(b"\n")
+            if end < 0:
+                continue
+            start = buf.rfind(b"\n", 0, end)
+            if start < 0 and pos > 0:
+                continue  # the last line is longer than what we read so far
+            return pos + end + 1, json.loads(buf[start + 1:end])["seq"]
+        return 0, 0
+
+    def last_seq(self):
+        try:
+            with open(self.feed_file, "rb") as fh:
+                return self._tail(fh)[1]
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _head(fh):
+        fh.seek(0)
+        line = fh.readline()
+        return json.loads(line)["seq"] if line.endswith(b"\n") else 0
+
+    def first_seq(self):
+        """seq of the oldest entry still in the file (0 if there is none)."""
+        try:
+            with open(self.feed_file, "rb") as fh:
+                return self._head(fh)
+        except FileNotFoundError:
+            return 0
+
+    def append(self, changes):
+        """Log [(op, emp_id, before dict or None, after dict or None)]. Returns the last seq written."""
+        ts = now_text()
+        with open(self.feed_file, "a+b") as fh:
+            good_size, seq = self._tail(fh)
+            if fh.seek(0, os.SEEK_END) != good_size:
+                fh.truncate(good_size)  # drop a torn line from an interrupted append
+            lines = []
+            for op, emp_id, before, after in changes:
+                seq += 1
+                lines.append(json.dumps({"seq": seq, "ts": ts, "op": op, "id": emp_id,
+                                         "before": before, "after": after}, separators=(",", ":")))
+            chunk = ("\n".join(lines) + "\n").encode("utf-8")
+            fh.write(chunk)
+            fh.flush()
+            os.fsync(fh.fileno())
+            if self.keep and seq - self._head(fh) + 1 > self.keep + self.keep // 4:
+                self._trim(fh, seq - self.keep)
+        metrics.count("bytes_written_total", len(chunk), file="changes")
+        return seq
+
+    def _trim(self, fh, cursor):
+        """Replace the file with its entries after seq `cursor` (under the lock, like append())."""
+        size = fh.seek(0, os.SEEK_END)
+        fh.seek(self._start_offset(fh, size, cursor))
+        while True:
+            pos = fh.tell()
+            line = fh.readline()
+            if not line or json.loads(line)["seq"] > cursor:
+                break
+        fh.seek(pos)
+        tmp_file = self.feed_file + ".tmp"
+        with open(tmp_file, "wb") as out:
+            while True:
+                block = fh.read(1 << 20)
+                if not block:
+                    break
+                out.write(block)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_file, self.feed_file)  # readers with the old file open finish reading it
+
+    def _start_offset(self, fh, size, cursor):
+        """A line start at or before the first entry with seq > cursor (at most ~SCAN_BLOCK before it)."""
+        lo, hi = 0, size
+        while hi - lo > self.SCAN_BLOCK:
+            mid = (lo + hi) // 2
+            fh.seek(mid)
+            fh.readline()  # skip to the next line start
+            line = fh.readline()
+            if line.endswith(b"\n") and json.loads(line)["seq"] <= cursor:
+                lo = fh.tell()
+            else:
+                hi = mid
+        return lo
+
+    def since(self, cursor=0, limit=None):
+        """Entries with seq > cursor, oldest first, as dicts (at most `limit`)."""
+        entries = []
+        try:
+            fh = open(self.feed_file, "rb")
+        except FileNotFoundError:
+            return entries
+        with fh:
+            size = fh.seek(0, os.SEEK_END)
+            fh.seek(self._start_offset(fh, size, cursor))
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break  # an append in progress (or torn)
+                entry = json.loads(line)
+                if entry["seq"] <= cursor:
+                    continue
+                entries.append(entry)
+                if limit and len(entries) >= limit:
+                    break
+        return entries
+
+# -----------------------------------------------------------------------------
+# Name search index (trigrams)
+# -----------------------------------------------------------------------------
+class NameTrigramIndex:
+    """
+    Inverted index from 3-character grams of the normalized name to IDs.
+
+    Names are padded ("\x02\x02olivia brown\x03") so the leading grams
+    double as a prefix index. Postings can over-match (gram positions are
+    not stored), so prefix/contains candidates are always verified against
+    the name itself before they are returned.
+    """
+    PAD_START = "\x02\x02"
+    PAD_END = "\x03"
+
+    def __init__(self):
+        self.postings = {}   # gram -> set of IDs
+        self.names = {}      # emp_id -> normalized name
+        self._gram_count = {}
+
+    @staticmethod
+    def grams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, emp_id, normalized_name):
+        self.discard(emp_id)
+        grams = self.grams(self.PAD_START + normalized_name + self.PAD_END)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(emp_id)
+        self.names[emp_id] = normalized_name
+        self._gram_count[emp_id] = len(grams)
+
+    def discard(self, emp_id):
+        name = self.names.pop(emp_id, None)
+        if name is None:
+            return
+        del self._gram_count[emp_id]
+        for gram in self.grams(self.PAD_START + name + self.PAD_END):
+            bucket = self.postings.get(gram)
+            if bucket is None:
+                continue
+            bucket.discard(emp_id)
+            if not bucket:
+                del self.postings[gram]
+
+    def _candidates(self, grams):
+        buckets = []
+        for gram in grams:
+            bucket = self.postings.get(gram)
+            if not bucket:
+                return set()
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        result = set(buckets[0])
+        for bucket in buckets[1:]:
+            result.intersection_update(bucket)
+            if not result:
+                break
+        return result
+
+    def search(self, query, mode="contains", limit=NAME_SEARCH_MAX_RESULTS,
+               time_limit=NAME_SEARCH_TIME_LIMIT):
+        """
+        Ranked [(emp_id, score), ...] for mode "prefix", "contains" or "fuzzy".
+        Scores are in 0..1 (higher is better). Stops early once time_limit
+        seconds have passed and ranks what it has found so far.
+        """
+        q = Validation.normalize(query)
+        if not q:
+            return []
+        deadline = time.perf_counter() + time_limit
+        if mode == "fuzzy":
+            return self._search_fuzzy(q, limit, deadline)
+        if mode not in ("prefix", "contains"):
+            raise ValueError(f"Unknown name search mode: {mode}")
+
+        if mode == "prefix":
+            candidates = self._candidates(self.grams(self.PAD_START + q))
+        elif len(q) >= 3:
+            candidates = self._candidates(self.grams(q))
+        else:
+            candidates = self.names.keys()  # too short for a gram; scan the cached names
+
+        scored = []
+        for n, emp_id in enumerate(candidates):
+            if n & 1023 == 0 and time.perf_counter() > deadline:
+                break
+            name = self.names[emp_id]
+            pos = name.find(q)
+            if pos < 0 or (mode == "prefix" and pos != 0):
+                continue
+            # Earlier and tighter matches rank higher
+            scored.append((emp_id, round(len(q) / len(name) / (1 + pos), 4)))
+        return self._rank(scored, limit)
+
+    def _search_fuzzy(self, q, limit, deadline):
+        q_grams = self.grams(self.PAD_START + q + self.PAD_END)
+        buckets = [self.postings[g] for g in q_grams if g in self.postings]
+        buckets.sort(key=len)  # rare grams first: they carry the most signal
+        shared = collections.Counter()
+        for bucket in buckets:
+            if time.perf_counter() > deadline:
+                break
+            shared.update(bucket)
+        total = len(q_grams)
+        scored = []
+        for emp_id, hits in shared.items():
+            score = 2.0 * hits / (total + self._gram_count[emp_id])
+            if score >= NAME_FUZZY_MIN_SCORE:
+                scored.append((emp_id, round(score, 4)))
+        return self._rank(scored, limit)
+
+    def _rank(self, scored, limit):
+        # Best score first, then name, then ID for a stable order
+        keys = [(-score, self.names[emp_id], id_sort_key(emp_id)) for emp_id, score in scored]
+        order = sorted(range(len(scored)), key=keys.__getitem__)
+        if limit:
+            order = order[:limit]
+        return [scored[i] for i in order]
+
+# -----------------------------------------------------------------------------
+# Salary index (sorted, for top-N and range queries)
+# -----------------------------------------------------------------------------
+class SalaryIndex:
+    """
+    Employee IDs ordered by salary, kept sorted with bisect as records change.
+
+    Besides the list over everyone there is one list per department and one
+    per location, so a filtered query also starts with a binary search and
+    then reads only the rows it returns: O(log n + k). Entries are
+    (salary, id_sort_key(id), id), so equal salaries are in ID order, as in
+    sort_pairs_by_salary().
+    """
+
+    def __init__(self, records_dict=None):
+        self._lists = {None: []}  # None / ("department", d) / ("location", l) -> sorted entries
+        self._filed = {}          # emp_id -> (entry, department, location)
+        if records_dict:
+            for emp_id, emp in records_dict.items():
+                entry = (float(emp.get_salary()), id_sort_key(emp_id), emp_id)
+                for group in (None, ("department", emp.department), ("location", emp.location)):
+                    self._lists.setdefault(group, []).append(entry)
+                self._filed[emp_id] = (entry, emp.department, emp.location)
+            for entries in self._lists.values():
+                entries.sort()
+
+    def __len__(self):
+        return len(self._filed)
+
+    def add(self, emp_id, emp):
+        self.discard(emp_id)
+        entry = (float(emp.get_salary()), id_sort_key(emp_id), emp_id)
+        for group in (None, ("department", emp.department), ("location", emp.location)):
+            bisect.insort(self._lists.setdefault(group, []), entry)
+        self._filed[emp_id] = (entry, emp.department, emp.location)
+
+    def discard(self, emp_id):
+        filed = self._filed.pop(emp_id, None)
+        if filed is None:
+            return
+        entry, department, location = filed
+        for group in (None, ("department", department), ("location", location)):
+            entries = self._lists[group]
+            del entries[bisect.bisect_left(entries, entry)]
+
+    def _group_size(self, group):
+        return len(self._lists.get(group, ()))
+
+    def _entries_for(self, department, location):
+        """
+        The smallest sorted list covering the filter, plus the other filter as
+        (column in self._filed, wanted value), or (None, None) if there is none.
+        """
+        groups = [(field, value) for field, value in (("department", department), ("location", location))
+                  if value is not None]
+        if not groups:
+            return self._lists[None], None, None
+        groups.sort(key=self._group_size)
+        entries = self._lists.get(groups[0], [])
+        if len(groups) == 1:
+            return entries, None, None
+        return entries, 1 if groups[1][0] == "department" else 2, groups[1][1]
+
+    @staticmethod
+    def _walk(entries, start, end, descending):
+        if not descending:
+            for i in range(start, end):
+                yield entries[i]
+            return
+        # Highest salary first, but equal salaries still in ID order
+        while end > start:
+            run_start = bisect.bisect_left(entries, (entries[end - 1][0],), start, end)
+            for i in range(run_start, end):
+                yield entries[i]
+            end = run_start
+
+    def range(self, low=None, high=None, department=None, location=None, descending=False, limit=None):
+        """IDs with low <= salary <= high (None = unbounded), lowest first unless descending."""
+        entries, column, wanted = self._entries_for(department, location)
+        start = 0 if low is None else bisect.bisect_left(entries, (float(low),))
+        end = len(entries) if high is None else bisect.bisect_right(entries, (float(high), (2,)))
+        result = []
+        if limit is not None and limit <= 0:
+            return result
+        for entry in self._walk(entries, start, end, descending):
+            if column is None or self._filed[entry[2]][column] == wanted:
+                result.append(entry[2])
+                if limit and len(result) >= limit:
+                    break
+        return result
+
+    def top(self, n, highest=True, department=None, location=None):
+        """The n highest (or lowest) paid IDs."""
+        return self.range(department=department, location=location, descending=highest, limit=n)
+
+# -----------------------------------------------------------------------------
+# Time index (sorted, for "changed since" and "hired between" queries)
+# -----------------------------------------------------------------------------
+TIME_FIELDS = ("created_at", "updated_at")
+
+TIME_SPEC_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}  # seconds
+
+def parse_time_spec(text, now=None):
+    """
+    Microseconds for "30m" / "24h" / "7d" / "2w" (that long before now), or
+    for a local date or time such as "2026-07-01" or "2026-07-01 09:00".
+    Raises ValueError for anything else.
+    """
+    text = str(text).strip().lower()
+    unit = TIME_SPEC_UNITS.get(text[-1:])
+    if unit is not None and text[:-1].isdigit():
+        return (now_micros() if now is None else now) - int(text[:-1]) * unit * 1_000_000
+    try:
+        moment = parse_timestamp(text)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError(f"not a time: {text!r} (use e.g. 24h, 7d or 2026-07-01)")
+    return moment
+
+class TimeIndex:
+    """
+    Employee IDs ordered by created_at or updated_at, kept sorted with bisect
+    as records change, so a time window costs O(log n + k). Entries are
+    (microseconds, id_sort_key(id), id). The updated_at index files a record
+    that was never edited under its created_at, so it answers "changed since".
+    """
+
+    def __init__(self, field, records_dict=None):
+        if field not in TIME_FIELDS:
+            raise ValueError(f"Not a time field: {field}")
+        self.field = field
+        self._entries = []
+        self._filed = {}  # emp_id -> entry
+        if records_dict:
+            for emp_id, emp in records_dict.items():
+                entry = (self.time_of(emp), id_sort_key(emp_id), emp_id)
+                self._entries.append(entry)
+                self._filed[emp_id] = entry
+            self._entries.sort()
+
+    def __len__(self):
+        return len(self._filed)
+
+    def time_of(self, emp):
+        if self.field == "updated_at":
+            return emp.updated_at or emp.created_at or 0
+        return emp.created_at or 0
+
+    def add(self, emp_id, emp):
+        self.discard(emp_id)
+        entry = (self.time_of(emp), id_sort_key(emp_id), emp_id)
+        bisect.insort(self._entries, entry)
+        self._filed[emp_id] = entry
+
+    def discard(self, emp_id):
+        entry = self._filed.pop(emp_id, None)
+        if entry is not None:
+            del self._entries[bisect.bisect_left(self._entries, entry)]
+
+    def range(self, start=None, end=None, descending=False, limit=None):
+        """IDs with start <= time < end (microseconds, None = unbounded), oldest first unless descending."""
+        entries = self._entries
+        low = 0 if start is None else bisect.bisect_left(entries, (start,))
+        high = len(entries) if end is None else bisect.bisect_left(entries, (end,))
+        if limit is not None and limit <= 0:
+            return []
+        if descending:
+            stop = low if not limit else max(low, high - limit)
+            return [entries[i][2] for i in range(high - 1, stop - 1, -1)]
+        stop = high if not limit else min(high, low + limit)
+        return [entries[i][2] for i in range(low, stop)]
+
+# -----------------------------------------------------------------------------
+# Secondary indexes (hash lookups kept in step with every mutation)
+# -----------------------------------------------------------------------------
+INDEXED_FIELDS = ("name", "email", "position", "department", "location")
+
+class RecordIndexes:
+    """
+    Hash indexes from a field value to the set of employee IDs having it.
+    Name and email are keyed on their normalized (case-folded) text;
+    position, department and location on the stored value.
+
+    rebuild() only remembers the records dict; the hash tables are filled on
+    the first lookup, so a command that never searches never pays for them.
+    Until then add()/discard() are no-ops (the live dict already has the change).
+    The name trigram, salary and time indexes are built on their first use in the same way.
+    """
+
+    def __init__(self):
+        self._by_field = {field: {} for field in INDEXED_FIELDS}
+        self._keys = {}  # emp_id -> the keys it is currently filed under
+        self._names = None  # trigram index, built on the first name search
+        self._salaries = None  # SalaryIndex, built on the first salary query
+        self._times = {}  # field -> TimeIndex, built on the first time query on that field
+        self._source = None  # records dict waiting to be indexed
+        self._records = {}  # the records dict being indexed (kept current by the caller)
+
+    @property
+    def by_field(self):
+        if self._by_field is None:
+            self._by_field = {field: {} for field in INDEXED_FIELDS}
+            for emp_id, emp in self._source.items():
+                self.add(emp_id, emp)
+            self._source = None
+        return self._by_field
+
+    @property
+    def names(self):
+        self.by_field  # make sure self._keys is filled
+        if self._names is None:
+            names = NameTrigramIndex()
+            for emp_id, keys in self._keys.items():
+                names.add(emp_id, keys[0])
+            self._names = names
+        return self._names
+
+    @property
+    def salaries(self):
+        self.by_field  # from here on add()/discard() keep every index current
+        if self._salaries is None:
+            self._salaries = SalaryIndex(self._records)
+        return self._salaries
+
+    @property
+    def has_salaries(self):
+        return self._salaries is not None
+
+    def times(self, field):
+        """The TimeIndex on created_at or updated_at."""
+        self.by_field
+        index = self._times.get(field)
+        if index is None:
+            index = self._times[field] = TimeIndex(field, self._records)
+        return index
+
+    @staticmethod
+    def normalize_key(field, value):
+        if field in ("name", "email"):
+            return Validation.normalize(value)
+        return value
+
+    @staticmethod
+    def keys_for(emp):
+        return (
+            Validation.normalize(emp.get_name()),
+            Validation.normalize(emp.email),
+            emp.get_position(),
+            emp.department,
+            emp.location,
+        )
+
+    def add(self, emp_id, emp):
+        if self._by_field is None:
+            return
+        self.discard(emp_id)
+        keys = self.keys_for(emp)
+        for field, key in zip(INDEXED_FIELDS, keys):
+            self._by_field[field].setdefault(key, set()).add(emp_id)
+        self._keys[emp_id] = keys
+        if self._names is not None:
+            self._names.add(emp_id, keys[0])
+        if self._salaries is not None:
+            self._salaries.add(emp_id, emp)
+        for index in self._times.values():
+            index.add(emp_id, emp)
+
+    def add_many(self, pairs):
+        """add() for a batch of (id, Employee) pairs; a big batch drops the sorted indexes instead."""
+        if self._by_field is None:
+            return
+        if len(pairs) > BULK_REINDEX_THRESHOLD:
+            self._salaries = None  # one O(n log n) rebuild beats an O(n) list insert per record
+            self._times = {}
+        for emp_id, emp in pairs:
+            self.add(emp_id, emp)
+
+    def discard(self, emp_id):
+        if self._by_field is None:
+            return
+        keys = self._keys.pop(emp_id, None)
+        if keys is None:
+            return
+        if self._names is not None:
+            self._names.discard(emp_id)
+        if self._salaries is not None:
+            self._salaries.discard(emp_id)
+        for index in self._times.values():
+            index.discard(emp_id)
+        for field, key in zip(INDEXED_FIELDS, keys):
+            bucket = self._by_field[field].get(key)
+            if bucket is None:
+                continue
+            bucket.discard(emp_id)
+            if not bucket:
+                del self._by_field[field][key]
+
+    def rebuild(self, records_dict):
+        self._by_field = None
+        self._keys = {}
+        self._names = None
+        self._salaries = None
+        self._times = {}
+        self._source = records_dict
+        self._records = records_dict
+
+    def lookup(self, field, value):
+        """IDs whose field equals value (a set; do not modify it)."""
+        return self.by_field[field].get(self.normalize_key(field, value), set())
+
+    def find(self, **criteria):
+        """IDs matching every field=value given, e.g. find(position="Developer", location="Sydney")."""
+        by_field = self.by_field
+        buckets = []
+        for field, value in criteria.items():
+            if field not in by_field:
+                raise ValueError(f"Field is not indexed: {field}")
+            if value is None:
+                continue
+            buckets.append(self.lookup(field, value))
+        if not buckets:
+            return set(self._keys)
+        buckets.sort(key=len)  # intersect starting from the smallest set
+        result = set(buckets[0])
+        for bucket in buckets[1:]:
+            result.intersection_update(bucket)
+            if not result:
+                break
+        return result
+
+# -----------------------------------------------------------------------------
+# Multi-process safety (advisory lock + record versions)
+# -----------------------------------------------------------------------------
+class RecordConflict(Exception):
+    """A record changed (or was deleted) by another process after it was read."""
+
+    def __init__(self, emp_ids):
+        self.ids = sorted(emp_ids, key=id_sort_key)
+        super().__init__("changed by someone else since it was read: " + ", ".join(self.ids))
+
+class FileLock:
+    """
+    Exclusive advisory lock (fcntl.flock) on a small side file, taken only
+    for the read-check-write moment of a commit or an ID allocation, never
+    for a whole session. Re-entrant within one process. The file also holds
+    the highest employee ID handed out, so two processes never get the same one.
+    """
+
+    def __init__(self, lock_file, timeout=LOCK_TIMEOUT):
+        self.lock_file = lock_file
+        self.timeout = timeout
+        self._fh = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            fh = open(self.lock_file, "a+", encoding="utf-8")
+            if fcntl is not None:
+                deadline = time.monotonic() + self.timeout
+                while True:
+                    try:
+                        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            fh.close()
+                            raise TimeoutError(f"{self.lock_file} is held by another process")
+                        time.sleep(0.01)
+            self._fh = fh
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+        return False
+
+    def high_water_id(self):
+        """Highest numeric ID allocated by any process (call while holding the lock)."""
+        self._fh.seek(0)
+        text = self._fh.read().strip()
+        return int(text) if text.isdigit() else 0
+
+    def set_high_water_id(self, value):
+        self._fh.truncate(0)
+        self._fh.write(str(value))
+        self._fh.flush()
+
+# -----------------------------------------------------------------------------
+# Versioned snapshots (copy-on-write, for background readers)
+# -----------------------------------------------------------------------------
+TEXT_ID_BLOCK = -1  # block of the IDs that are not numbers; iterated last, as id_sort_key orders them
+
+def snapshot_block(emp_id):
+    text = str(emp_id)
+    return int(text) >> SNAPSHOT_BLOCK_BITS if text.isdigit() else TEXT_ID_BLOCK
+
+class SnapshotView:
+    """keys(), values() or items() of a RecordSnapshot: sized and iterable, like a dict view."""
+    __slots__ = ("_blocks", "_method", "_count")
+
+    def __init__(self, blocks, method, count):
+        self._blocks = blocks
+        self._method = method
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from getattr(block, self._method)()
+
+class RecordSnapshot:
+    """
+    Read-only {id: Employee} mapping of the records as they were when it was
+    pinned. Later put()/remove() calls never show up in it, so it can be read
+    from another thread for as long as needed. Iterates in ID-block order.
+    Pickles as a plain dict.
+    """
+    __slots__ = ("_blocks", "_count", "generation")
+
+    def __init__(self, blocks, count, generation):
+        self._blocks = blocks  # block number -> {id: Employee}; never changed once pinned
+        self._count = count
+        self.generation = generation  # RecordStore.generation at the time of the pin
+
+    def _ordered_blocks(self):
+        order = sorted(self._blocks)
+        if order and order[0] == TEXT_ID_BLOCK:
+            order.append(order.pop(0))
+        return [self._blocks[block] for block in order]
+
+    def __getitem__(self, emp_id):
+        return self._blocks.get(snapshot_block(emp_id), {})[emp_id]
+
+    def get(self, emp_id, default=None):
+        return self._blocks.get(snapshot_block(emp_id), {}).get(emp_id, default)
+
+    def __contains__(self, emp_id):
+        return emp_id in self._blocks.get(snapshot_block(emp_id), ())
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return SnapshotView(self._ordered_blocks(), "keys", self._count)
+
+    def values(self):
+        return SnapshotView(self._ordered_blocks(), "values", self._count)
+
+    def items(self):
+        return SnapshotView(self._ordered_blocks(), "items", self._count)
+
+    def __reduce__(self):
+        return dict, (list(self.items()),)
+
+class RecordVersions:
+    """
+    Copy-on-write copy of the store's records, so a reader can pin a
+    consistent view in O(1) while the writer carries on.
+
+    Records are kept in blocks (one dict per 2**SNAPSHOT_BLOCK_BITS numeric
+    IDs) inside a dict of blocks. pin() marks all of it shared and wraps it
+    in a RecordSnapshot. The first write to a block after a pin copies that
+    block and the dict of blocks (one entry per block), never the records.
+
+    Built from the store's dict on the first pin() and kept in step by
+    put()/discard() after that; a store that is never pinned pays nothing.
+    pin(), put() and discard() belong to the thread that writes the store.
+    """
+
+    def __init__(self):
+        self._source = None
+        self._blocks = None  # block number -> {id: Employee}
+        self._count = 0
+        self._owned = None  # blocks copied since the last pin (None: the dict of blocks is shared too)
+
+    def rebuild(self, records_dict):
+        """Start again from records_dict; the blocks are built on the next pin()."""
+        self._source = records_dict
+        self._blocks = None
+
+    @property
+    def built(self):
+        return self._blocks is not None
+
+    def _build(self):
+        blocks = {}
+        for emp_id, emp in self._source.items():
+            block = snapshot_block(emp_id)
+            records = blocks.get(block)
+            if records is None:
+                records = blocks[block] = {}
+            records[emp_id] = emp
+        self._blocks = blocks
+        self._count = len(self._source)
+        self._owned = set(blocks)
+
+    def pin(self, generation=0):
+        if self._blocks is None:
+            self._build()
+        self._owned = None
+        return RecordSnapshot(self._blocks, self._count, generation)
+
+    def _writable(self, block):
+        if self._owned is None:
+            self._blocks = dict(self._blocks)
+            self._owned = set()
+        records = self._blocks.get(block)
+        if records is None:
+            records = self._blocks[block] = {}
+            self._owned.add(block)
+        elif block not in self._owned:
+            records = self._blocks[block] = dict(records)
+            self._owned.add(block)
+        return records
+
+    def put(self, emp_id, emp):
+        if self._blocks is None:
+            return
+        records = self._writable(snapshot_block(emp_id))
+        if emp_id not in records:
+            self._count += 1
+        records[emp_id] = emp
+
+    def discard(self, emp_id):
+        if self._blocks is None:
+            return
+        block = snapshot_block(emp_id)
+        if emp_id not in self._blocks.get(block, ()):
+            return
+        records = self._writable(block)
+        del records[emp_id]
+        self._count -= 1
+        if not records:
+            del self._blocks[block]
+            self._owned.discard(block)
+
+# -----------------------------------------------------------------------------
+# In-memory record store
+# -----------------------------------------------------------------------------
+class RecordStore:
+    """
+    Long-lived, in-memory copy of the employee records.
+
+    The storage is read once and every read after that is served from memory.
+    Before serving, the (mtime, size) of the storage files is compared with
+    what we saw at the last load/save; they are only read again if another
+    process changed them. All mutations go through put()/remove() followed
+    by commit(), which hands just the changed rows to the storage backend.
+
+    With a journal, commit() appends the changes to the log instead of
+    rewriting the pickle, and loading replays the log on top of the pickle.
+
+    Secondary indexes (self.indexes) are updated by put()/remove(), so stored
+    Employee objects must not be edited in place.
+
+    Several processes may share a data folder. Every record carries a version
+    that put() bumps; a put() of a copy whose version is no longer current
+    raises RecordConflict instead of overwriting. commit() holds the FileLock
+    and, if another process committed in the meantime, re-reads the storage,
+    checks the versions our changes were based on and re-applies them on top.
+
+    With CHANGE_FEED, commit() also appends each committed change with its
+    before and after image to the ChangeFeed (self.feed).
+
+    snapshot() pins the records as they are now (RecordVersions); the JSON
+    snapshot is exported from one, so a background export never sees a
+    half-applied commit and never holds up the next one.
+    """
+
+    def __init__(self, storage=None, journal_file=None, compact=COMPACT_RECORDS):
+        self.storage = storage or open_storage()
+        self.compact = compact
+        self.journal = MutationJournal(journal_file) if journal_file else None
+        self._records = None
+        self._stamp = None
+        self._dirty = False
+        self._changes = {}  # emp_id -> Employee, or None when deleted
+        self._pending_names = {}  # normalized name -> IDs put() without the records loaded, until commit
+        self._max_numeric_id = 0
+        self._reserved_max = 0  # highest ID handed out by allocate_ids()
+        self._sorted_ids = None  # IDs in display order, kept sorted once built
+        self._sorted_keys = None  # id_sort_key() of each of _sorted_ids, for bisect
+        self.generation = 0  # bumped on every load/put/remove, for callers caching derived views
+        self.indexes = RecordIndexes()
+        self.lock = FileLock(self.storage.paths()[0] + ".lock")
+        self._base_versions = {}  # emp_id -> version our uncommitted change was based on
+        self.feed = ChangeFeed(self.storage.paths()[0] + ".changes.jsonl", CHANGE_FEED_KEEP) if CHANGE_FEED else None
+        self._before = {}  # emp_id -> record before our first uncommitted change (None if new)
+        self.versions = RecordVersions()
+
+    def _file_stamp(self):
+        paths = list(self.storage.paths())
+        if self.journal is not None:
+            paths.append(self.journal.journal_file)
+        stamp = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stamp.append(None)
+                continue
+            stamp.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _on_loaded(self):
+        if self.compact:
+            compact_records(self._records)
+        self._sorted_ids = None
+        self._sorted_keys = None
+        self.generation += 1
+        self._max_numeric_id = None  # scanned on the first next_id()/allocate_ids()
+        self.indexes.rebuild(self._records)
+        self.versions.rebuild(self._records)
+
+    def _track_id(self, emp_id):
+        if self._max_numeric_id is None:
+            return
+        text = str(emp_id)
+        if text.isdigit() and int(text) > self._max_numeric_id:
+            self._max_numeric_id = int(text)
+
+    def _highest_id(self):
+        if self._records is None:  # point writes (see put()): ask the storage, don't load everything
+            pending = (int(emp_id) for emp_id, emp in self._changes.items() if emp is not None and emp_id.isdigit())
+            return max(self.storage.highest_id(), self._reserved_max, *pending)
+        if self._max_numeric_id is None:
+            self._max_numeric_id = 0
+            for emp_id in self._records:
+                self._track_id(emp_id)
+        return max(self._max_numeric_id, self._reserved_max)
+
+    def refresh(self):
+        """Reload from disk if the file changed since we last saw it. Returns True if reloaded."""
+        if self._dirty:
+            if self._records is None:  # point changes (see put()) waiting: load and lay them on top
+                self._stamp = self._file_stamp()
+                self._records = load_all_records(self.storage)
+                for emp_id, emp in self._changes.items():
+                    if emp is None:
+                        self._records.pop(emp_id, None)
+                    else:
+                        self._records[emp_id] = emp
+                self._on_loaded()
+                return True
+            return False  # never throw away uncommitted local changes
+        stamp = self._file_stamp()
+        if self._records is not None and stamp == self._stamp:
+            return False
+        # Stat before reading: a write that lands mid-load gives a newer stamp next time
+        if self.journal is None:
+            self._records = load_all_records(self.storage)
+        else:
+            with self.lock:  # pickle and journal must come from the same checkpoint
+                stamp = self._file_stamp()
+                self._records = self._load_with_journal()
+                stamp = self._file_stamp()  # replay may have trimmed a torn tail
+        self._stamp = stamp
+        self._on_loaded()
+        return True
+
+    def _load_with_journal(self):
+        records_dict = load_all_records(self.storage)
+        if self.journal is not None:
+            self.journal.replay(records_dict)
+        return records_dict
+
+    def records(self):
+        """The live {id: Employee} dict. Treat as read-only; mutate via put()/remove()."""
+        self.refresh()
+        return self._records
+
+    def snapshot(self):
+        """
+        A RecordSnapshot of the records as they are now, in O(1) once the first
+        one is built. Unaffected by later put()/remove() calls, so it can be
+        handed to another thread; take it on the thread that writes the store.
+        """
+        self.refresh()
+        return self.versions.pin(self.generation)
+
+    def has_records(self):
+        """Before the first load this asks the storage (file metadata) instead of reading everything."""
+        if self._records is None and not self._dirty:
+            journal_empty = self.journal is None or not os.path.exists(self.journal.journal_file) \
+                or os.path.getsize(self.journal.journal_file) == 0
+            if journal_empty:
+                return self.storage.has_records()
+        return bool(self.records())
+
+    @metrics.timed("get")
+    def get(self, emp_id):
+        """
+        One record. When nothing is cached (or the cache is stale), backends with
+        their own point lookup (binary, SQLite) answer without loading everything.
+        """
+        point_get = getattr(self.storage, "get", None)
+        if point_get is not None and self.journal is None:
+            if self._records is None and self._dirty:
+                return self._changes[emp_id] if emp_id in self._changes else point_get(emp_id)
+            if not self._dirty and (self._records is None or self._file_stamp() != self._stamp):
+                self._records = None
+                return point_get(emp_id)
+        return self.records().get(emp_id)
+
+    def _point_writes(self):
+        """
+        True when put()/remove() can go straight to the storage: nothing is
+        loaded and the backend reads and writes single records (binary, SQLite).
+        """
+        return self._records is None and self.journal is None and hasattr(self.storage, "ids_named")
+
+    def next_id(self):
+        if not self._point_writes():
+            self.refresh()
+        return str(self._highest_id() + 1).zfill(3)
+
+    def allocate_ids(self, count):
+        """Reserve a block of `count` consecutive IDs, unique across processes sharing the folder."""
+        if not self._point_writes():
+            self.refresh()
+        with self.lock:
+            start = max(self._highest_id(), self.lock.high_water_id()) + 1
+            self._reserved_max = start + count - 1
+            self.lock.set_high_water_id(self._reserved_max)
+        return [str(n).zfill(3) for n in range(start, start + count)]
+
+    def release_ids(self, emp_ids):
+        """
+        Give back unused IDs from the end of the last allocate_ids() block. The
+        high-water mark in the lock file goes back down with them, unless
+        another process has allocated past our block in the meantime.
+        """
+        reserved = self._reserved_max
+        for n in sorted((int(i) for i in emp_ids), reverse=True):
+            if n > self._reserved_max:
+                continue  # given back already
+            if n != self._reserved_max:
+                break
+            self._reserved_max -= 1
+        if self._reserved_max != reserved:
+            with self.lock:
+                if self.lock.high_water_id() == reserved:
+                    self.lock.set_high_water_id(self._reserved_max)
+
+    def sorted_ids(self):
+        """All IDs in ID order. Built once, then kept in order by put()/remove()."""
+        data = self.records()
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(data, key=id_sort_key)
+            self._sorted_keys = [id_sort_key(emp_id) for emp_id in self._sorted_ids]
+        return self._sorted_ids
+
+    @metrics.timed("find")
+    def find(self, **criteria):
+        """{id: Employee} for records matching every indexed field=value given."""
+        if self._sql_reads():
+            return dict(self.storage.query(**criteria))
+        data = self.records()
+        return {emp_id: data[emp_id] for emp_id in self.indexes.find(**criteria)}
+
+    @metrics.timed("search_names")
+    def search_names(self, query, mode="contains", limit=NAME_SEARCH_MAX_RESULTS, **criteria):
+        """
+        Ranked list of (id, Employee) for a prefix, contains or fuzzy name
+        query, optionally only among records matching the field=value criteria.
+        """
+        if mode in ("prefix", "contains") and self._sql_reads():
+            if not Validation.normalize(query):
+                return []
+            return self.storage.query(limit=limit or None, **{"name_" + mode: query}, **criteria)
+        data = self.records()
+        allowed = self.indexes.find(**criteria) if criteria else None
+        ranked = self.indexes.names.search(query, mode, limit=0 if allowed is not None else limit)
+        pairs = [(emp_id, data[emp_id]) for emp_id, _ in ranked if allowed is None or emp_id in allowed]
+        return pairs[:limit] if limit else pairs
+
+    def _sql_reads(self):
+        """
+        True when SQLite can answer a search itself: nothing is loaded or
+        waiting to be committed and there is no journal to replay on top.
+        """
+        return self._records is None and not self._dirty and self.journal is None \
+            and isinstance(self.storage, SqliteStorage)
+
+    def name_taken(self, name, exclude_id=None):
+        if self._point_writes():
+            # Ask the storage's own name lookup, corrected for changes not committed yet
+            ids = {emp_id for emp_id in self.storage.ids_named(name) if emp_id not in self._changes}
+            ids.update(self._pending_names.get(Validation.normalize(name), ()))
+        else:
+            self.refresh()
+            ids = self.indexes.lookup("name", name)
+        if exclude_id is not None and exclude_id in ids:
+            return len(ids) > 1
+        return bool(ids)
+
+    @metrics.timed("salary_range")
+    def salary_range(self, low=None, high=None, department=None, location=None, descending=False, limit=None):
+        """(id, Employee) pairs with low <= salary <= high from the salary index, in salary order."""
+        data = self.records()
+        ids = self.indexes.salaries.range(low, high, department, location, descending, limit)
+        return [(emp_id, data[emp_id]) for emp_id in ids]
+
+    @metrics.timed("top_salaries")
+    def top_salaries(self, n, highest=True, department=None, location=None):
+        """
+        The n highest (or lowest) paid employees. Answered from the salary index
+        when it is built; otherwise a heap pass over the records, which is
+        cheaper than building the index for a one-off question.
+        """
+        data = self.records()
+        if self.indexes.has_salaries:
+            return [(emp_id, data[emp_id]) for emp_id in self.indexes.salaries.top(n, highest, department, location)]
+        pairs = ((emp_id, emp) for emp_id, emp in data.items()
+                 if (department is None or emp.department == department)
+                 and (location is None or emp.location == location))
+        return top_pairs_by_salary(pairs, n, highest)
+
+    @metrics.timed("time_range")
+    def time_range(self, field="updated_at", start=None, end=None, descending=False, limit=None):
+        """
+        (id, Employee) pairs with start <= field < end (microseconds), oldest
+        first unless descending, from the time index. updated_at counts a
+        never-edited record as changed when it was created.
+        """
+        data = self.records()
+        return [(emp_id, data[emp_id]) for emp_id in self.indexes.times(field).range(start, end, descending, limit)]
+
+    def salary_ids(self, descending=False):
+        """All IDs in salary order (ties by ID), read off the salary index."""
+        self.refresh()
+        return self.indexes.salaries.range(descending=descending)
+
+    @metrics.timed("put")
+    def put(self, emp_id, emp):
+        """
+        Store emp under emp_id. emp must be a new Employee (version 0) for a
+        new ID, or a copy of the current record; anything else is a lost
+        update and raises RecordConflict. Before anything is loaded, a
+        point-access backend checks the version against that one record.
+        """
+        if self._point_writes():
+            current = self.get(emp_id)
+            if emp.version != (current.version if current is not None else 0):
+                raise RecordConflict([emp_id])
+            self._store_point(emp_id, emp, current)
+            return
+        data = self.records()
+        current = data.get(emp_id)
+        if emp.version != (current.version if current is not None else 0):
+            raise RecordConflict([emp_id])
+        emp = self._store(data, emp_id, emp, current)
+        self.indexes.add(emp_id, emp)
+        self.generation += 1
+
+    @metrics.timed("put_many")
+    def put_many(self, pairs):
+        """
+        put() for a batch of (id, Employee) pairs, each ID once. The versions
+        are checked for the whole batch first, so one stale copy raises
+        RecordConflict and nothing is stored.
+        """
+        data = self.records()
+        stale = [emp_id for emp_id, emp in pairs
+                 if emp.version != (data[emp_id].version if emp_id in data else 0)]
+        if stale:
+            raise RecordConflict(stale)
+        stored = [(emp_id, self._store(data, emp_id, emp, data.get(emp_id))) for emp_id, emp in pairs]
+        self.indexes.add_many(stored)
+        if stored:
+            self.generation += 1
+
+    def _store(self, data, emp_id, emp, current):
+        """The bookkeeping of put() after its version check, except the indexes. Returns the stored record."""
+        current_version = current.version if current is not None else 0
+        self._base_versions.setdefault(emp_id, current_version)
+        self._before.setdefault(emp_id, current)
+        emp.version = current_version + 1
+        if self.compact and not isinstance(emp, SlottedEmployee):
+            emp = SlottedEmployee.from_employee(emp, emp_id)
+        if self._sorted_ids is not None and emp_id not in data:
+            key = id_sort_key(emp_id)
+            pos = bisect.bisect_left(self._sorted_keys, key)
+            self._sorted_keys.insert(pos, key)
+            self._sorted_ids.insert(pos, emp_id)
+        data[emp_id] = emp
+        self.versions.put(emp_id, emp)
+        self._track_id(emp_id)
+        self._dirty = True
+        self._changes[emp_id] = emp
+        if self.journal is not None:
+            self.journal.append_put(emp_id, emp)
+        return emp
+
+    def _store_point(self, emp_id, emp, current):
+        """put()/remove() bookkeeping without the records loaded; emp is None for a delete."""
+        current_version = current.version if current is not None else 0
+        self._base_versions.setdefault(emp_id, current_version)
+        self._before.setdefault(emp_id, current)
+        if emp is not None:
+            emp.version = current_version + 1
+        earlier = self._changes.get(emp_id)
+        if earlier is not None:
+            self._pending_names[Validation.normalize(earlier.get_name())].discard(emp_id)
+        if emp is not None:
+            self._pending_names.setdefault(Validation.normalize(emp.get_name()), set()).add(emp_id)
+        self.generation += 1
+        self._dirty = True
+        self._changes[emp_id] = emp
+
+    @metrics.timed("remove")
+    def remove(self, emp_id, expected_version=None):
+        """Delete emp_id; with expected_version, only if nobody changed it since it was read."""
+        if self._point_writes():
+            current = self.get(emp_id)
+            if current is not None and expected_version is not None and current.version != expected_version:
+                raise RecordConflict([emp_id])
+            if current is not None:
+                self._store_point(emp_id, None, current)
+            return current
+        data = self.records()
+        current = data.get(emp_id)
+        if current is not None and expected_version is not None and current.version != expected_version:
+            raise RecordConflict([emp_id])
+        emp = data.pop(emp_id, None)
+        if emp is not None:
+            self._base_versions.setdefault(emp_id, emp.version)
+            self._before.setdefault(emp_id, emp)
+            if self._sorted_ids is not None:
+                pos = bisect.bisect_left(self._sorted_keys, id_sort_key(emp_id))
+                del self._sorted_keys[pos]
+                del self._sorted_ids[pos]
+            self.indexes.discard(emp_id)
+            self.versions.discard(emp_id)
+            self.generation += 1
+            self._dirty = True
+            self._changes[emp_id] = None
+            if self.journal is not None:
+                self.journal.append_delete(emp_id)
+        return emp
+
+    @metrics.timed("commit")
+    def commit(self):
+        """Persist put()/remove() calls. Raises RecordConflict (and rolls back) on a lost update."""
+        if not self._changes:
+            return  # nothing to write, and no reason to export the JSON snapshot again
+        if self._records is None:
+            return self._commit_points()
+        with self.lock:
+            if self._changes and self._file_stamp() != self._stamp:
+                self._merge_outside_changes()
+            if self.journal is None:
+                self.storage.apply_changes(self._records, self._changes)
+                metrics.count("records_written_total", len(self._changes), backend=self.storage.name)
+                snapshot_exporter.schedule(self.versions.pin(self.generation))
+            else:
+                self.journal.flush()
+                if self.journal.needs_checkpoint():
+                    self.checkpoint()
+            self._publish_changes()
+            self._stamp = self._file_stamp()
+        self._changes = {}
+        self._pending_names = {}
+        self._base_versions = {}
+        self._before = {}
+        self._dirty = False
+
+    def _commit_points(self):
+        """
+        commit() for changes made without loading the records: under the lock,
+        each changed record is re-read and its version checked, then only those
+        records are written. The JSON snapshot needs every record, so it is
+        scheduled to read them back from storage when it runs, outside the lock.
+        """
+        with self.lock:
+            conflicts = []
+            for emp_id, base_version in self._base_versions.items():
+                theirs = self.storage.get(emp_id)
+                if (theirs.version if theirs is not None else 0) != base_version:
+                    conflicts.append(emp_id)
+            if conflicts:
+                self.rollback()
+                raise RecordConflict(conflicts)
+            self.storage.apply_changes(None, self._changes)
+            metrics.count("records_written_total", len(self._changes), backend=self.storage.name)
+            self._publish_changes()
+        if JSON_SNAPSHOT_AFTER_POINT_WRITES:
+            snapshot_exporter.schedule(self._committed_records)
+        self._changes = {}
+        self._pending_names = {}
+        self._base_versions = {}
+        self._before = {}
+        self._dirty = False
+
+    def _committed_records(self):
+        """
+        Every committed record, for the JSON snapshot after point commits. It
+        may run on the exporter's thread, so it opens a storage of its own.
+        """
+        storage = type(self.storage)(self.storage.paths()[0], migrate_from=None)
+        try:
+            with FileLock(self.lock.lock_file):
+                return load_all_records(storage)
+        finally:
+            storage.close()
 
-def sort_pairs_by_salary(pairs, descending=False):
-    """Bubble-sort by salary."""
-    result = pairs[:]
-    n = len(result)
-    for i in range(n - 1):
-        for j in range(0, n - i - 1):
-            a = float(result[j][1].get_salary())
-            b = float(result[j + 1][1].get_salary())
-            swap_needed = (a < b) if descending else (a > b)
-            if swap_needed:
-                result[j], result[j + 1] = result[j + 1], result[j]
-    return result
+    def _publish_changes(self):
+        if self.feed is None:
+            return
+        entries = []
+        for emp_id, after in self._changes.items():
+            before = self._before.get(emp_id)
+            if before is None and after is None:
+                continue  # added and deleted again before the commit
+            op = "add" if before is None else "delete" if after is None else "update"
+            entries.append((op, emp_id, before.to_dict() if before is not None else None,
+                            after.to_dict() if after is not None else None))
+        if entries:
+            self.feed.append(entries)
 
-def sort_pairs_by_name(pairs):
-    """Bubble-sort by name (case-insensitive)."""
-    result = pairs[:]
-    n = len(result)
-    for i in range(n - 1):
-        for j in range(0, n - i - 1):
-            a = Validation.normalize(result[j][1].get_name())
-            b = Validation.normalize(result[j + 1][1].get_name())
-            if a > b:
-                result[j], result[j + 1] = result[j + 1], result[j]
-    return result
+    def _merge_outside_changes(self):
+        """Another process committed since we loaded: re-read it and re-apply our changes on top."""
+        latest = self._load_with_journal()
+        conflicts = []
+        for emp_id, base_version in self._base_versions.items():
+            theirs = latest.get(emp_id)
+            if (theirs.version if theirs is not None else 0) != base_version:
+                conflicts.append(emp_id)
+        if conflicts:
+            self.rollback()
+            raise RecordConflict(conflicts)
+        for emp_id, emp in self._changes.items():
+            if emp is None:
+                latest.pop(emp_id, None)
+            else:
+                latest[emp_id] = emp
+        self._records = latest
+        self._on_loaded()
 
-def sort_pairs_by_position_random(pairs, allowed_positions):
-    """
-    Group by a randomised order of positions; inside each group sort by name.
-    Returns (sorted_pairs, order_used).
-    """
-    positions = list(allowed_positions)
-    random.shuffle(positions)
-    grouped = []
-    # Add known positions in the random order
-    for pos in positions:
-        group = []
-        for emp_id, emp in pairs:
-            if emp.get_position() == pos:
-                group.append((emp_id, emp))
-        group = sort_pairs_by_name(group)
-        grouped.extend(group)
-    # Add any unknown positions at the end (also sorted by name)
-    others = []
-    for emp_id, emp in pairs:
-        if emp.get_position() not in positions:
-            others.append((emp_id, emp))
-    others = sort_pairs_by_name(others)
-    grouped.extend(others)
-    return grouped, positions
+    @metrics.timed("checkpoint")
+    def checkpoint(self):
+        """Write everything to storage (+ JSON snapshot) and empty the journal."""
+        if self._records is None:
+            return
+        with self.lock:
+            if self.journal is not None:
+                self.journal.flush()
+            save_all_records(self._records, self.storage, export_from=self.versions.pin(self.generation))
+            if self.journal is not None:
+                self.journal.reset()
+            self._stamp = self._file_stamp()
 
-# -----------------------------------------------------------------------------
-# Persistence (pickle + JSON snapshot)
-# -----------------------------------------------------------------------------
-def load_all_records():
-    if not os.path.exists(PICKLE_FILE):
-        return {}
-    try:
-        with open(PICKLE_FILE, "rb") as fh:
-            data = pickle.load(fh)
-            return data if isinstance(data, dict) else {}
-    except (OSError, EOFError, pickle.UnpicklingError):
-        return {}
+    def rollback(self):
+        """Drop uncommitted put()/remove() calls; the next read reloads from storage."""
+        if self.journal is not None:
+            self.journal.discard_pending()
+        self._records = None
+        self._stamp = None
+        self._changes = {}
+        self._pending_names = {}
+        self._base_versions = {}
+        self._before = {}
+        self._dirty = False
 
-def export_json_snapshot(records_dict, json_file=JSON_SNAPSHOT_FILE):
-    try:
-        as_dict = {emp_id: emp.to_dict() for emp_id, emp in records_dict.items()}
-        with open(json_file, "w", encoding="utf-8") as jh:
-            json.dump(as_dict, jh, indent=2)
-    except Exception as e:
-        print_warning(f"Snapshot export failed: {e}")
+    def replace_all(self, records_dict):
+        old = self.records() if self.feed is not None else {}
+        self._records = dict(records_dict)
+        for emp in self._records.values():
+            if emp.version == 0:
+                emp.version = 1
+        self._on_loaded()
+        if self.journal is not None:
+            self.journal.discard_pending()
+        self._changes = {}
+        self._base_versions = {}
+        self._dirty = False
+        with self.lock:
+            self.checkpoint()
+            # Feed the difference as ordinary changes
+            self._changes = {emp_id: self._records.get(emp_id)
+                             for emp_id in sorted(set(old) | set(self._records), key=id_sort_key)}
+            self._before = {emp_id: old.get(emp_id) for emp_id in self._changes}
+            self._publish_changes()
+        self._changes = {}
+        self._before = {}
 
-def save_all_records(records_dict):
-    with open(PICKLE_FILE, "wb") as fh:
-        pickle.dump(records_dict, fh)
-    export_json_snapshot(records_dict)
+def open_record_store(backend=None, journal=None):
+    storage = open_storage(backend)
+    # The journal only pays off for whole-file storage; SQLite already writes per row
+    use_journal = (JOURNAL_MODE if journal is None else journal) and storage.name == "pickle"
+    return RecordStore(storage, journal_file=JOURNAL_FILE if use_journal else None)
 
-def next_sequential_id(records_dict):
-    max_num = 0
-    for emp_id in records_dict.keys():
-        if str(emp_id).isdigit():
-            n = int(emp_id)
-            if n > max_num:
-                max_num = n
-    return str(max_num + 1).zfill(3)
+store = open_record_store()
 
 def seed_defaults_if_empty():
-    data = load_all_records()
-    if data:
+    if store.has_records():
         return
     data = {
         "001": Employee("Olivia Brown", 34, "Manager", 125000.0, "IT", "Melbourne",
@@ -360,30 +3481,279 @@ def seed_defaults_if_empty():
         "004": Employee("Liam Taylor", 26, "Analyst", 90000.0, "Finance", "Adelaide",
                         "liam.taylor@example.com", "004"),
     }
-    save_all_records(data)
+    store.replace_all(data)
+    snapshot_exporter.flush()
     print_success("Employee file initialized with seed records (IDs 001–004)")
     print_info("Pickle (live) and JSON snapshot are both up to date")
     print_last_modified_summary()
 
 # -----------------------------------------------------------------------------
-# Responsive table
+# Bulk import (CSV / JSON Lines)
 # -----------------------------------------------------------------------------
-def print_table(title_text, records_dict, preserve_order=False):
-    if not records_dict:
-        print_info("No records found.")
+def _canonical_choices(options_tuple):
+    return {Validation.normalize(option): option for option in options_tuple}
+
+def iter_import_rows(path):
+    """Yield (line_number, row_dict) from a .csv file (with a header) or a JSON Lines file."""
+    if path.lower().endswith(".csv"):
+        import csv
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            reader = csv.reader(fh)
+            header = [Validation.normalize(k) for k in next(reader, [])]
+            for values in reader:
+                if values:
+                    yield reader.line_num, dict(zip(header, values))
         return
+    with open(path, encoding="utf-8") as fh:
+        for line_number, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, {"__error__": f"invalid JSON: {e}"}
+                continue
+            if not isinstance(row, dict):
+                yield line_number, {"__error__": "not a JSON object"}
+                continue
+            yield line_number, {Validation.normalize(k): v for k, v in row.items()}
 
-    items = list(records_dict.items())
-    if not preserve_order:
-        items = sort_pairs_by_id(items)
+class ImportValidator:
+    """Checks import rows with the same rules as the interactive prompts."""
 
-    if not RICH_AVAILABLE:
-        print(title_text)
-        for emp_id, emp in items:
-            print(f"- [{emp_id}] {emp.get_name()} ({emp.get_age()}) - {emp.get_position()} "
-                  f"@ {emp.department}/{emp.location} - "
-                  f"${float(emp.get_salary()):,.2f} | Created: {emp.created_at} | "
-                  f"Updated: {emp.updated_at or '—'}")
+    def __init__(self, name_taken):
+        self.name_taken = name_taken
+        self.positions = _canonical_choices(ALLOWED_POSITIONS)
+        self.departments = _canonical_choices(ALLOWED_DEPARTMENTS)
+        self.locations = _canonical_choices(ALLOWED_LOCATIONS)
+        self.seen_names = set()
+
+    def check_field(self, field, value):
+        """(clean_value, None) if value is valid for field, else (None, reason). No uniqueness check."""
+        if value is None or str(value).strip() == "":
+            return None, "missing " + field
+        text = str(value).strip()
+        if field == "name":
+            return text, None
+        if field == "age":
+            if not Validation.AGE_REGEX.fullmatch(text):
+                return None, "age must be 16-70"
+            return int(text), None
+        if field == "salary":
+            try:
+                salary = float(text)
+            except ValueError:
+                return None, "salary is not a number"
+            if math.isnan(salary) or math.isinf(salary):
+                return None, "salary is not a number"
+            return salary, None
+        if field == "email":
+            if not Validation.EMAIL_REGEX.fullmatch(text):
+                return None, "invalid email"
+            return text, None
+        choices = {"position": self.positions, "department": self.departments,
+                   "location": self.locations}.get(field)
+        if choices is None:
+            return None, "unknown field " + field
+        canonical = choices.get(Validation.normalize(text))
+        if canonical is None:
+            return None, "unknown " + field
+        return canonical, None
+
+    def check(self, row):
+        """(field_values, None) for a good row, or (None, reason) for a bad one."""
+        if "__error__" in row:
+            return None, row["__error__"]
+        missing = [f for f in IMPORT_FIELDS if row.get(f) is None or str(row.get(f)).strip() == ""]
+        if missing:
+            return None, "missing " + ", ".join(missing)
+
+        values = []
+        for field in IMPORT_FIELDS:
+            value, reason = self.check_field(field, row[field])
+            if reason is not None:
+                return None, reason
+            values.append(value)
+        name_key = Validation.normalize(values[0])
+        if name_key in self.seen_names or self.name_taken(values[0]):
+            return None, "duplicate name"
+        self.seen_names.add(name_key)
+        return tuple(values), None
+
+@metrics.timed("import")
+def import_employees(path, reject_file=None, target=None):
+    """
+    Stream `path` (CSV or JSONL) into the store and commit once at the end.
+    Bad rows are written to reject_file as JSON lines with the reason.
+    Returns {"imported": n, "rejected": n, "reject_file": path or None}.
+    """
+    target = target or store
+    reject_file = reject_file or path + ".rejects.jsonl"
+    validator = ImportValidator(target.name_taken)
+    free_ids = []
+    reserved = []  # every ID allocated, handed back if the import fails
+    imported = 0
+    rejected = 0
+    reject_fh = None
+    created = now_micros()
+    try:
+        for line_number, row in iter_import_rows(path):
+            values, reason = validator.check(row)
+            if values is None:
+                if reject_fh is None:
+                    reject_fh = open(reject_file, "w", encoding="utf-8")
+                reject_fh.write(json.dumps({"line": line_number, "reason": reason, "row": row}) + "\n")
+                rejected += 1
+                continue
+            if not free_ids:
+                free_ids = target.allocate_ids(IMPORT_ID_BLOCK)
+                reserved.extend(free_ids)
+                free_ids.reverse()  # pop() from the end hands them out in order
+            emp_id = free_ids.pop()
+            emp = Employee(*values, employee_id=emp_id)
+            emp.created_at = created
+            target.put(emp_id, emp)
+            imported += 1
+        target.release_ids(free_ids)
+        if imported:
+            target.commit()
+    except BaseException:
+        target.rollback()
+        target.release_ids(reserved)
+        raise
+    finally:
+        if reject_fh is not None:
+            reject_fh.close()
+    return {"imported": imported, "rejected": rejected, "reject_file": reject_file if rejected else None}
+
+# -----------------------------------------------------------------------------
+# Bulk update (one filter, one action, one commit)
+# -----------------------------------------------------------------------------
+BULK_FILTERS = ("position", "department", "location", "min_salary", "max_salary")
+
+def _bulk_number(name, raw):
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a number")
+    return value
+
+def bulk_match(target, filters):
+    """
+    IDs, in ID order, of the employees matching every filter in {name: value}
+    (names from BULK_FILTERS; salary bounds are inclusive). The categories are
+    looked up in the hash indexes, so only the matching rows are read.
+    """
+    unknown = sorted(set(filters) - set(BULK_FILTERS))
+    if unknown:
+        raise ValueError("unknown filter(s): " + ", ".join(unknown))
+    validator = ImportValidator(target.name_taken)
+    criteria = {}
+    for field in BULK_FILTERS[:3]:
+        if filters.get(field) is not None:
+            value, reason = validator.check_field(field, filters[field])
+            if reason is not None:
+                raise ValueError(reason)
+            criteria[field] = value
+    low = _bulk_number("min_salary", filters["min_salary"]) if filters.get("min_salary") is not None else None
+    high = _bulk_number("max_salary", filters["max_salary"]) if filters.get("max_salary") is not None else None
+
+    data = target.records()
+    ids = target.indexes.find(**criteria)
+    if low is not None or high is not None:
+        ids = [emp_id for emp_id in ids
+               if (low is None or data[emp_id].get_salary() >= low)
+               and (high is None or data[emp_id].get_salary() <= high)]
+    return sorted(ids, key=id_sort_key)
+
+def _bulk_field(emp, field):
+    if field == "position":
+        return emp.get_position()
+    if field == "salary":
+        return float(emp.get_salary())
+    return getattr(emp, field)
+
+@metrics.timed("bulk_update")
+def bulk_update(target, filters, set_fields=None, scale=None, offset=None, dry_run=False):
+    """
+    Change every employee matching `filters` (see bulk_match()) in one pass:
+    set_fields {field: raw value} (fields from BULK_SET_FIELDS) and/or a new
+    salary of salary * scale + offset, rounded to cents. Records already as
+    asked are left alone; the rest get one shared updated_at and go to the
+    store in a single put_many(), which the caller commits. dry_run only counts.
+    Raises ValueError for a bad filter or action, or a salary below zero.
+    Returns {"matched": n, "updated": n, "payroll_change": amount, "dry_run": bool}.
+    """
+    validator = ImportValidator(target.name_taken)
+    changes = {}
+    for field, raw in (set_fields or {}).items():
+        field = Validation.normalize(field)
+        if field not in BULK_SET_FIELDS:
+            raise ValueError(f"cannot bulk-set {field}; one of: " + ", ".join(BULK_SET_FIELDS))
+        value, reason = validator.check_field(field, raw)
+        if reason is not None:
+            raise ValueError(reason)
+        changes[field] = value
+    rescale = scale is not None or offset is not None
+    if rescale and "salary" in changes:
+        raise ValueError("set the salary or scale/offset it, not both")
+    if not changes and not rescale:
+        raise ValueError("nothing to change: set a field, or scale or offset the salary")
+    scale = 1.0 if scale is None else _bulk_number("scale", scale)
+    offset = 0.0 if offset is None else _bulk_number("offset", offset)
+    if scale <= 0:
+        raise ValueError("scale must be above 0")
+
+    data = target.records()
+    ids = bulk_match(target, filters)
+    stamp = now_micros()
+    updated = []
+    payroll_change = 0.0
+    below_zero = 0
+    for emp_id in ids:
+        current = data[emp_id]
+        salary = float(current.get_salary())
+        new_salary = round(salary * scale + offset, 2) if rescale else changes.get("salary", salary)
+        if new_salary < 0:
+            below_zero += 1
+            continue
+        if new_salary == salary and all(_bulk_field(current, f) == v for f, v in changes.items()):
+            continue
+        emp = copy.copy(current)
+        for field, value in changes.items():
+            if field == "position":
+                emp.set_position(value)
+            elif field != "salary":
+                setattr(emp, field, value)
+        emp.set_salary(new_salary)
+        emp.updated_at = stamp
+        updated.append((emp_id, emp))
+        payroll_change += new_salary - salary
+    if below_zero:
+        raise ValueError(f"{below_zero} salary(ies) would drop below zero")
+    if updated and not dry_run:
+        target.put_many(updated)
+    return {"matched": len(ids), "updated": len(updated), "payroll_change": round(payroll_change, 2),
+            "dry_run": bool(dry_run)}
+
+# -----------------------------------------------------------------------------
+# Responsive table
+# -----------------------------------------------------------------------------
+@metrics.timed("render")
+def _render_table_page(title_text, pairs):
+    """Render one page of (id, Employee) pairs."""
+    if not rich_enabled():
+        lines = [title_text]
+        for emp_id, emp in pairs:
+            lines.append(f"- [{emp_id}] {emp.get_name()} ({emp.get_age()}) - {emp.get_position()} "
+                         f"@ {emp.department}/{emp.location} - "
+                         f"${float(emp.get_salary()):,.2f} | Created: {format_timestamp(emp.created_at)} | "
+                         f"Updated: {format_timestamp(emp.updated_at) or '—'}")
+        # One buffered write per page instead of a print() per row
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
         return
 
     term_width = console.size.width
@@ -410,7 +3780,7 @@ def print_table(title_text, records_dict, preserve_order=False):
     table.add_column("Updated", style=RICH_STYLES["updated"],
                      min_width=(16 if compact else 19), overflow="fold")
 
-    for emp_id, emp in items:
+    for emp_id, emp in pairs:
         table.add_row(
             emp_id,
             str(emp.get_name()),
@@ -420,11 +3790,94 @@ def print_table(title_text, records_dict, preserve_order=False):
             str(emp.department),
             str(emp.location),
             str(emp.email),
-            str(emp.created_at),
-            str(emp.updated_at or "—"),
+            format_timestamp(emp.created_at),
+            format_timestamp(emp.updated_at) or "—",
         )
     console.print(table)
 
+def prompt_page_navigation(page, pages):
+    """Ask where to go next. Returns the new 0-based page, or None to stop paging."""
+    while True:
+        try:
+            text = input(f"Page {page + 1}/{pages} — [Enter/n] next, [p] prev, "
+                         f"[j N] jump to page N, [q] back to menu: ").strip().lower()
+        except EOFError:
+            return None
+        if text in ("", "n"):
+            if page + 1 < pages:
+                return page + 1
+            return None  # past the last page: done
+        if text == "p":
+            return max(page - 1, 0)
+        if Validation.is_cancel_text(text):
+            return None
+        if text.startswith("j"):
+            text = text[1:].strip()
+        if text.isdigit() and 1 <= int(text) <= pages:
+            return int(text) - 1
+        print_error(f"Enter n, p, q or a page number between 1 and {pages}.")
+
+def print_table(title_text, records_dict, preserve_order=False, page_size=None, ordered_ids=None):
+    """
+    Show records a page at a time. Only the visible page is built and
+    rendered, so the first screen costs the same for 10 or 1M records.
+    ordered_ids (optional) gives the display order up front, e.g. the store's
+    cached ID order; otherwise it is ID order, or dict order if preserve_order.
+    page_size 0 shows everything at once; None uses TABLE_PAGE_SIZE.
+    """
+    if not records_dict:
+        print_info("No records found.")
+        return
+
+    if ordered_ids is None:
+        if preserve_order:
+            ordered_ids = list(records_dict)
+        else:
+            ordered_ids = sorted(records_dict, key=id_sort_key)
+    if page_size is None:
+        page_size = TABLE_PAGE_SIZE
+    total = len(ordered_ids)
+    if page_size <= 0 or total <= page_size:
+        _render_table_page(title_text, [(emp_id, records_dict[emp_id]) for emp_id in ordered_ids])
+        return
+
+    pages = (total + page_size - 1) // page_size
+    page = 0
+    while page is not None:
+        start = page * page_size
+        end = min(start + page_size, total)
+        pairs = [(emp_id, records_dict[emp_id]) for emp_id in ordered_ids[start:end]]
+        _render_table_page(f"{title_text} — page {page + 1}/{pages} ({start + 1}-{end} of {total})", pairs)
+        page = prompt_page_navigation(page, pages)
+
+def print_report_table(title_text, rows, group_label="Group"):
+    if not rows:
+        print_info("No records found.")
+        return
+    pct_keys = ["p" + str(pct) for pct in REPORT_PERCENTILES if pct != 50]
+    headers = [group_label, "Headcount", "Total", "Mean", "Median"] + [k.upper() for k in pct_keys] + ["Min", "Max"]
+    lines = []
+    for row in rows:
+        money = [row["total"], row["mean"], row["median"]] + [row[k] for k in pct_keys] + [row["min"], row["max"]]
+        lines.append([str(row["group"]), str(row["count"])] + [f"${v:,.2f}" for v in money])
+
+    if not rich_enabled():
+        widths = [max(len(h), *(len(line[i]) for line in lines)) for i, h in enumerate(headers)]
+        print(title_text)
+        print("  ".join(h.ljust(w) if i == 0 else h.rjust(w) for i, (h, w) in enumerate(zip(headers, widths))))
+        for line in lines:
+            print("  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(line, widths))))
+        return
+
+    table = Table(title=title_text, box=box.ROUNDED, header_style=RICH_STYLES["header"], expand=True, pad_edge=False)
+    table.add_column(headers[0], style=RICH_STYLES["position"], overflow="fold")
+    table.add_column(headers[1], justify="right", no_wrap=True)
+    for header in headers[2:]:
+        table.add_column(header, style=RICH_STYLES["salary"], justify="right", overflow="fold")
+    for line in lines:
+        table.add_row(*line)
+    console.print(table)
+
 # -----------------------------------------------------------------------------
 # Menu UI
 # -----------------------------------------------------------------------------
@@ -433,11 +3886,11 @@ def show_welcome_message():
         "Welcome to the Employee Management System\n\n"
         "• After each change we also export a JSON snapshot for sharing/reporting.\n"
         "• Seed IDs 001–004. New employees get 005, 006, ...\n"
-        "• Use the menu to Add, View, Update by ID, Delete by ID, Search, or Sort.\n"
+        "• Use the menu to Add, View, Update by ID, Delete by ID, Search, Sort, run Reports, or Import.\n"
         "• Type 'Q' at any prompt to cancel and return to the main menu.\n"
         "• After each change, the files’ last modified times are shown."
     )
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.print(Panel(message, title="Welcome", border_style=RICH_STYLES["title"]))
     else:
         print("\n" + message + "\n")
@@ -451,10 +3904,12 @@ def show_menu(has_records):
         "4) Delete Employee",
         "5) Search Employee",
         "6) Sort Employees",
-        "7) Exit",
+        "7) Reports",
+        "8) Import Employees (CSV/JSONL)",
+        "9) Exit",
     ]
     body = "\n".join(lines)
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.print(Panel(body, title="Menu", border_style=RICH_STYLES["title"]))
     else:
         print("\n" + body + "\n")
@@ -462,7 +3917,7 @@ def show_menu(has_records):
 def choose_from_indexed(label, options_tuple, allow_cancel=False):
     body_lines = [f"{i}) {opt}" for i, opt in enumerate(options_tuple, start=1)]
     body = "\n".join(body_lines)
-    if RICH_AVAILABLE:
+    if rich_enabled():
         console.print(Panel(body, title=label, border_style=RICH_STYLES["title"]))
     else:
         print(f"\n{label}\n{body}\n")
@@ -476,17 +3931,14 @@ def choose_from_indexed(label, options_tuple, allow_cancel=False):
 # CRUD + Search/Sort
 # -----------------------------------------------------------------------------
 def add_employee():
-    data = load_all_records()
     print_title("Add Employee")
     print_info("Tip: type 'Q' at any prompt to cancel and return to the main menu.")
 
-    name_set = {Validation.normalize(emp.get_name()) for emp in data.values()}
-
     while True:
         name_value = Validation.prompt_non_empty("Name: ", allow_cancel=True)
         if name_value is None:
             print_info("Add cancelled."); return
-        if Validation.normalize(name_value) in name_set:
+        if store.name_taken(name_value):
             print_error("An employee with this name already exists. Enter a different name.")
             continue
         break
@@ -515,37 +3967,37 @@ def add_employee():
     if email_value is None:
         print_info("Add cancelled."); return
 
-    new_id = next_sequential_id(data)
+    new_id = store.allocate_ids(1)[0]
     emp = Employee(name_value, age_value, position_value, salary_value,
                    department_value, location_value, email_value, employee_id=new_id)
 
-    data[new_id] = emp
-    save_all_records(data)
+    store.put(new_id, emp)
+    store.commit()
     print_success(f"Employee [{new_id}] '{name_value}' added successfully.")
     print_last_modified_summary()
 
-def view_all_employees():
+def view_all_employees(page_size=None):
     print_title("All Current Employees")
-    data = load_all_records()
-    print_table("Current Employees", data)
+    data = store.records()
+    print_table("Current Employees", data, page_size=page_size, ordered_ids=store.sorted_ids())
 
 def update_employee():
-    data = load_all_records()
-    if not data:
+    if not store.has_records():
         print_info("No records to update."); return
 
     print_title("Update Employee (by ID)")
     print_info("Tip: type 'Q' at any prompt to cancel and return to the main menu.")
     target_id = Validation.prompt_non_empty("Enter the EMPLOYEE ID to update: ", allow_cancel=True)
-    if target_id is None or target_id not in data:
+    current = store.get(target_id) if target_id is not None else None
+    if current is None:
         print_info("Update cancelled or ID not found."); return
 
-    emp = data[target_id]
-    name_set = {Validation.normalize(e.get_name()) for k, e in data.items() if k != target_id}
+    # Edit a private copy so a cancelled update leaves the stored record untouched
+    emp = copy.copy(current)
 
     changed = False
     while True:
-        if RICH_AVAILABLE:
+        if rich_enabled():
             info_lines = [
                 "1) Name       : " + str(emp.get_name()),
                 "2) Age        : " + str(emp.get_age()),
@@ -571,7 +4023,7 @@ def update_employee():
             new_name = Validation.prompt_non_empty("New name: ", allow_cancel=True)
             if new_name is None:
                 continue
-            if Validation.normalize(new_name) in name_set:
+            if store.name_taken(new_name, exclude_id=target_id):
                 print_error("Another employee with this name already exists.")
                 continue
             emp.set_name(new_name); changed = True
@@ -613,48 +4065,59 @@ def update_employee():
             emp.email = new_email; changed = True
 
         if changed:
-            emp.updated_at = now_text()
+            emp.updated_at = now_micros()
             print_success("Field updated. Choose another field or select 'Done'.")
 
     if changed:
-        data[target_id] = emp
-        save_all_records(data)
+        try:
+            store.put(target_id, emp)
+            store.commit()
+        except RecordConflict:
+            store.rollback()
+            print_error(f"Employee [{target_id}] was changed or deleted by someone else while you were "
+                        "editing. Nothing was saved — please look at it again and redo your changes.")
+            return
         print_success(f"Employee [{target_id}] updated successfully.")
         print_last_modified_summary()
     else:
         print_info("No changes made.")
 
 def delete_employee():
-    data = load_all_records()
-    if not data:
+    if not store.has_records():
         print_info("No records to delete."); return
 
     print_title("Delete Employee (by ID)")
     print_info("Tip: type 'Q' at any prompt to cancel and return to the main menu.")
     target_id = Validation.prompt_non_empty("Enter the EMPLOYEE ID to delete: ", allow_cancel=True)
-    if target_id is None or target_id not in data:
+    emp = store.get(target_id) if target_id is not None else None
+    if emp is None:
         print_info("Delete cancelled or ID not found."); return
 
-    emp = data[target_id]
     print_warning(f"About to delete [{target_id}] {emp.get_name()} — "
                   f"{emp.get_position()} ({emp.department}/{emp.location})")
     confirm = Validation.prompt_non_empty("Are you sure you want to delete? (y/n): ", allow_cancel=True)
     if confirm is None or confirm.lower() != "y":
         print_info("Delete cancelled."); return
 
-    del data[target_id]
-    save_all_records(data)
+    try:
+        store.remove(target_id, expected_version=emp.version)
+        store.commit()
+    except RecordConflict:
+        store.rollback()
+        print_error(f"Employee [{target_id}] was changed or deleted by someone else in the meantime. "
+                    "Nothing was deleted.")
+        return
     print_success(f"Employee [{target_id}] '{emp.get_name()}' deleted successfully.")
     print_last_modified_summary()
 
-def search_employee():
+def search_employee(page_size=None):
     print_title("Search Employee")
     print_info("Tip: type 'Q' at any prompt to cancel and return to the main menu.")
-    data = load_all_records()
-    if not data:
+    if not store.has_records():
         print_info("No records to search."); return
 
-    mode = choose_from_indexed("Search by", ("ID", "Name"), allow_cancel=True)
+    mode = choose_from_indexed("Search by", ("ID", "Name", "Email", "Position / Department / Location"),
+                               allow_cancel=True)
     if mode is None:
         print_info("Search cancelled."); return
 
@@ -662,54 +4125,1150 @@ def search_employee():
         q = Validation.prompt_non_empty("Enter Employee ID: ", allow_cancel=True)
         if q is None:
             print_info("Search cancelled."); return
-        results = {q: data[q]} if q in data else {}
-    else:
-        q = Validation.prompt_non_empty("Enter Name (exact, case-insensitive): ", allow_cancel=True)
+        emp = store.get(q)
+        results = {q: emp} if emp is not None else {}
+    elif mode == "Name":
+        match = choose_from_indexed("Name match", ("Exact", "Starts with", "Contains", "Fuzzy (typos ok)"),
+                                    allow_cancel=True)
+        if match is None:
+            print_info("Search cancelled."); return
+        q = Validation.prompt_non_empty("Enter Name (case-insensitive): ", allow_cancel=True)
+        if q is None:
+            print_info("Search cancelled."); return
+        if match == "Exact":
+            results = store.find(name=q)
+        else:
+            name_mode = {"Starts with": "prefix", "Contains": "contains", "Fuzzy (typos ok)": "fuzzy"}[match]
+            ranked = store.search_names(q, mode=name_mode)
+            if not ranked:
+                print_info("No matches."); return
+            # Best matches first, so keep the ranking instead of ID order
+            print_table("Search Results", dict(ranked), preserve_order=True, page_size=page_size)
+            return
+    elif mode == "Email":
+        q = Validation.prompt_non_empty("Enter Email (exact, case-insensitive): ", allow_cancel=True)
         if q is None:
             print_info("Search cancelled."); return
-        qn = Validation.normalize(q)
-        results = {}
-        for emp_id, emp in data.items():
-            if Validation.normalize(emp.get_name()) == qn:
-                results[emp_id] = emp
+        results = store.find(email=q)
+    else:
+        criteria = {}
+        for field, label, options in (("position", "Position", ALLOWED_POSITIONS),
+                                      ("department", "Department", ALLOWED_DEPARTMENTS),
+                                      ("location", "Location", ALLOWED_LOCATIONS)):
+            picked = choose_from_indexed(f"{label} (1 = any)", ("Any",) + options, allow_cancel=True)
+            if picked is None:
+                print_info("Search cancelled."); return
+            if picked != "Any":
+                criteria[field] = picked
+        results = store.find(**criteria)
 
     if not results:
         print_info("No matches."); return
-    print_table("Search Results", results)
+    print_table("Search Results", results, page_size=page_size)
+
+def choose_salary_filter():
+    """Optional department and location for a salary query: (department, location), or None if cancelled."""
+    department = choose_from_indexed("Department", ("Any",) + ALLOWED_DEPARTMENTS, allow_cancel=True)
+    if department is None:
+        return None
+    location = choose_from_indexed("Location", ("Any",) + ALLOWED_LOCATIONS, allow_cancel=True)
+    if location is None:
+        return None
+    return (None if department == "Any" else department, None if location == "Any" else location)
 
-def sort_employees():
+GROUP_VIEWS = {
+    "Department": ("department",),
+    "Location": ("location",),
+    "Department + location": ("department", "location"),
+}
+
+def sort_employees(page_size=None):
     """
-    Sort by Salary or Position.
-      • Salary: 'Lowest to Largest' / 'Largest to Lowest'.
+    Sort by Salary or Position, group by department/location, or ask salary questions.
+      • Salary: 'Lowest to Largest' / 'Largest to Lowest' (read off the salary index).
       • Position: RANDOMISED group order each time (shows 'random').
+      • Department / Location / both: grouped in GROUP_ORDER, names sorted inside each group.
+      • Top / bottom earners: the N highest or lowest paid, optionally per department/location.
+      • Salary range: everyone between two salaries, optionally per department/location.
+      • Recently changed: added or edited in the last N days, newest first.
     """
-    data = load_all_records()
+    data = store.records()
     if not data:
         print_info("No records to sort."); return
 
     print_title("Sort Employees")
     print_info("Tip: type 'Q' at any prompt to cancel and return to the main menu.")
 
-    sort_field = choose_from_indexed("Sort by", ("Salary", "Position"), allow_cancel=True)
+    sort_field = choose_from_indexed("Sort by", ("Salary", "Position") + tuple(GROUP_VIEWS)
+                                     + ("Top / bottom earners", "Salary range", "Recently changed"),
+                                     allow_cancel=True)
     if sort_field is None:
         print_info("Sort cancelled."); return
 
-    items = list(data.items())
-
     if sort_field == "Salary":
         order_choice = choose_from_indexed("Order", ("Lowest to Largest", "Largest to Lowest"), allow_cancel=True)
         if order_choice is None:
             print_info("Sort cancelled."); return
         is_desc = (order_choice == "Largest to Lowest")
-        items = sort_pairs_by_salary(items, descending=is_desc)
+        print_table("Sorted Employees", data, page_size=page_size, ordered_ids=store.salary_ids(is_desc))
+        return
+
+    if sort_field == "Top / bottom earners":
+        which = choose_from_indexed("Show", ("Highest paid", "Lowest paid"), allow_cancel=True)
+        count = None if which is None else \
+            Validation.prompt_menu_choice("How many (1-1000)? ", 1, 1000, allow_cancel=True)
+        where = None if count is None else choose_salary_filter()
+        if where is None:
+            print_info("Sort cancelled."); return
+        pairs = store.top_salaries(count, which == "Highest paid", *where)
+        print_table(f"{which} {count}", dict(pairs), preserve_order=True, page_size=page_size)
+        return
+
+    if sort_field == "Salary range":
+        low = Validation.prompt_float("Lowest salary: ", allow_cancel=True)
+        high = None if low is None else Validation.prompt_float("Highest salary: ", allow_cancel=True)
+        where = None if high is None else choose_salary_filter()
+        if where is None:
+            print_info("Sort cancelled."); return
+        if low > high:
+            low, high = high, low
+        pairs = store.salary_range(low, high, *where)
+        print_table(f"Salaries {low:,.0f} to {high:,.0f}", dict(pairs), preserve_order=True, page_size=page_size)
+        return
+
+    if sort_field == "Recently changed":
+        days = Validation.prompt_menu_choice("Changed in the last how many days (1-3650)? ", 1, 3650,
+                                             allow_cancel=True)
+        if days is None:
+            print_info("Sort cancelled."); return
+        pairs = store.time_range("updated_at", parse_time_spec(f"{days}d"), descending=True)
+        if not pairs:
+            print_info(f"Nothing changed in the last {days} day(s)."); return
+        print_table(f"Changed in the last {days} day(s)", dict(pairs), preserve_order=True, page_size=page_size)
+        return
+
+    if sort_field in GROUP_VIEWS:
+        groups, _ = group_pairs(data.items(), GROUP_VIEWS[sort_field], keys=[("name", False)])
+        print_info("Groups: " + ", ".join(f"{' / '.join(map(str, values))} ({len(bucket)})"
+                                          for values, bucket in groups))
+        ordered_ids = [emp_id for _, bucket in groups for emp_id, _ in bucket]
+        print_table(f"Employees by {sort_field.lower()}", data, page_size=page_size, ordered_ids=ordered_ids)
+        return
+
+    items, order_used = sort_pairs_by_position_random(list(data.items()), ALLOWED_POSITIONS)
+    print_info("Grouped by position in a random order : " + ", ".join(order_used))
+    print_table("Sorted Employees", data, page_size=page_size, ordered_ids=[emp_id for emp_id, _ in items])
+
+def show_reports():
+    data = store.records()
+    if not data:
+        print_info("No records to report on."); return
+
+    print_title("Payroll & Headcount Reports")
+    print_info("Tip: type 'Q' at any prompt to cancel and return to the main menu.")
+    group_label = choose_from_indexed("Group by", ("Department", "Location", "Position"), allow_cancel=True)
+    if group_label is None:
+        print_info("Reports cancelled."); return
+
+    rows = payroll_report(data, group_label.lower())
+    print_report_table(f"Salary by {group_label}", rows, group_label=group_label)
+    if not numpy_enabled():
+        print_info("Tip: install numpy for faster reports on large files (pip install numpy).")
+
+def import_employees_from_file():
+    print_title("Import Employees")
+    print_info("Tip: type 'Q' at any prompt to cancel and return to the main menu.")
+    print_info("CSV needs a header row; JSON Lines needs one object per line. "
+               "Fields: " + ", ".join(IMPORT_FIELDS))
+    path = Validation.prompt_non_empty("File to import: ", allow_cancel=True)
+    if path is None:
+        print_info("Import cancelled."); return
+    if not os.path.isfile(path):
+        print_error(f"File not found: {path}"); return
+
+    start = time.perf_counter()
+    result = import_employees(path)
+    elapsed = time.perf_counter() - start
+    if result["imported"]:
+        print_success(f"Imported {result['imported']} employee(s) in {elapsed:.2f}s.")
+        print_last_modified_summary()
     else:
-        items, order_used = sort_pairs_by_position_random(items, ALLOWED_POSITIONS)
-        print_info("Grouped by position in a random order : " + ", ".join(order_used))
+        print_info("No employees imported.")
+    if result["rejected"]:
+        print_warning(f"{result['rejected']} row(s) rejected — see {result['reject_file']}")
 
-    sorted_view = {}
-    for emp_id, emp in items:
-        sorted_view[emp_id] = emp
-    print_table("Sorted Employees", sorted_view, preserve_order=True)
+# -----------------------------------------------------------------------------
+# Command-line interface (non-interactive)
+# -----------------------------------------------------------------------------
+# Exit codes for scripted use
+EXIT_OK = 0
+EXIT_NOT_FOUND = 1
+EXIT_USAGE = 2
+EXIT_INVALID = 3
+EXIT_CONFLICT = 4
+
+CLI_OUTPUT_FIELDS = ("id",) + IMPORT_FIELDS + ("created_at", "updated_at", "version")
+
+def employee_record(emp_id, emp):
+    """Flat dict of one employee including its ID (the CLI/JSON output shape)."""
+    record = {"id": emp_id}
+    record.update(emp.to_dict())
+    return record
+
+def write_records(pairs, output_format, out=None):
+    """Write (id, Employee) pairs as JSON Lines or TSV (with a header row)."""
+    out = out or sys.stdout
+    lines = []
+    if output_format == "tsv":
+        lines.append("\t".join(CLI_OUTPUT_FIELDS))
+        for emp_id, emp in pairs:
+            record = employee_record(emp_id, emp)
+            cells = ["" if record[f] is None else str(record[f]) for f in CLI_OUTPUT_FIELDS]
+            lines.append("\t".join(c.replace("\t", " ").replace("\n", " ") for c in cells))
+    else:
+        for emp_id, emp in pairs:
+            lines.append(json.dumps(employee_record(emp_id, emp)))
+    if lines:
+        out.write("\n".join(lines) + "\n")
+
+def write_result(result, out=None):
+    """Write a one-line JSON summary (used by commands that do not list records)."""
+    (out or sys.stdout).write(json.dumps(result) + "\n")
+
+def cli_error(message, code):
+    sys.stderr.write(f"ems: {message}\n")
+    return code
+
+def read_stdin_objects():
+    """JSON objects from stdin: a single object, an array, or one object per line."""
+    text = sys.stdin.read().strip()
+    if not text:
+        return []
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        raise ValueError("expected a JSON object, an array of objects or JSON Lines")
+    return [{Validation.normalize(k): v for k, v in item.items()} for item in data]
+
+def _fields_from_args(args):
+    return {f: getattr(args, f) for f in IMPORT_FIELDS if getattr(args, f, None) is not None}
+
+def parse_sort_spec(text):
+    """'department,salary:desc,name' -> [("department", False), ("salary", True), ("name", False)]"""
+    keys = []
+    for part in text.split(","):
+        field, _, direction = part.strip().partition(":")
+        field = field.strip().lower()
+        direction = direction.strip().lower() or "asc"
+        if field not in SORT_KEYS or direction not in ("asc", "desc"):
+            raise ValueError(f"bad sort key: {part.strip()!r}")
+        keys.append((field, direction == "desc"))
+    return keys
+
+def edited_employee(target, emp_id, current, changes):
+    """Validated copy of `current` with {field: raw value} applied -> (Employee, None) or (None, reason)."""
+    validator = ImportValidator(target.name_taken)
+    emp = copy.copy(current)
+    for field, raw in changes.items():
+        value, reason = validator.check_field(field, raw)
+        if reason is not None:
+            return None, reason
+        if field == "name":
+            if target.name_taken(value, exclude_id=emp_id):
+                return None, "another employee with this name already exists"
+            emp.set_name(value)
+        elif field == "age":
+            emp.set_age(value)
+        elif field == "position":
+            emp.set_position(value)
+        elif field == "salary":
+            emp.set_salary(value)
+        else:
+            setattr(emp, field, value)
+    emp.updated_at = now_micros()
+    return emp, None
+
+def cli_add(args, target):
+    rows = read_stdin_objects() if args.stdin else [_fields_from_args(args)]
+    validator = ImportValidator(target.name_taken)
+    checked = []
+    for n, row in enumerate(rows, start=1):
+        values, reason = validator.check(row)
+        if values is None:
+            return cli_error(f"record {n}: {reason}", EXIT_INVALID)
+        checked.append(values)
+    if not checked:
+        return cli_error("nothing to add", EXIT_INVALID)
+    added = []
+    for values, emp_id in zip(checked, target.allocate_ids(len(checked))):
+        emp = Employee(*values, employee_id=emp_id)
+        target.put(emp_id, emp)
+        added.append((emp_id, emp))
+    target.commit()
+    write_records(added, args.format)
+    return EXIT_OK
+
+def cli_get(args, target):
+    found = []
+    missing = []
+    for emp_id in args.ids:
+        emp = target.get(emp_id)
+        if emp is None:
+            missing.append(emp_id)
+        else:
+            found.append((emp_id, emp))
+    write_records(found, args.format)
+    if missing:
+        return cli_error("not found: " + ", ".join(missing), EXIT_NOT_FOUND)
+    return EXIT_OK
+
+def cli_update(args, target):
+    current = target.get(args.id)
+    if current is None:
+        return cli_error(f"not found: {args.id}", EXIT_NOT_FOUND)
+    if args.if_version is not None and current.version != args.if_version:
+        return cli_error(f"{args.id} is at version {current.version}, not {args.if_version}", EXIT_CONFLICT)
+    changes = {}
+    if args.stdin:
+        for row in read_stdin_objects():
+            changes.update(row)
+    changes.update(_fields_from_args(args))
+    if not changes:
+        return cli_error("no fields to update", EXIT_INVALID)
+
+    emp, reason = edited_employee(target, args.id, current, changes)
+    if emp is None:
+        return cli_error(reason, EXIT_INVALID)
+    target.put(args.id, emp)
+    target.commit()
+    write_records([(args.id, emp)], args.format)
+    return EXIT_OK
+
+def cli_bulk_update(args, target):
+    filters = {f: getattr(args, f) for f in BULK_FILTERS if getattr(args, f) is not None}
+    if not filters and not args.all:
+        return cli_error("give a filter, or --all to change every employee", EXIT_USAGE)
+    set_fields = {}
+    for item in args.set or ():
+        field, sep, value = item.partition("=")
+        if not sep:
+            return cli_error(f"--set takes FIELD=VALUE, not {item!r}", EXIT_USAGE)
+        set_fields[field.strip()] = value
+    result = bulk_update(target, filters, set_fields, args.scale, args.offset, args.dry_run)
+    if result["updated"] and not args.dry_run:
+        target.commit()
+    write_result(result)
+    return EXIT_OK if result["matched"] else EXIT_NOT_FOUND
+
+def cli_delete(args, target):
+    missing = [emp_id for emp_id in args.ids if target.get(emp_id) is None]
+    if missing:
+        return cli_error("not found: " + ", ".join(missing), EXIT_NOT_FOUND)
+    for emp_id in args.ids:
+        target.remove(emp_id, expected_version=args.if_version)
+    target.commit()
+    write_result({"deleted": list(args.ids)})
+    return EXIT_OK
+
+def cli_search(args, target):
+    criteria = {f: getattr(args, f) for f in ("name", "email", "position", "department", "location")
+                if getattr(args, f) is not None}
+    text_modes = [(mode, getattr(args, mode)) for mode in ("prefix", "contains", "fuzzy")
+                  if getattr(args, mode) is not None]
+    if len(text_modes) > 1:
+        return cli_error("use only one of --prefix, --contains, --fuzzy", EXIT_USAGE)
+    if not criteria and not text_modes:
+        return cli_error("give at least one search option", EXIT_USAGE)
+
+    if text_modes:
+        mode, query = text_modes[0]
+        pairs = target.search_names(query, mode, limit=args.limit, **criteria)
+    else:
+        pairs = sort_pairs_by_id(target.find(**criteria).items())
+    if args.limit:
+        pairs = pairs[:args.limit]
+    write_records(pairs, args.format)
+    return EXIT_OK if pairs else EXIT_NOT_FOUND
+
+def cli_sort(args, target):
+    try:
+        keys = parse_sort_spec(args.by)
+    except ValueError as e:
+        return cli_error(str(e), EXIT_USAGE)
+    if isinstance(target.storage, SqliteStorage) and target.journal is None:
+        # Let SQLite do ORDER BY / LIMIT instead of loading every record
+        pairs = target.storage.query(order_by=keys, limit=args.limit or None, offset=args.offset)
+    else:
+        pairs = sort_pairs(target.records().items(), keys)
+        end = args.offset + args.limit if args.limit else None
+        pairs = pairs[args.offset:end]
+    write_records(pairs, args.format)
+    return EXIT_OK
+
+def cli_group(args, target):
+    fields = [Validation.normalize(f) for f in args.by.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in CATEGORY_VALUES]
+    if not fields or unknown or len(set(fields)) != len(fields):
+        return cli_error("--by takes position, department and/or location, e.g. 'department,location'",
+                         EXIT_USAGE)
+    orders = {field: "random" for field in fields} if args.random else None
+    groups, _ = group_pairs(target.records().items(), fields, orders, keys=[("name", False)])
+    if not args.counts:
+        write_records([pair for _, bucket in groups for pair in bucket], args.format)
+        return EXIT_OK
+    if args.format == "tsv":
+        lines = ["\t".join(fields + ["count"])]
+        lines += ["\t".join([str(v) for v in values] + [str(len(bucket))]) for values, bucket in groups]
+        sys.stdout.write("\n".join(lines) + "\n")
+    else:
+        for values, bucket in groups:
+            write_result(dict(zip(fields, values), count=len(bucket)))
+    return EXIT_OK
+
+def cli_salary(args, target):
+    ranked = args.top is not None or args.bottom is not None
+    if ranked == (args.min is not None or args.max is not None) or (args.top is not None and args.bottom is not None):
+        return cli_error("give one of --top N, --bottom N, or --min/--max", EXIT_USAGE)
+    if ranked:
+        highest = args.top is not None
+        pairs = target.top_salaries(args.top if highest else args.bottom, highest, args.department, args.location)
+    else:
+        pairs = target.salary_range(args.min, args.max, args.department, args.location, args.desc, args.limit or None)
+    if not pairs:
+        return EXIT_NOT_FOUND
+    write_records(pairs, args.format)
+    return EXIT_OK
+
+def cli_recent(args, target):
+    start = parse_time_spec(args.since)
+    end = parse_time_spec(args.until) if args.until else None
+    pairs = target.time_range(args.field, start, end, not args.oldest_first, args.limit or None)
+    if not pairs:
+        return EXIT_NOT_FOUND
+    write_records(pairs, args.format)
+    return EXIT_OK
+
+def cli_changes(args, target):
+    if target.feed is None:
+        return cli_error("the change feed is off (CHANGE_FEED = False)", EXIT_USAGE)
+    cursor = args.since
+    if cursor is None and args.cursor_file and os.path.exists(args.cursor_file):
+        with open(args.cursor_file, encoding="utf-8") as fh:
+            text = fh.read().strip()
+        if not text.isdigit():
+            return cli_error(f"{args.cursor_file} does not hold a cursor", EXIT_INVALID)
+        cursor = int(text)
+    entries = target.feed.since(cursor or 0, args.limit or None)
+    if cursor and entries and entries[0]["seq"] != cursor + 1:
+        return cli_error(f"the changes after {cursor} up to {entries[0]['seq'] - 1} were dropped from the feed "
+                         f"(CHANGE_FEED_KEEP); start again from a full export", EXIT_INVALID)
+    if entries:
+        sys.stdout.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries))
+        sys.stdout.flush()
+    if args.cursor_file and entries:
+        # Only after the output was written, so a failed run is simply repeated
+        tmp_file = args.cursor_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as fh:
+            fh.write(str(entries[-1]["seq"]))
+        os.replace(tmp_file, args.cursor_file)
+    return EXIT_OK
+
+def cli_export(args, target):
+    data = target.records()
+    if args.out == "-":
+        for chunk in _json_snapshot_chunks(list(data.items()), args.compact):
+            sys.stdout.write(chunk)
+        sys.stdout.write("\n")
+        return EXIT_OK
+    size = write_snapshot(data, args.out, compact=args.compact)
+    metrics.count("bytes_written_total", size, file="export")
+    write_result({"exported": len(data), "file": args.out, "bytes": size})
+    return EXIT_OK
+
+def cli_restore(args, target):
+    if not os.path.isfile(args.file):
+        return cli_error(f"file not found: {args.file}", EXIT_NOT_FOUND)
+    try:
+        data = read_snapshot(args.file)
+    except (OSError, EOFError, ValueError, KeyError, pickle.UnpicklingError) as e:
+        return cli_error(f"cannot read {args.file}: {e}", EXIT_INVALID)
+    target.replace_all(data)
+    write_result({"restored": len(data), "file": args.file})
+    return EXIT_OK
+
+def cli_import(args, target):
+    if not os.path.isfile(args.file):
+        return cli_error(f"file not found: {args.file}", EXIT_NOT_FOUND)
+    result = import_employees(args.file, reject_file=args.rejects, target=target)
+    write_result(result)
+    return EXIT_OK if not result["rejected"] else EXIT_INVALID
+
+def build_cli_parser():
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="ems.py",
+        description="Employee Management System. Run without arguments for the interactive menu.")
+    parser.add_argument("--backend", choices=("pickle", "sqlite", "binary"), default=None,
+                        help=f"storage backend (default: {STORAGE_BACKEND})")
+    parser.add_argument("--metrics", action="store_true",
+                        help=f"time operations; write {METRICS_FILE} and {METRICS_PROM_FILE} at exit")
+    parser.add_argument("--profile", metavar="OPERATION",
+                        help=f"run the first call of OPERATION (e.g. save_all, sort, commit) "
+                             f"under cProfile and write {PROFILE_FILE}")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--format", choices=("json", "tsv"), default="json",
+                        help="output format: JSON Lines (default) or TSV with a header row")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_field_flags(p):
+        p.add_argument("--name")
+        p.add_argument("--age")
+        p.add_argument("--position", help="one of: " + ", ".join(ALLOWED_POSITIONS))
+        p.add_argument("--salary")
+        p.add_argument("--department", help="one of: " + ", ".join(ALLOWED_DEPARTMENTS))
+        p.add_argument("--location", help="one of: " + ", ".join(ALLOWED_LOCATIONS))
+        p.add_argument("--email")
+        p.add_argument("--stdin", action="store_true", help="read JSON object(s) from stdin")
+
+    p = sub.add_parser("add", parents=[common], help="add employees (flags or JSON on stdin)")
+    add_field_flags(p)
+    p.set_defaults(handler=cli_add)
+
+    p = sub.add_parser("get", parents=[common], help="print employees by ID")
+    p.add_argument("ids", nargs="+")
+    p.set_defaults(handler=cli_get)
+
+    p = sub.add_parser("update", parents=[common], help="change fields of one employee")
+    p.add_argument("id")
+    add_field_flags(p)
+    p.add_argument("--if-version", type=int, help="only if the record is still at this version (exit 4 if not)")
+    p.set_defaults(handler=cli_update)
+
+    p = sub.add_parser("bulk-update", help="change every employee matching a filter in one commit "
+                                           "(exit 1 if none match)")
+    p.add_argument("--position", help="filter: one of: " + ", ".join(ALLOWED_POSITIONS))
+    p.add_argument("--department", help="filter: one of: " + ", ".join(ALLOWED_DEPARTMENTS))
+    p.add_argument("--location", help="filter: one of: " + ", ".join(ALLOWED_LOCATIONS))
+    p.add_argument("--min-salary", type=float, help="filter: salary at least this much")
+    p.add_argument("--max-salary", type=float, help="filter: salary at most this much")
+    p.add_argument("--all", action="store_true", help="change every employee (when no filter is given)")
+    p.add_argument("--set", action="append", metavar="FIELD=VALUE",
+                   help="set a field (" + ", ".join(BULK_SET_FIELDS) + "); may be repeated")
+    p.add_argument("--scale", type=float, metavar="FACTOR", help="multiply the salary, e.g. 1.03 for a 3%% raise")
+    p.add_argument("--offset", type=float, metavar="AMOUNT", help="add to the salary (after --scale)")
+    p.add_argument("--dry-run", action="store_true", help="only report how many employees would change")
+    p.set_defaults(handler=cli_bulk_update)
+
+    p = sub.add_parser("delete", parents=[common], help="delete employees by ID")
+    p.add_argument("ids", nargs="+")
+    p.add_argument("--if-version", type=int, help="only if the record is still at this version (exit 4 if not)")
+    p.set_defaults(handler=cli_delete)
+
+    p = sub.add_parser("search", parents=[common], help="find employees (exit 1 if none)")
+    p.add_argument("--name", help="exact name (case-insensitive)")
+    p.add_argument("--prefix", help="name starts with")
+    p.add_argument("--contains", help="name contains")
+    p.add_argument("--fuzzy", help="name with typos")
+    p.add_argument("--email")
+    p.add_argument("--position")
+    p.add_argument("--department")
+    p.add_argument("--location")
+    p.add_argument("--limit", type=int, default=NAME_SEARCH_MAX_RESULTS)
+    p.set_defaults(handler=cli_search)
+
+    p = sub.add_parser("sort", parents=[common], help="list employees in a sort order")
+    p.add_argument("--by", default="id", help="e.g. 'department,salary:desc,name' (default: id)")
+    p.add_argument("--limit", type=int, default=0, help="0 = no limit")
+    p.add_argument("--offset", type=int, default=0)
+    p.set_defaults(handler=cli_sort)
+
+    p = sub.add_parser("group", parents=[common], help="list employees grouped by category fields")
+    p.add_argument("--by", required=True, help="position, department, location or a combination, "
+                                               "e.g. 'department,location'")
+    p.add_argument("--random", action="store_true", help="random group order (default: GROUP_ORDER)")
+    p.add_argument("--counts", action="store_true", help="one line per group with its size")
+    p.set_defaults(handler=cli_group)
+
+    p = sub.add_parser("salary", parents=[common], help="top/bottom earners or a salary range (exit 1 if none)")
+    p.add_argument("--top", type=int, metavar="N", help="the N highest paid")
+    p.add_argument("--bottom", type=int, metavar="N", help="the N lowest paid")
+    p.add_argument("--min", type=float, help="salary range: at least this much")
+    p.add_argument("--max", type=float, help="salary range: at most this much")
+    p.add_argument("--desc", action="store_true", help="salary range: highest first")
+    p.add_argument("--limit", type=int, default=0, help="salary range: at most this many (0 = all)")
+    p.add_argument("--department", choices=ALLOWED_DEPARTMENTS)
+    p.add_argument("--location", choices=ALLOWED_LOCATIONS)
+    p.set_defaults(handler=cli_salary)
+
+    p = sub.add_parser("recent", parents=[common],
+                       help="employees changed (or hired) in a time window, newest first (exit 1 if none)")
+    p.add_argument("--since", default="24h",
+                   help="window start: 30m, 24h, 7d, 2w or a date/time such as 2026-07-01 (default: 24h)")
+    p.add_argument("--until", help="window end (exclusive), in the same forms (default: now)")
+    p.add_argument("--field", choices=TIME_FIELDS, default="updated_at",
+                   help="updated_at: last changed, counting adds (default); created_at: hired")
+    p.add_argument("--oldest-first", action="store_true")
+    p.add_argument("--limit", type=int, default=0, help="at most this many (0 = all)")
+    p.set_defaults(handler=cli_recent)
+
+    p = sub.add_parser("changes", help="committed changes after a cursor, as JSON Lines")
+    p.add_argument("--since", type=int, metavar="SEQ", help="print changes with a higher sequence number")
+    p.add_argument("--cursor-file", metavar="PATH",
+                   help="read the cursor from PATH (if --since is not given) and store the new one there")
+    p.add_argument("--limit", type=int, default=0, help="at most this many changes (0 = all)")
+    p.set_defaults(handler=cli_changes)
+
+    p = sub.add_parser("export", help="write the JSON snapshot, or a backup in another format")
+    p.add_argument("--out", default=JSON_SNAPSHOT_FILE,
+                   help="target file, or - for stdout; the extension picks the format "
+                        "(.json, .jsonl, .pkl) and compression (+ .gz, .bz2, .xz)")
+    p.add_argument("--compact", action="store_true", help="one compact record per line")
+    p.set_defaults(handler=cli_export)
+
+    p = sub.add_parser("restore", help="replace all records with those in a snapshot file")
+    p.add_argument("file", help="any file written by export, or the pickle")
+    p.set_defaults(handler=cli_restore)
+
+    p = sub.add_parser("import", help="bulk import a CSV or JSON Lines file")
+    p.add_argument("file")
+    p.add_argument("--rejects", help="where to write rejected rows (default: <file>.rejects.jsonl)")
+    p.set_defaults(handler=cli_import)
+
+    p = sub.add_parser("serve", help="run the HTTP/JSON service (Ctrl+C to stop)")
+    p.add_argument("--host", default=HTTP_HOST)
+    p.add_argument("--port", type=int, default=HTTP_PORT)
+    p.add_argument("--journal", action="store_true", default=None,
+                   help="append writes to the journal instead of rewriting the pickle "
+                        "(folded back into the pickle on shutdown)")
+    p.set_defaults(handler=cli_serve)
+    return parser
+
+def run_cli(argv):
+    """Run one scripted command. Returns the process exit code."""
+    args = build_cli_parser().parse_args(argv)
+    if args.metrics or args.profile:
+        metrics.enable(args.profile)
+    code = _run_cli_command(args)
+    metrics.count("cli_exits_total", command=args.command, code=code)
+    return code
+
+def _run_cli_command(args):
+    target = open_record_store(args.backend, journal=getattr(args, "journal", None))
+    try:
+        if metrics.enabled:
+            return metrics.call("cli_" + args.command, args.handler, args, target)
+        return args.handler(args, target)
+    except RecordConflict as e:
+        return cli_error(str(e), EXIT_CONFLICT)
+    except TimeoutError as e:
+        return cli_error(str(e), EXIT_CONFLICT)
+    except ValueError as e:
+        return cli_error(str(e), EXIT_INVALID)
+    except OSError as e:
+        return cli_error(str(e), EXIT_INVALID)
+    finally:
+        target.storage.close()
+
+# -----------------------------------------------------------------------------
+# HTTP/JSON service (python ems.py serve)
+# -----------------------------------------------------------------------------
+# Endpoints (all JSON):
+#   GET    /health
+#   GET    /metrics                   Prometheus text format (collected with --metrics)
+#   GET    /employees?sort=department,salary:desc&offset=0&limit=50
+#   POST   /employees                 one object or an array of objects
+#   GET    /employees/<id>
+#   PATCH  /employees/<id>            (PUT is accepted too) fields to change, plus an
+#                                     optional "version": 409 unless it is still current
+#   DELETE /employees/<id>[?version=N]
+#   GET    /search?prefix=ava&department=IT&offset=0&limit=50
+#          (name, prefix, contains, fuzzy, email, position, department, location)
+#   GET    /changes?since=SEQ&limit=1000  {"items": [...], "cursor": last seq returned, "more": bool};
+#                                     410 if changes after SEQ were already dropped (CHANGE_FEED_KEEP)
+#   GET    /salaries?top=50&department=IT    (or bottom=N, or min=80000&max=100000[&order=desc];
+#                                             department and location are optional)
+#   GET    /recent?since=24h&until=...&field=updated_at&order=desc   (since/until as parse_time_spec();
+#                                     field updated_at or created_at; paged)
+#   GET    /report?group_by=department   payroll and headcount per position, department or location
+#   POST   /bulk-update               {"department": "Finance", "scale": 1.03} or
+#                                     {"location": "Adelaide", "set": {"location": "Perth"}};
+#                                     filters as BULK_FILTERS ("all": true for none), actions
+#                                     "set", "scale", "offset"; "dry_run": true only counts
+# List responses are pages: {"items": [...], "total": n, "offset": o, "limit": l, "next": o+l or null}
+HTTP_HOST = "127.0.0.1"
+HTTP_PORT = 8765
+HTTP_PAGE_SIZE = 50
+HTTP_MAX_PAGE_SIZE = 1000
+HTTP_MAX_BODY = 1 << 20
+HTTP_KEEPALIVE_TIMEOUT = 15  # seconds an idle connection is kept open
+HTTP_ID_LIST_CACHE_SIZE = 32  # ordered ID lists kept for paging through sorts and searches
+
+HTTP_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 409: "Conflict", 410: "Gone", 413: "Payload Too Large",
+                500: "Internal Server Error", 503: "Service Unavailable"}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _query_int(params, name, default, low=0, high=None):
+    raw = params.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        raise HttpError(400, f"{name} must be between {low} and {high}" if high else f"{name} must be >= {low}")
+    return value
+
+class EmployeeService:
+    """
+    Request handling for the HTTP service, on top of a RecordStore.
+
+    Reads are answered straight from the in-memory store. Every write is a
+    small function queued for the single writer task, which runs whatever is
+    queued, then commits once for the whole batch, so concurrent clients can
+    never interleave half-finished changes or race on the pickle.
+
+    Slow reads (reports, multi-key sorts) run on a worker thread over a
+    pinned RecordSnapshot, so writes and other requests carry on meanwhile.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._writes = None
+        self._writer = None
+        self._id_lists = {}  # sort spec or search key -> (store generation, [ids])
+
+    async def start(self):
+        import asyncio
+        self._writes = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        """Finish the writes already queued, then end the writer task."""
+        if self._writer is not None:
+            await self._writes.put(None)
+            await self._writer
+
+    async def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = [await self._writes.get()]
+            while not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            if None in batch:
+                batch.remove(None)
+                stopping = True
+            # No await from here to commit(), so readers never see a half-applied batch
+            results = []
+            for fn, args, future in batch:
+                try:
+                    results.append((future, fn(*args), None))
+                except Exception as e:  # reported to that request only
+                    results.append((future, None, e))
+            if any(error is None for _, _, error in results):  # a batch of failed requests wrote nothing
+                try:
+                    self.target.commit()
+                except Exception as e:
+                    self.target.rollback()
+                    results = [(future, None, e) for future, _, _ in results]
+            for future, value, error in results:
+                if future.cancelled():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(value)
+
+    async def write(self, fn, *args):
+        """Run fn(*args) on the writer task and return its result once committed."""
+        import asyncio
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((fn, args, future))
+        return await future
+
+    # --- reads --------------------------------------------------------------
+    async def in_background(self, fn, *args):
+        """fn(*args) on a worker thread; the event loop keeps serving until it is done."""
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def page(self, ids, params, data=None):
+        """One page of ids; data is the snapshot the ids were computed from, if not the live records."""
+        limit = _query_int(params, "limit", HTTP_PAGE_SIZE, 1, HTTP_MAX_PAGE_SIZE)
+        offset = _query_int(params, "offset", 0)
+        data = self.target.records() if data is None else data
+        chunk = ids[offset:offset + limit]
+        end = offset + len(chunk)
+        return 200, {"items": [employee_record(emp_id, data[emp_id]) for emp_id in chunk],
+                     "total": len(ids), "offset": offset, "limit": limit,
+                     "next": end if end < len(ids) else None}
+
+    def _cached(self, key):
+        self.target.refresh()
+        cached = self._id_lists.get(key)
+        if cached is not None and cached[0] == self.target.generation:
+            return cached[1]
+        return None
+
+    def _remember(self, key, generation, ids):
+        if len(self._id_lists) >= HTTP_ID_LIST_CACHE_SIZE:
+            self._id_lists.pop(next(iter(self._id_lists)))
+        self._id_lists[key] = (generation, ids)
+
+    def cached_ids(self, key, build, *args):
+        """build(*args) -> [ids], reused for later pages until the store changes."""
+        ids = self._cached(key)
+        if ids is None:
+            ids = build(*args)
+            self._remember(key, self.target.generation, ids)
+        return ids
+
+    @staticmethod
+    def _sorted_ids(records, keys):
+        return [emp_id for emp_id, _ in sort_pairs(records.items(), keys)]
+
+    async def list_employees(self, params):
+        spec = params.get("sort", "id")
+        if spec in ("", "id"):
+            return self.page(self.target.sorted_ids(), params)
+        try:
+            keys = parse_sort_spec(spec)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        if len(keys) == 1 and keys[0][0] == "salary":
+            return self.page(self.cached_ids(("sort", spec), self.target.salary_ids, keys[0][1]), params)
+        ids = self._cached(("sort", spec))
+        if ids is not None:
+            return self.page(ids, params)
+        snapshot = self.target.snapshot()
+        ids = await self.in_background(self._sorted_ids, snapshot, keys)
+        self._remember(("sort", spec), snapshot.generation, ids)
+        return self.page(ids, params, snapshot)
+
+    def recent(self, params):
+        field = params.get("field", "updated_at")
+        if field not in TIME_FIELDS:
+            raise HttpError(400, "field must be one of: " + ", ".join(TIME_FIELDS))
+        try:
+            start = parse_time_spec(params.get("since") or "24h")
+            end = parse_time_spec(params["until"]) if params.get("until") else None
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        descending = params.get("order", "desc") != "asc"
+        # Not cached: a relative window such as 24h moves with the clock, and the index answers in O(log n + k)
+        self.target.records()
+        return self.page(self.target.indexes.times(field).range(start, end, descending), params)
+
+    async def report(self, params):
+        group_by = params.get("group_by", "department")
+        if group_by not in CATEGORY_VALUES:
+            raise HttpError(400, "group_by must be one of: " + ", ".join(CATEGORY_VALUES))
+        snapshot = self.target.snapshot()
+        rows = await self.in_background(payroll_report, snapshot, group_by)
+        return 200, {"group_by": group_by, "records": len(snapshot), "rows": rows}
+
+    def get_employee(self, emp_id):
+        emp = self.target.get(emp_id)
+        if emp is None:
+            raise HttpError(404, f"not found: {emp_id}")
+        return 200, employee_record(emp_id, emp)
+
+    def search(self, params):
+        criteria = {f: params[f] for f in INDEXED_FIELDS if params.get(f)}
+        text_modes = [(mode, params[mode]) for mode in ("prefix", "contains", "fuzzy") if params.get(mode)]
+        if len(text_modes) > 1:
+            raise HttpError(400, "use only one of prefix, contains, fuzzy")
+        if not criteria and not text_modes:
+            raise HttpError(400, "give at least one search parameter")
+
+        def build():
+            self.target.records()
+            if text_modes:
+                mode, query = text_modes[0]
+                allowed = self.target.indexes.find(**criteria) if criteria else None
+                ranked = self.target.indexes.names.search(query, mode, limit=0)
+                return [emp_id for emp_id, _ in ranked if allowed is None or emp_id in allowed]
+            return sorted(self.target.indexes.find(**criteria), key=id_sort_key)
+
+        key = ("search",) + tuple(sorted(criteria.items())) + tuple(text_modes)
+        return self.page(self.cached_ids(key, build), params)
+
+    def changes(self, params):
+        if self.target.feed is None:
+            raise HttpError(404, "the change feed is off")
+        since = _query_int(params, "since", 0)
+        limit = _query_int(params, "limit", HTTP_MAX_PAGE_SIZE, 1, HTTP_MAX_PAGE_SIZE)
+        entries = self.target.feed.since(since, limit + 1)
+        if since and entries and entries[0]["seq"] != since + 1:  # seq numbers have no gaps
+            raise HttpError(410, f"the changes after {since} up to {entries[0]['seq'] - 1} were dropped "
+                                 f"from the feed; start again from a full read")
+        more = len(entries) > limit
+        entries = entries[:limit]
+        return 200, {"items": entries, "cursor": entries[-1]["seq"] if entries else since, "more": more}
+
+    def salaries(self, params):
+        department = params.get("department") or None
+        location = params.get("location") or None
+        if department is not None and department not in ALLOWED_DEPARTMENTS:
+            raise HttpError(400, "department must be one of: " + ", ".join(ALLOWED_DEPARTMENTS))
+        if location is not None and location not in ALLOWED_LOCATIONS:
+            raise HttpError(400, "location must be one of: " + ", ".join(ALLOWED_LOCATIONS))
+        top = _query_int(params, "top", None, low=1)
+        bottom = _query_int(params, "bottom", None, low=1)
+        try:
+            low = float(params["min"]) if params.get("min") else None
+            high = float(params["max"]) if params.get("max") else None
+        except ValueError:
+            raise HttpError(400, "min and max must be numbers")
+        if (top is not None) + (bottom is not None) + (low is not None or high is not None) != 1:
+            raise HttpError(400, "give one of top, bottom, or min/max")
+
+        def build():
+            self.target.records()
+            if top is not None or bottom is not None:
+                return self.target.indexes.salaries.top(top or bottom, top is not None, department, location)
+            descending = params.get("order", "asc") == "desc"
+            return self.target.indexes.salaries.range(low, high, department, location, descending)
+
+        key = ("salaries", top, bottom, low, high, params.get("order"), department, location)
+        return self.page(self.cached_ids(key, build), params)
+
+    # --- writes (run on the writer task) ------------------------------------
+    def _add(self, rows):
+        validator = ImportValidator(self.target.name_taken)
+        checked = []
+        for n, row in enumerate(rows, start=1):
+            values, reason = validator.check({Validation.normalize(k): v for k, v in row.items()})
+            if values is None:
+                raise HttpError(400, f"record {n}: {reason}")
+            checked.append(values)
+        added = []
+        for values, emp_id in zip(checked, self.target.allocate_ids(len(checked))):
+            emp = Employee(*values, employee_id=emp_id)
+            self.target.put(emp_id, emp)
+            added.append(employee_record(emp_id, emp))
+        return 201, {"items": added}
+
+    def _update(self, emp_id, changes):
+        current = self.target.get(emp_id)
+        if current is None:
+            raise HttpError(404, f"not found: {emp_id}")
+        changes = {Validation.normalize(k): v for k, v in changes.items()}
+        expected_version = changes.pop("version", None)
+        if expected_version is not None and str(current.version) != str(expected_version).strip():
+            raise HttpError(409, f"{emp_id} is at version {current.version}, not {expected_version}")
+        unknown = sorted(set(changes) - set(IMPORT_FIELDS))
+        if unknown:
+            raise HttpError(400, "unknown field(s): " + ", ".join(unknown))
+        emp, reason = edited_employee(self.target, emp_id, current, changes)
+        if emp is None:
+            raise HttpError(409 if "already exists" in reason else 400, reason)
+        self.target.put(emp_id, emp)
+        return 200, employee_record(emp_id, emp)
+
+    def _bulk_update(self, body):
+        body = {Validation.normalize(k): v for k, v in body.items()}
+        unknown = sorted(set(body) - set(BULK_FILTERS) - {"all", "set", "scale", "offset", "dry_run"})
+        if unknown:
+            raise HttpError(400, "unknown key(s): " + ", ".join(unknown))
+        filters = {f: body[f] for f in BULK_FILTERS if body.get(f) is not None}
+        if not filters and body.get("all") is not True:
+            raise HttpError(400, 'give a filter, or "all": true to change every employee')
+        if not isinstance(body.get("set") or {}, dict):
+            raise HttpError(400, '"set" must be an object of fields')
+        try:
+            result = bulk_update(self.target, filters, body.get("set"), body.get("scale"), body.get("offset"),
+                                 bool(body.get("dry_run")))
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return 200, result
+
+    def _delete(self, emp_id, expected_version):
+        if self.target.remove(emp_id, expected_version) is None:
+            raise HttpError(404, f"not found: {emp_id}")
+        return 200, {"deleted": emp_id}
+
+    # --- routing ------------------------------------------------------------
+    async def handle(self, method, path, params, body):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok", "records": len(self.target.records())}
+        if parts == ["metrics"] and method == "GET":
+            return 200, metrics.prometheus_text()
+        if parts == ["search"] and method == "GET":
+            return self.search(params)
+        if parts == ["salaries"] and method == "GET":
+            return self.salaries(params)
+        if parts == ["changes"] and method == "GET":
+            return self.changes(params)
+        if parts == ["recent"] and method == "GET":
+            return self.recent(params)
+        if parts == ["report"] and method == "GET":
+            return await self.report(params)
+        if parts == ["bulk-update"] and method == "POST":
+            if not isinstance(body, dict):
+                raise HttpError(400, "expected a JSON object with filters and an action")
+            if body.get("dry_run"):
+                return self._bulk_update(body)  # writes nothing, so no need to queue it
+            return await self.write(self._bulk_update, body)
+        if parts[:1] != ["employees"] or len(parts) > 2:
+            raise HttpError(404, "no such endpoint")
+        if len(parts) == 1:
+            if method == "GET":
+                return await self.list_employees(params)
+            if method == "POST":
+                rows = body if isinstance(body, list) else [body]
+                if not rows or not all(isinstance(row, dict) for row in rows):
+                    raise HttpError(400, "expected a JSON object or an array of objects")
+                return await self.write(self._add, rows)
+            raise HttpError(405, "use GET or POST")
+        emp_id = parts[1]
+        if method == "GET":
+            return self.get_employee(emp_id)
+        if method in ("PATCH", "PUT"):
+            if not isinstance(body, dict) or not body:
+                raise HttpError(400, "expected a JSON object of fields to change")
+            return await self.write(self._update, emp_id, body)
+        if method == "DELETE":
+            expected_version = _query_int(params, "version", None, low=1)
+            return await self.write(self._delete, emp_id, expected_version)
+        raise HttpError(405, "use GET, PATCH, PUT or DELETE")
+
+def _http_response(status, payload, keep_alive):
+    if isinstance(payload, str):  # /metrics
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+    head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Unknown')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n")
+    if keep_alive:
+        head += f"Connection: keep-alive\r\nKeep-Alive: timeout={HTTP_KEEPALIVE_TIMEOUT}\r\n\r\n"
+    else:
+        head += "Connection: close\r\n\r\n"
+    return head.encode("latin-1") + body
+
+async def _read_http_request(reader):
+    """(method, path, params, body, keep_alive), or None when the client closed the connection."""
+    import asyncio
+    from urllib.parse import parse_qsl, urlsplit
+    try:
+        line = await asyncio.wait_for(reader.readline(), HTTP_KEEPALIVE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return None
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    length = int(headers.get("content-length") or 0)
+    if length > HTTP_MAX_BODY:
+        raise HttpError(413, "request body too large")
+    body = None
+    if length:
+        raw = await reader.readexactly(length)
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise HttpError(400, "request body is not valid JSON")
+    url = urlsplit(target)
+    return method.upper(), url.path, dict(parse_qsl(url.query)), body, keep_alive
+
+async def serve_http(target, host=HTTP_HOST, port=HTTP_PORT, ready=None):
+    """Serve the store until SIGINT/SIGTERM. `ready(server)` is called once listening."""
+    import asyncio
+    import signal
+    service = EmployeeService(target)
+    await service.start()
+
+    async def on_connection(reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                method = None
+                try:
+                    request = await _read_http_request(reader)
+                    if request is None:
+                        break
+                    method, path, params, body, keep_alive = request
+                    started = time.perf_counter()
+                    status, payload = await service.handle(method, path, params, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except RecordConflict as e:
+                    status, payload = 409, {"error": str(e)}
+                except TimeoutError as e:  # the data folder's lock is held by another process
+                    status, payload = 503, {"error": str(e)}
+                except (ValueError, KeyError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                if metrics.enabled:
+                    if method is not None:
+                        metrics.observe("http_" + method.lower(), time.perf_counter() - started)
+                    metrics.count("http_responses_total", status=status)
+                writer.write(_http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows: Ctrl+C still raises KeyboardInterrupt
+    server = await asyncio.start_server(on_connection, host, port)
+    try:
+        if ready is not None:
+            ready(server)
+        async with server:
+            await stop.wait()
+    finally:
+        await service.stop()
+
+def cli_serve(args, target):
+    import asyncio
+    target.records()  # load once up front rather than on the first request
+
+    def ready(server):
+        host, port = server.sockets[0].getsockname()[:2]
+        sys.stderr.write(f"ems: serving {len(target.records())} employees on http://{host}:{port}\n")
+        sys.stderr.flush()
+
+    try:
+        asyncio.run(serve_http(target, args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    if target.journal is not None and target.journal.entry_count:
+        target.checkpoint()  # leave a complete pickle for runs without --journal
+    return EXIT_OK
 
 # -----------------------------------------------------------------------------
 # Main
@@ -719,26 +5278,39 @@ def show_welcome_message_and_seed():
     seed_defaults_if_empty()
 
 def export_snapshot_and_goodbye():
-    data = load_all_records()
-    export_json_snapshot(data, JSON_SNAPSHOT_FILE)
+    data = store.records()
+    if store.journal is not None and store.journal.entry_count:
+        store.checkpoint()  # fold the journal into the pickle (also queues the JSON snapshot)
+    # Write a queued snapshot now; otherwise the file is already current
+    if not snapshot_exporter.flush() and not os.path.exists(JSON_SNAPSHOT_FILE):
+        export_json_snapshot(data, JSON_SNAPSHOT_FILE)
     print_info(f"List of employee snapshot exported to {JSON_SNAPSHOT_FILE}")
     print_last_modified_summary()
     print_info("Thank you for using the Employee Management System!")
 
-def main():
+MENU_OPERATIONS = {1: "add", 2: "view", 3: "update", 4: "delete", 5: "search",
+                   6: "sort", 7: "reports", 8: "import", 9: "exit"}
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        return run_cli(argv)
     show_welcome_message_and_seed()
     while True:
-        has_records = bool(load_all_records())
+        has_records = store.has_records()
         show_menu(has_records)
-        selection = Validation.prompt_menu_choice("Choose an option (1-7): ", 1, 7, allow_cancel=True)
+        selection = Validation.prompt_menu_choice("Choose an option (1-9): ", 1, 9, allow_cancel=True)
         if selection is None:
             export_snapshot_and_goodbye()
             break
 
-        if not has_records and selection in (2, 3, 4, 5, 6):
+        if not has_records and selection in (2, 3, 4, 5, 6, 7):
             print_warning("No records yet — please add an employee first.")
             continue
 
+        operation = "menu_" + MENU_OPERATIONS[selection]
+        metrics.count("menu_selections_total", operation=operation)
         try:
             if selection == 1: add_employee()
             elif selection == 2: view_all_employees()
@@ -746,11 +5318,14 @@ def main():
             elif selection == 4: delete_employee()
             elif selection == 5: search_employee()
             elif selection == 6: sort_employees()
-            elif selection == 7:
+            elif selection == 7: show_reports()
+            elif selection == 8: import_employees_from_file()
+            elif selection == 9:
                 export_snapshot_and_goodbye()
                 break
         except Exception as e:
+            metrics.count("errors_total", operation=operation, error=type(e).__name__)
             print_error(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
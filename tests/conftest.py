@@ -0,0 +1,80 @@
+"""
+Shared fixtures. Every test runs in its own temporary folder, and the JSON
+snapshot exporter writes there straight away (no debounce thread), so the
+tests never touch the data files in the project folder.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ems  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def data_folder(tmp_path, monkeypatch):
+    ems.snapshot_exporter.flush()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ems.snapshot_exporter, "json_file", str(tmp_path / ems.JSON_SNAPSHOT_FILE))
+    monkeypatch.setattr(ems.snapshot_exporter, "delay", 0)
+    yield tmp_path
+    ems.snapshot_exporter.flush()
+
+
+@pytest.fixture
+def make_employee():
+    """Factory for valid Employee objects; the email is derived from the name."""
+    def make(emp_id, name, salary=90000.0, position="Developer", department="IT", location="Sydney"):
+        email = name.lower().replace(" ", ".") + "@example.com"
+        return ems.Employee(name, 30, position, salary, department, location, email, emp_id)
+    return make
+
+
+@pytest.fixture
+def records(make_employee):
+    """{id: Employee} for 001-004, spread over two departments."""
+    return {
+        "001": make_employee("001", "Olivia Brown", 125000.0, "Manager", "IT", "Melbourne"),
+        "002": make_employee("002", "Noah Wilson", 98000.0, "Developer", "Finance", "Sydney"),
+        "003": make_employee("003", "Ava Thompson", 86000.0, "Designer", "IT", "Brisbane"),
+        "004": make_employee("004", "Liam Taylor", 90000.0, "Analyst", "Finance", "Adelaide"),
+    }
+
+
+@pytest.fixture
+def edited():
+    """edited(store, emp_id, salary): a copy of the stored record with a new salary, ready for put()."""
+    def edit(store, emp_id, salary):
+        emp = ems.copy.copy(store.get(emp_id))
+        emp.set_salary(salary)
+        return emp
+    return edit
+
+
+STORE_FILES = {"pickle": "staff.pkl", "sqlite": "staff.db", "binary": "staff.bin"}
+
+
+@pytest.fixture
+def open_store(data_folder, request):
+    """
+    open_store(backend=None, journal=False): a RecordStore on staff.pkl, .db or
+    .bin in the test's folder. Every call is a fresh view, like another
+    process. The backend defaults to pickle, or to the fixture's parameter
+    when a test parametrizes it with indirect=True.
+    """
+    default = getattr(request, "param", "pickle")
+
+    def open_(backend=None, journal=False):
+        backend = backend or default
+        path = str(data_folder / STORE_FILES[backend])
+        if backend == "sqlite":
+            storage = ems.SqliteStorage(path, migrate_from=None)
+        elif backend == "binary":
+            storage = ems.BinaryStorage(path, migrate_from=None)
+        else:
+            storage = ems.PickleStorage(path)
+        return ems.RecordStore(storage, journal_file=str(data_folder / "staff.journal") if journal else None)
+    return open_
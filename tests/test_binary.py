@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+import ems
+
+
+def rows(records_dict):
+    return {emp_id: (emp.to_dict(formatted=False), emp.version) for emp_id, emp in records_dict.items()}
+
+
+@pytest.fixture
+def binary_file(data_folder, records):
+    path = str(data_folder / "staff.bin")
+    for emp in records.values():
+        emp.version = 1
+    records["002"].updated_at = ems.now_micros()
+    ems.BinaryStorage(path, migrate_from=None).save_all(records)
+    return path
+
+
+def test_records_round_trip(binary_file, records):
+    storage = ems.BinaryStorage(binary_file, migrate_from=None)
+    assert rows(storage.load()) == rows(records)
+    assert rows({"002": storage.get("002")}) == rows({"002": records["002"]})
+    assert storage.get("999") is None
+    assert storage.count() == 4
+
+
+def test_changes_are_written_in_place(binary_file, records):
+    storage = ems.BinaryStorage(binary_file, migrate_from=None)
+    before = os.stat(binary_file)
+    emp = ems.copy.copy(records["003"])
+    emp.set_salary(87000.0)
+    emp.version = 2
+
+    storage.apply_changes(None, {"003": emp, "004": None})
+
+    after = os.stat(binary_file)
+    assert (after.st_ino, after.st_size) == (before.st_ino, before.st_size)
+    reopened = ems.BinaryStorage(binary_file, migrate_from=None)
+    assert reopened.get("003").get_salary() == 87000.0
+    assert reopened.get("004") is None
+    assert sorted(reopened.load()) == ["001", "002", "003"]
+
+
+def test_adding_past_the_free_slots_rewrites_the_file(binary_file, records, make_employee):
+    added = {f"{n:03d}": make_employee(f"{n:03d}", f"New Hire {n}") for n in range(5, 305)}
+    inode = os.stat(binary_file).st_ino
+
+    ems.BinaryStorage(binary_file, migrate_from=None).apply_changes(None, added)
+
+    assert os.stat(binary_file).st_ino != inode
+    loaded = ems.BinaryStorage(binary_file, migrate_from=None).load()
+    assert len(loaded) == 304
+    assert loaded["250"].get_name() == "New Hire 250"
+    assert loaded["001"].get_name() == records["001"].get_name()
+
+
+def test_single_record_writes_do_not_load_the_file(binary_file, open_store, edited, make_employee):
+    store = open_store("binary")
+    store.put("002", edited(store, "002", 99000.0))
+    store.remove("004")
+    new_id = store.next_id()
+    store.put(new_id, make_employee(new_id, "Mia Chen"))
+    store.commit()
+
+    assert store._records is None
+    assert new_id == "005"
+    assert store.name_taken("mia chen") and not store.name_taken("Liam Taylor")
+    reopened = open_store("binary")
+    assert reopened.get("002").get_salary() == 99000.0
+    assert reopened.get("002").version == 2
+    assert sorted(reopened.records()) == ["001", "002", "003", "005"]
+
+
+def test_single_record_writes_detect_conflicts(binary_file, open_store, edited):
+    first, second = open_store("binary"), open_store("binary")
+    second.put("001", edited(second, "001", 1.0))
+    first.put("001", edited(first, "001", 130000.0))
+    first.commit()
+
+    with pytest.raises(ems.RecordConflict):
+        second.commit()
+    assert open_store("binary").get("001").get_salary() == 130000.0
+
+
+def renamed(store, emp_id, name):
+    emp = ems.copy.copy(store.get(emp_id))
+    emp.set_name(name)
+    return emp
+
+
+def test_name_lookups_follow_pending_and_committed_renames(binary_file, open_store):
+    store = open_store("binary")
+    assert store.name_taken("Ava Thompson")
+    store.put("003", renamed(store, "003", "Ava Chen"))
+
+    assert store.name_taken("ava chen") and not store.name_taken("Ava Thompson")
+    store.remove("003")
+    assert not store.name_taken("Ava Chen")
+
+    store.rollback()
+    store.put("003", renamed(store, "003", "Ava Chen"))
+    store.commit()
+    assert store.storage.ids_named("AVA CHEN") == ["003"]
+    assert store.storage.ids_named("Ava Thompson") == []
+    assert store._records is None
+
+
+def test_single_record_writes_refresh_the_json_snapshot(data_folder, binary_file, open_store, edited):
+    store = open_store("binary")
+    store.put("002", edited(store, "002", 99000.0))
+    store.remove("004")
+    store.commit()
+
+    snapshot = ems.read_snapshot(str(data_folder / ems.JSON_SNAPSHOT_FILE))
+    assert sorted(snapshot) == ["001", "002", "003"]
+    assert snapshot["002"].get_salary() == 99000.0
+    assert store._records is None
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import ems
+
+
+@pytest.fixture
+def store(data_folder, records):
+    store = ems.RecordStore(ems.PickleStorage(str(data_folder / "staff.pkl")))
+    store.replace_all(records)
+    return store
+
+
+def salaries(target):
+    return {emp_id: emp.get_salary() for emp_id, emp in target.records().items()}
+
+
+def test_a_dry_run_reports_the_same_summary_without_changing_anything(store):
+    before = salaries(store)
+    generation = store.generation
+
+    preview = ems.bulk_update(store, {"department": "Finance"}, scale=1.1, dry_run=True)
+    store.commit()
+
+    assert preview == {"matched": 2, "updated": 2, "payroll_change": 18800.0, "dry_run": True}
+    assert salaries(store) == before
+    assert store.generation == generation
+    assert store.feed.last_seq() == 4  # only the four adds from replace_all()
+
+    applied = ems.bulk_update(store, {"department": "Finance"}, scale=1.1)
+    assert dict(applied, dry_run=True) == preview
+
+
+def test_applying_saves_only_the_matching_records(store):
+    result = ems.bulk_update(store, {"department": "Finance", "min_salary": 95000}, offset=2500)
+    store.commit()
+
+    assert result == {"matched": 1, "updated": 1, "payroll_change": 2500.0, "dry_run": False}
+    reopened = ems.RecordStore(ems.PickleStorage(store.storage.pickle_file))
+    assert salaries(reopened) == {"001": 125000.0, "002": 100500.0, "003": 86000.0, "004": 90000.0}
+    assert reopened.get("002").version == 2
+
+
+def test_every_changed_record_gets_the_same_updated_at(store):
+    ems.bulk_update(store, {"department": "Finance"}, scale=1.03)
+    store.commit()
+
+    assert store.get("002").updated_at is not None
+    assert store.get("002").updated_at == store.get("004").updated_at
+    assert store.get("001").updated_at is None
+
+
+def test_records_already_as_asked_are_left_alone(store):
+    result = ems.bulk_update(store, {"department": "Finance"}, set_fields={"location": "Sydney"})
+    store.commit()
+
+    assert (result["matched"], result["updated"]) == (2, 1)  # 002 is already in Sydney
+    assert store.get("004").location == "Sydney"
+    assert store.get("002").version == 1
+    assert [e["id"] for e in store.feed.since(4)] == ["004"]
+
+
+@pytest.mark.parametrize("filters, action, message", [
+    ({"team": "Finance"}, {"scale": 1.1}, "unknown filter"),
+    ({"department": "Finance"}, {}, "nothing to change"),
+    ({"department": "Finance"}, {"offset": -95000}, "below zero"),
+])
+def test_bad_requests_raise_and_store_nothing(store, filters, action, message):
+    before = salaries(store)
+    with pytest.raises(ValueError, match=message):
+        ems.bulk_update(store, filters, **action)
+    assert salaries(store) == before
+    assert not store._changes
+
+
+def test_the_cli_dry_run_writes_nothing(data_folder, records, capsys):
+    ems.RecordStore(ems.PickleStorage(ems.PICKLE_FILE)).replace_all(records)
+    pickled = (data_folder / ems.PICKLE_FILE).read_bytes()
+
+    code = ems.run_cli(["bulk-update", "--department", "Finance", "--scale", "1.1", "--dry-run"])
+
+    assert code == ems.EXIT_OK
+    assert json.loads(capsys.readouterr().out)["dry_run"] is True
+    assert (data_folder / ems.PICKLE_FILE).read_bytes() == pickled
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import ems
+
+
+@pytest.fixture
+def store(data_folder, records, edited):
+    """A pickle store whose feed holds seq 1-4 (the adds) and 5-6 (an update and a delete)."""
+    store = ems.RecordStore(ems.PickleStorage(str(data_folder / "staff.pkl")))
+    store.replace_all(records)
+    store.put("002", edited(store, "002", 99000.0))
+    store.remove("003")
+    store.commit()
+    return store
+
+
+def test_since_returns_the_changes_after_the_cursor(store):
+    assert [e["seq"] for e in store.feed.since(0)] == [1, 2, 3, 4, 5, 6]
+    update, delete = store.feed.since(4)
+
+    assert (update["op"], update["id"]) == ("update", "002")
+    assert (update["before"]["salary"], update["after"]["salary"]) == (98000.0, 99000.0)
+    assert (delete["op"], delete["id"], delete["after"]) == ("delete", "003", None)
+    assert delete["before"]["name"] == "Ava Thompson"
+    assert store.feed.since(6) == []
+
+
+def test_a_cursor_can_be_read_in_pages(store):
+    pages = []
+    cursor = 0
+    while True:
+        page = store.feed.since(cursor, limit=4)
+        if not page:
+            break
+        pages.append([e["seq"] for e in page])
+        cursor = page[-1]["seq"]
+    assert pages == [[1, 2, 3, 4], [5, 6]]
+
+
+def test_a_torn_last_line_is_skipped_then_replaced(store, edited):
+    with open(store.feed.feed_file, "ab") as fh:
+        fh.write(b'{"seq":7,"ts":"2026-01-31 09:00:00","op":"upd')
+    assert [e["seq"] for e in store.feed.since(5)] == [6]
+
+    store.put("001", edited(store, "001", 130000.0))
+    store.commit()
+    assert [(e["seq"], e["id"]) for e in store.feed.since(6)] == [(7, "001")]
+
+
+def test_the_feed_keeps_the_last_entries(data_folder):
+    feed = ems.ChangeFeed(str(data_folder / "feed.jsonl"), keep=8)
+    for n in range(1, 31):
+        feed.append([("add", f"{n:03d}", None, {"name": f"Person {n}"})])
+
+    assert feed.last_seq() == 30
+    assert 8 <= 30 - feed.first_seq() + 1 <= 10
+    assert [e["seq"] for e in feed.since(25)] == [26, 27, 28, 29, 30]
+
+
+def test_the_cli_refuses_a_cursor_older_than_the_feed(data_folder, monkeypatch, capsys):
+    monkeypatch.setattr(ems, "CHANGE_FEED_KEEP", 4)
+    for n in range(1, 9):
+        code = ems.run_cli(["add", "--name", f"Person {n}", "--age", "30", "--position", "Developer",
+                            "--salary", "50000", "--department", "IT", "--location", "Perth",
+                            "--email", f"person{n}@example.com"])
+        assert code == ems.EXIT_OK
+    capsys.readouterr()
+
+    assert ems.run_cli(["changes", "--since", "1"]) == ems.EXIT_INVALID
+    assert "start again from a full export" in capsys.readouterr().err
+
+    assert ems.run_cli(["changes", "--since", "6"]) == ems.EXIT_OK
+    assert [json.loads(line)["seq"] for line in capsys.readouterr().out.splitlines()] == [7, 8]
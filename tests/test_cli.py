@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import ems
+
+
+def listed_ids(capsys):
+    return [json.loads(line)["id"] for line in capsys.readouterr().out.splitlines()]
+
+
+def test_sqlite_sort_without_a_limit_lists_everyone(records, capsys):
+    ems.RecordStore(ems.SqliteStorage(ems.SQLITE_FILE, migrate_from=None)).replace_all(records)
+
+    assert ems.run_cli(["--backend", "sqlite", "sort", "--by", "salary"]) == ems.EXIT_OK
+    assert listed_ids(capsys) == ["003", "004", "002", "001"]
+
+    assert ems.run_cli(["--backend", "sqlite", "sort", "--by", "salary:desc", "--limit", "2"]) == ems.EXIT_OK
+    assert listed_ids(capsys) == ["001", "002"]
+
+
+def test_exit_codes_tell_the_outcome_apart(records, capsys):
+    ems.RecordStore(ems.PickleStorage(ems.PICKLE_FILE)).replace_all(records)
+
+    assert ems.run_cli(["get", "001"]) == ems.EXIT_OK
+    assert ems.run_cli(["get", "001", "999"]) == ems.EXIT_NOT_FOUND
+    assert ems.run_cli(["search", "--department", "HR"]) == ems.EXIT_NOT_FOUND
+    assert ems.run_cli(["search"]) == ems.EXIT_USAGE
+    assert ems.run_cli(["sort", "--by", "wage"]) == ems.EXIT_USAGE
+    assert ems.run_cli(["update", "002", "--salary", "lots"]) == ems.EXIT_INVALID
+    assert ems.run_cli(["update", "002", "--name", "Olivia Brown"]) == ems.EXIT_INVALID
+    assert ems.run_cli(["update", "002", "--salary", "99000", "--if-version", "7"]) == ems.EXIT_CONFLICT
+    assert ems.run_cli(["delete", "003", "--if-version", "2"]) == ems.EXIT_CONFLICT
+    assert ems.run_cli(["delete", "003", "999"]) == ems.EXIT_NOT_FOUND
+
+    err = capsys.readouterr().err
+    assert "ems: not found: 999" in err
+    assert "already exists" in err
+    assert ems.RecordStore(ems.PickleStorage(ems.PICKLE_FILE)).get("002").get_salary() == 98000.0
+
+
+def test_bad_arguments_exit_with_the_usage_code():
+    with pytest.raises(SystemExit) as caught:
+        ems.run_cli(["salary", "--department", "Legal", "--top", "3"])
+    assert caught.value.code == ems.EXIT_USAGE
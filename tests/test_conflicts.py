@@ -0,0 +1,88 @@
+import pytest
+
+import ems
+
+
+@pytest.fixture
+def two_stores(open_store, records):
+    """Two processes' views of one data folder, both loaded before either writes."""
+    open_store().replace_all(records)
+    first, second = open_store(), open_store()
+    first.records()
+    second.records()
+    return first, second
+
+
+@pytest.mark.parametrize("open_store", ["pickle", "sqlite", "binary"], indirect=True)
+def test_changes_to_different_records_are_merged(open_store, two_stores, edited):
+    first, second = two_stores
+    first.put("001", edited(first, "001", 130000.0))
+    first.commit()
+    second.put("002", edited(second, "002", 99000.0))
+    second.commit()
+
+    reopened = open_store()
+    assert reopened.get("001").get_salary() == 130000.0
+    assert reopened.get("002").get_salary() == 99000.0
+
+
+@pytest.mark.parametrize("open_store", ["pickle", "sqlite", "binary"], indirect=True)
+def test_a_lost_update_raises_at_commit_and_keeps_the_first_commit(open_store, two_stores, edited):
+    first, second = two_stores
+    second.put("001", edited(second, "001", 1.0))
+    first.put("001", edited(first, "001", 130000.0))
+    first.commit()
+
+    with pytest.raises(ems.RecordConflict) as caught:
+        second.commit()
+
+    assert caught.value.ids == ["001"]
+    assert second.get("001").get_salary() == 130000.0  # rolled back and re-read
+    assert open_store().get("001").get_salary() == 130000.0
+
+
+@pytest.mark.parametrize("open_store", ["pickle", "sqlite", "binary"], indirect=True)
+def test_an_edit_of_a_record_deleted_meanwhile_conflicts(two_stores, edited):
+    first, second = two_stores
+    second.put("003", edited(second, "003", 1.0))
+    first.remove("003")
+    first.commit()
+
+    with pytest.raises(ems.RecordConflict):
+        second.commit()
+    assert second.get("003") is None
+
+
+def test_a_copy_read_before_another_commit_is_refused(two_stores, edited):
+    first, second = two_stores
+    stale = edited(second, "002", 1.0)
+    first.put("002", edited(first, "002", 99000.0))
+    first.commit()
+
+    with pytest.raises(ems.RecordConflict):
+        second.put("002", stale)
+    assert second.get("002").get_salary() == 99000.0
+
+
+def test_putting_a_stale_copy_raises_at_once(open_store, records, edited):
+    store = open_store()
+    store.replace_all(records)
+    stale = edited(store, "001", 1.0)
+    store.put("001", edited(store, "001", 130000.0))
+
+    with pytest.raises(ems.RecordConflict):
+        store.put("001", stale)
+
+
+def test_id_blocks_do_not_overlap_and_unused_ids_are_given_back(two_stores):
+    first, second = two_stores
+    block = first.allocate_ids(3)
+    assert block == ["005", "006", "007"]
+    assert second.allocate_ids(1) == ["008"]
+
+    first.release_ids(["006", "007"])  # another process allocated after us: the mark stays
+    assert second.allocate_ids(1) == ["009"]
+
+    third = second.allocate_ids(2)
+    second.release_ids(third)
+    assert first.allocate_ids(1) == [third[0]]
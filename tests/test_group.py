@@ -0,0 +1,49 @@
+import pytest
+
+import ems
+
+
+def summary(groups):
+    return [(values, [emp_id for emp_id, _ in bucket]) for values, bucket in groups]
+
+
+def test_groups_follow_the_allowed_order_and_keep_input_order(records):
+    groups, used = ems.group_pairs(records.items(), ["department"])
+
+    assert summary(groups) == [(("IT",), ["001", "003"]), (("Finance",), ["002", "004"])]
+    assert used == {"department": list(ems.ALLOWED_DEPARTMENTS)}
+
+
+def test_several_fields_nest_with_the_first_most_significant(records, make_employee):
+    records["005"] = make_employee("005", "Mia Chen", 70000.0, department="IT", location="Melbourne")
+
+    groups, _ = ems.group_pairs(records.items(), ["department", "location"], keys=[("salary", False)])
+
+    assert summary(groups) == [
+        (("IT", "Melbourne"), ["005", "001"]),
+        (("IT", "Brisbane"), ["003"]),
+        (("Finance", "Sydney"), ["002"]),
+        (("Finance", "Adelaide"), ["004"]),
+    ]
+
+
+def test_values_outside_the_order_come_last_split_by_value(records):
+    groups, used = ems.group_pairs(records.items(), ["position"], {"position": ["Analyst", "Manager"]})
+
+    assert summary(groups) == [
+        (("Analyst",), ["004"]),
+        (("Manager",), ["001"]),
+        (("Developer",), ["002"]),
+        (("Designer",), ["003"]),
+    ]
+    assert used == {"position": ["Analyst", "Manager"]}
+
+
+def test_a_random_order_is_reported_and_followed(records):
+    groups, used = ems.group_pairs(records.items(), ["location"], {"location": "random"})
+
+    assert sorted(used["location"]) == sorted(ems.ALLOWED_LOCATIONS)
+    present = [values[0] for values, _ in groups]
+    assert present == [location for location in used["location"] if location in present]
+    with pytest.raises(ValueError):
+        ems.group_pairs(records.items(), ["salary"])
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import ems
+
+
+async def send(port, method, path, body=None):
+    """One request on a fresh connection -> (status, decoded JSON body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def exchange(target, requests):
+    """Serve target on a free port, send the requests one by one, then shut the service down."""
+    listening = asyncio.get_running_loop().create_future()
+    server = asyncio.create_task(ems.serve_http(target, "127.0.0.1", 0, listening.set_result))
+    port = (await listening).sockets[0].getsockname()[1]
+    try:
+        return [await send(port, *request) for request in requests]
+    finally:
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+
+
+def test_a_read_and_a_write_round_trip(open_store, records):
+    target = open_store()
+    target.replace_all(records)
+
+    responses = asyncio.run(exchange(target, [
+        ("GET", "/employees/001"),
+        ("PATCH", "/employees/002", {"salary": 99000, "version": 1}),
+        ("PATCH", "/employees/002", {"salary": 1, "version": 1}),
+        ("GET", "/employees/999"),
+    ]))
+
+    (status, olivia), (patched, noah), (stale, _), (missing, error) = responses
+    assert (status, olivia["id"], olivia["name"]) == (200, "001", "Olivia Brown")
+    assert (patched, noah["salary"]) == (200, 99000.0)
+    assert stale == 409
+    assert (missing, error) == (404, {"error": "not found: 999"})
+    assert open_store().get("002").get_salary() == 99000.0  # committed by the writer task
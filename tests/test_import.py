@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import ems
+
+
+@pytest.fixture
+def store(data_folder, records):
+    store = ems.RecordStore(ems.PickleStorage(str(data_folder / "staff.pkl")))
+    store.replace_all(records)
+    return store
+
+
+def write_rows(path, count):
+    with open(path, "w", encoding="utf-8") as fh:
+        for n in range(1, count + 1):
+            fh.write(json.dumps({"name": f"New Hire {n}", "age": 30, "position": "Developer", "salary": 50000,
+                                 "department": "IT", "location": "Perth",
+                                 "email": f"new.hire{n}@example.com"}) + "\n")
+    return str(path)
+
+
+def test_a_failed_import_gives_its_ids_back(data_folder, store, make_employee, monkeypatch):
+    path = write_rows(data_folder / "hires.jsonl", 5)
+    monkeypatch.setattr(ems, "IMPORT_ID_BLOCK", 2)  # the failure lands in the second block
+    put = store.put
+
+    def failing_put(emp_id, emp):
+        if emp_id == "008":
+            raise OSError("disk full")
+        put(emp_id, emp)
+
+    monkeypatch.setattr(store, "put", failing_put)
+    with pytest.raises(OSError):
+        ems.import_employees(path, target=store)
+
+    assert sorted(store.records()) == ["001", "002", "003", "004"]
+    other = ems.RecordStore(ems.PickleStorage(store.storage.pickle_file))
+    assert other.allocate_ids(1) == ["005"]
+    other.release_ids(["005"])
+
+    new_id = store.next_id()
+    store.put(new_id, make_employee(new_id, "Mia Chen"))
+    store.commit()
+    assert new_id == "005"
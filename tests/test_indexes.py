@@ -0,0 +1,53 @@
+import pytest
+
+import ems
+
+
+def filed(indexes):
+    """Every (field, key) -> IDs entry, to compare two indexes."""
+    return {(field, key): set(ids) for field, table in indexes.by_field.items() for key, ids in table.items()}
+
+
+@pytest.fixture
+def store(open_store, records):
+    store = open_store()
+    store.replace_all(records)
+    store.indexes.find()  # build the hash tables, so put()/remove() have to keep them current
+    return store
+
+
+def test_puts_and_removes_keep_the_indexes_as_a_rebuild_would(store):
+    moved = ems.copy.copy(store.get("002"))
+    moved.department = "IT"
+    moved.set_name("Noah Green")
+    store.put("002", moved)
+    store.remove("003")
+
+    assert store.indexes.find(department="IT") == {"001", "002"}
+    assert store.indexes.lookup("name", "NOAH GREEN") == {"002"}
+    assert store.indexes.lookup("name", "Noah Wilson") == set()
+    assert store.indexes.lookup("position", "Designer") == set()
+
+    fresh = ems.RecordIndexes()
+    fresh.rebuild(store.records())
+    assert filed(store.indexes) == filed(fresh)
+    assert ("position", "Designer") not in filed(store.indexes)  # emptied buckets are dropped
+
+
+def test_find_intersects_the_given_fields(store):
+    assert store.indexes.find(department="Finance", location="Sydney") == {"002"}
+    assert store.indexes.find(department="Finance", location="Perth") == set()
+    assert store.indexes.find(department="IT", location=None) == {"001", "003"}
+    assert store.indexes.find() == {"001", "002", "003", "004"}
+    with pytest.raises(ValueError):
+        store.indexes.find(salary=90000.0)
+
+
+def test_the_tables_are_only_filled_on_the_first_lookup(records):
+    indexes = ems.RecordIndexes()
+    indexes.rebuild(records)
+    indexes.discard("001")  # no-op until built: the records dict is the truth
+    del records["004"]
+
+    assert indexes.find(department="Finance") == {"002"}
+    assert indexes.lookup("email", "Olivia.Brown@example.com") == {"001"}
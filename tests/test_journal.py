@@ -0,0 +1,47 @@
+import ems
+
+
+def test_commit_appends_to_the_journal_instead_of_rewriting_the_pickle(data_folder, open_store, records, edited):
+    store = open_store(journal=True)
+    store.replace_all(records)
+    pickled = (data_folder / "staff.pkl").read_bytes()
+
+    store.put("002", edited(store, "002", 99000.0))
+    store.commit()
+
+    assert (data_folder / "staff.pkl").read_bytes() == pickled
+    assert (data_folder / "staff.journal").read_text().count("\n") == 1
+    assert open_store(journal=True).get("002").get_salary() == 99000.0
+
+
+def test_replay_after_a_crash_keeps_complete_entries_and_drops_a_torn_tail(data_folder, open_store, records, edited):
+    store = open_store(journal=True)
+    store.replace_all(records)
+    store.put("002", edited(store, "002", 99000.0))
+    store.remove("003")
+    store.commit()
+    journal = data_folder / "staff.journal"
+    complete = journal.stat().st_size
+    with open(journal, "ab") as fh:  # the process died halfway through the next append
+        fh.write(b'{"op": "put", "id": "005", "rec": {"name": "Half Wr')
+
+    reopened = open_store(journal=True)
+    assert sorted(reopened.records()) == ["001", "002", "004"]
+    assert reopened.get("002").get_salary() == 99000.0
+    assert journal.stat().st_size == complete
+
+    reopened.put("004", edited(reopened, "004", 91000.0))
+    reopened.commit()
+    assert open_store(journal=True).get("004").get_salary() == 91000.0
+
+
+def test_checkpoint_folds_the_journal_into_the_pickle(data_folder, open_store, records, edited):
+    store = open_store(journal=True)
+    store.replace_all(records)
+    store.put("001", edited(store, "001", 130000.0))
+    store.commit()
+
+    store.checkpoint()
+
+    assert (data_folder / "staff.journal").stat().st_size == 0
+    assert ems.PickleStorage(str(data_folder / "staff.pkl")).load()["001"].get_salary() == 130000.0
@@ -0,0 +1,43 @@
+import pytest
+
+import ems
+
+
+@pytest.fixture
+def index(records):
+    index = ems.NameTrigramIndex()
+    for emp_id, emp in records.items():
+        index.add(emp_id, ems.Validation.normalize(emp.get_name()))
+    return index
+
+
+def ids(hits):
+    return [emp_id for emp_id, _ in hits]
+
+
+def test_fuzzy_search_finds_misspelled_names(index):
+    hits = index.search("Olivai Browm", mode="fuzzy")
+
+    assert ids(hits)[0] == "001"
+    assert 0 < hits[0][1] < 1
+    assert ids(index.search("liam tailor", mode="fuzzy")) == ["004"]
+    assert index.search("Xavier Quinn", mode="fuzzy") == []
+
+
+def test_prefix_and_contains_verify_the_name(index):
+    assert ids(index.search("liv", mode="contains")) == ["001"]
+    assert index.search("liv", mode="prefix") == []
+    assert ids(index.search("LIAM T", mode="prefix")) == ["004"]
+    assert ids(index.search("on", mode="contains")) == ["002", "003"]  # 2-letter: scans the names
+
+
+def test_renames_and_removals_update_the_postings(index):
+    index.add("003", "ava chen")
+    index.discard("004")
+
+    assert ids(index.search("chen", mode="contains")) == ["003"]
+    assert index.search("thompson") == []
+    assert index.search("liam", mode="prefix") == []
+    assert not any("004" in bucket for bucket in index.postings.values())
+    with pytest.raises(ValueError):
+        index.search("ava", mode="exact")
@@ -0,0 +1,45 @@
+import pytest
+
+import ems
+
+
+@pytest.fixture
+def payroll(records, make_employee):
+    records["005"] = make_employee("005", "Mia Chen", 90000.0, department="Finance", location="Sydney")
+    return records
+
+
+def test_range_bounds_are_inclusive_and_ties_stay_in_id_order(payroll):
+    index = ems.SalaryIndex(payroll)
+
+    assert index.range(90000, 98000) == ["004", "005", "002"]
+    assert index.range(90000, 98000, descending=True) == ["002", "004", "005"]
+    assert index.range(90000.01, 97999.99) == []
+    assert index.range(high=86000) == ["003"]
+    assert index.range(low=98000) == ["002", "001"]
+    assert index.range(limit=2) == ["003", "004"]
+    assert index.range(limit=0) == []
+
+
+def test_filters_and_top_match_a_heap_over_the_records(payroll):
+    index = ems.SalaryIndex(payroll)
+
+    assert index.range(department="Finance", location="Sydney") == ["005", "002"]
+    assert index.top(2, department="Finance") == ["002", "004"]
+    for highest in (True, False):
+        expected = ems.top_pairs_by_salary(payroll.items(), 3, highest)
+        assert index.top(3, highest) == [emp_id for emp_id, _ in expected]
+
+
+def test_moves_between_groups_follow_add_and_discard(payroll):
+    index = ems.SalaryIndex(payroll)
+    moved = ems.copy.copy(payroll["003"])
+    moved.set_salary(99000.0)
+    moved.department = "Finance"
+    index.add("003", moved)
+    index.discard("001")
+
+    assert len(index) == 4
+    assert index.top(1) == ["003"]
+    assert index.range(department="IT") == []
+    assert index.range(department="Finance", low=95000) == ["002", "003"]
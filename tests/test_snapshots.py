@@ -0,0 +1,37 @@
+import pytest
+
+import ems
+
+
+def as_dicts(records_dict):
+    return {emp_id: emp.to_dict() for emp_id, emp in records_dict.items()}
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz", ".bz2", ".xz"])
+@pytest.mark.parametrize("name", ["staff.pkl", "staff.json", "staff.jsonl"])
+def test_every_format_and_codec_round_trips(data_folder, records, name, suffix):
+    records["002"].updated_at = ems.now_micros()
+    path = str(data_folder / (name + suffix))
+
+    size = ems.write_snapshot(records, path)
+
+    assert size == (data_folder / (name + suffix)).stat().st_size
+    assert not (data_folder / (name + suffix + ".tmp")).exists()
+    assert as_dicts(ems.read_snapshot(path)) == as_dicts(records)
+
+
+@pytest.mark.parametrize("fmt", ["pickle", "json", "jsonl"])
+def test_format_and_codec_are_detected_without_an_extension(data_folder, records, fmt):
+    path = str(data_folder / "staff.backup")
+    ems.write_snapshot(records, path, fmt, compression="bz2")
+
+    with open(path, "rb") as fh:
+        assert fh.read(3) == b"BZh"
+    assert as_dicts(ems.read_snapshot(path)) == as_dicts(records)
+
+
+def test_an_empty_store_round_trips(data_folder):
+    for name in ("empty.json", "empty.jsonl.gz", "empty.pkl.xz"):
+        path = str(data_folder / name)
+        ems.write_snapshot({}, path)
+        assert ems.read_snapshot(path) == {}
@@ -0,0 +1,33 @@
+import pytest
+
+import ems
+
+
+def ids(pairs):
+    return [emp_id for emp_id, _ in pairs]
+
+
+def test_several_keys_sort_in_one_pass_with_descending_keys(records, make_employee):
+    records["005"] = make_employee("005", "Ben Carter", 98000.0, department="Finance")
+    records["010"] = make_employee("010", "Zoe Adams", 98000.0, department="Finance")
+
+    keys = ems.parse_sort_spec("department, salary:desc, name")
+    ordered = ems.sort_pairs(records.items(), keys)
+
+    assert keys == [("department", False), ("salary", True), ("name", False)]
+    assert ids(ordered) == ["005", "002", "010", "004", "001", "003"]
+
+
+def test_ties_keep_id_order_whatever_the_direction(make_employee):
+    pairs = [(emp_id, make_employee(emp_id, f"Person {emp_id}", 50000.0)) for emp_id in ("1000", "x1", "999", "042")]
+
+    assert ids(ems.sort_pairs(pairs, [("salary", True)])) == ["042", "999", "1000", "x1"]
+    assert ids(ems.sort_pairs(pairs, [("salary", False)])) == ["042", "999", "1000", "x1"]
+    assert ids(ems.sort_pairs(pairs, [("id", True)])) == ["x1", "1000", "999", "042"]
+
+
+def test_an_unknown_field_is_refused(records):
+    with pytest.raises(ValueError):
+        ems.sort_pairs(records.items(), [("team", False)])
+    with pytest.raises(ValueError):
+        ems.parse_sort_spec("salary:down")
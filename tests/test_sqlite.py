@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import ems
+
+
+def sqlite(*argv):
+    return ems.run_cli(["--backend", "sqlite", *argv])
+
+
+def output(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.fixture
+def database(data_folder, records, capsys):
+    """The pickle in the data folder, copied into Current_Employees.db by the first SQLite command."""
+    ems.RecordStore(ems.PickleStorage(ems.PICKLE_FILE)).replace_all(records)
+    assert sqlite("get", "001") == ems.EXIT_OK
+    capsys.readouterr()
+    return data_folder / ems.SQLITE_FILE
+
+
+def test_the_first_command_migrates_the_pickle(database):
+    assert database.exists()
+    assert ems.SqliteStorage(str(database), migrate_from=None).count() == 4
+
+
+def test_searches_run_as_queries(database, capsys):
+    assert sqlite("search", "--prefix", "liam") == ems.EXIT_OK
+    assert [r["id"] for r in output(capsys)] == ["004"]
+    assert sqlite("search", "--department", "Finance", "--location", "Sydney") == ems.EXIT_OK
+    assert [r["id"] for r in output(capsys)] == ["002"]
+    assert sqlite("search", "--contains", "zz") == ems.EXIT_NOT_FOUND
+
+
+def test_writes_go_to_the_database_only(database, capsys):
+    pickled = (database.parent / ems.PICKLE_FILE).read_bytes()
+
+    assert sqlite("update", "002", "--salary", "99000", "--if-version", "1") == ems.EXIT_OK
+    assert sqlite("update", "002", "--salary", "1", "--if-version", "1") == ems.EXIT_CONFLICT
+    assert sqlite("delete", "003") == ems.EXIT_OK
+    assert sqlite("add", "--name", "Mia Chen", "--age", "30", "--position", "Developer", "--salary", "70000",
+                  "--department", "IT", "--location", "Perth", "--email", "mia.chen@example.com") == ems.EXIT_OK
+    assert sqlite("add", "--name", "mia chen", "--age", "30", "--position", "Developer", "--salary", "70000",
+                  "--department", "IT", "--location", "Perth", "--email", "mia@example.com") == ems.EXIT_INVALID
+    capsys.readouterr()
+
+    assert sqlite("get", "003") == ems.EXIT_NOT_FOUND
+    assert sqlite("sort", "--by", "salary:desc") == ems.EXIT_OK
+    listed = output(capsys)
+    assert [(r["id"], r["salary"]) for r in listed] == [("001", 125000.0), ("002", 99000.0),
+                                                        ("004", 90000.0), ("005", 70000.0)]
+    assert (database.parent / ems.PICKLE_FILE).read_bytes() == pickled
@@ -0,0 +1,60 @@
+import json
+import pickle
+
+import pytest
+
+import ems
+
+CREATED = "2024-01-02 03:04:05"
+UPDATED = "2024-02-03 04:05:06"
+
+
+@pytest.fixture
+def old_pickle(data_folder, records):
+    """A pickle as written before timestamps were integers: local-time text, updated_at None if never edited."""
+    for emp in records.values():
+        emp.created_at = CREATED
+        emp.updated_at = None
+    records["002"].updated_at = UPDATED
+    path = data_folder / "staff.pkl"
+    with open(path, "wb") as fh:
+        pickle.dump(records, fh)
+    return str(path)
+
+
+def test_text_timestamps_become_microseconds_when_loaded(old_pickle):
+    loaded = ems.PickleStorage(old_pickle).load()
+
+    assert loaded["001"].created_at == ems.parse_timestamp(CREATED)
+    assert isinstance(loaded["001"].created_at, int)
+    assert loaded["001"].updated_at is None
+    assert loaded["002"].updated_at == ems.parse_timestamp(UPDATED)
+    assert loaded["002"].to_dict()["updated_at"] == UPDATED  # shown as before
+
+
+def test_an_old_pickle_migrates_to_sqlite_with_integer_timestamps(data_folder, old_pickle):
+    storage = ems.SqliteStorage(str(data_folder / "staff.db"), migrate_from=old_pickle)
+
+    assert storage.get("002").updated_at == ems.parse_timestamp(UPDATED)
+    assert storage.get("003").created_at == ems.parse_timestamp(CREATED)
+
+
+def test_journal_entries_with_text_timestamps_replay(data_folder, old_pickle, records):
+    journal = data_folder / "staff.journal"
+    rec = records["004"].to_dict()
+    rec.update(created_at=CREATED, updated_at=UPDATED, salary=91000.0)
+    journal.write_text(json.dumps({"op": "put", "id": "004", "rec": rec}) + "\n")
+
+    store = ems.RecordStore(ems.PickleStorage(old_pickle), journal_file=str(journal))
+
+    assert store.get("004").get_salary() == 91000.0
+    assert store.get("004").updated_at == ems.parse_timestamp(UPDATED)
+
+
+def test_changed_since_counts_a_never_edited_record_from_when_it_was_added(old_pickle):
+    store = ems.RecordStore(ems.PickleStorage(old_pickle))
+    start = ems.parse_timestamp("2024-02-01 00:00:00")
+
+    assert [emp_id for emp_id, _ in store.time_range("updated_at", start=start)] == ["002"]
+    assert [emp_id for emp_id, _ in store.time_range("updated_at", end=start)] == ["001", "003", "004"]
+    assert len(store.time_range("created_at", start=ems.parse_time_spec("2024-01-02"))) == 4
@@ -0,0 +1,52 @@
+import pickle
+
+import pytest
+
+import ems
+
+
+@pytest.fixture
+def store(open_store, records):
+    store = open_store()
+    store.replace_all(records)
+    return store
+
+
+def test_a_pinned_snapshot_does_not_see_later_writes(store, edited, make_employee):
+    before = store.snapshot()
+    store.put("002", edited(store, "002", 99000.0))
+    store.remove("003")
+    store.put("005", make_employee("005", "Mia Chen"))
+    store.commit()
+
+    assert len(before) == 4
+    assert list(before) == ["001", "002", "003", "004"]
+    assert before["002"].get_salary() == 98000.0
+    assert "003" in before and "005" not in before
+
+    after = store.snapshot()
+    assert list(after) == ["001", "002", "004", "005"]
+    assert after["002"].get_salary() == 99000.0
+    assert after.generation > before.generation
+
+
+def test_a_write_copies_only_the_block_it_touches(make_employee):
+    versions = ems.RecordVersions()
+    versions.rebuild({"001": make_employee("001", "Olivia Brown"), "2000": make_employee("2000", "Noah Wilson")})
+    first = versions.pin()
+    versions.put("001", make_employee("001", "Olivia Green"))
+    versions.put("x7", make_employee("x7", "Ava Thompson"))
+    second = versions.pin()
+
+    assert first["001"].get_name() == "Olivia Brown" and "x7" not in first
+    assert second["001"].get_name() == "Olivia Green"
+    assert list(second) == ["001", "2000", "x7"]  # text IDs after the numeric blocks
+    assert second._blocks[ems.snapshot_block("2000")] is first._blocks[ems.snapshot_block("2000")]
+    assert second._blocks[ems.snapshot_block("001")] is not first._blocks[ems.snapshot_block("001")]
+
+
+def test_a_snapshot_pickles_as_a_plain_dict(store):
+    restored = pickle.loads(pickle.dumps(store.snapshot()))
+
+    assert type(restored) is dict
+    assert sorted(restored) == ["001", "002", "003", "004"]